@@ -0,0 +1,494 @@
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from itertools import compress
+
+PARTITION_SECONDS = 3600
+
+# Open partitions are sealed this long after their hour ends, so alerts
+# that arrive slightly out of order still land in them
+SEAL_DELAY = 60
+
+# Level code for missing or non-integer rule levels
+UNKNOWN_LEVEL = 255
+
+# Partition file: magic, version, hour start, rows, first seq, next seq,
+# then per column its typecode and compressed length
+MAGIC = b"WZAR"
+VERSION = 1
+HEADER = struct.Struct("<4sHqIqq")
+COLUMN = struct.Struct("<cI")
+PARTITION_SUFFIX = ".col"
+
+GROUPS = ("level", "agent", "rule")
+COLUMNS = {"level": "levels", "agent": "agents", "rule": "rules"}
+
+
+class _Dictionary:
+    """Append-only value <-> code mapping shared by all partitions"""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self.saved = len(self.values)
+
+    def code(self, value):
+        if not isinstance(value, str):
+            value = "N/A" if value is None or isinstance(value, (dict, list)) else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Partition:
+    """
+    Alerts received in one hour, as parallel column arrays
+
+    ``offsets`` are seconds since ``start``. Open partitions take appends;
+    sealed ones are sorted by offset, narrowed to the smallest typecodes
+    and never change again.
+    """
+
+    __slots__ = ("start", "first_seq", "next_seq", "offsets", "levels", "agents", "rules", "ordered", "path", "_summary")
+
+    def __init__(self, start, first_seq):
+        self.start = start
+        self.first_seq = first_seq
+        self.next_seq = first_seq
+        self.offsets = array("H")
+        self.levels = array("B")
+        self.agents = array("I")
+        self.rules = array("I")
+        self.ordered = True
+        self.path = None
+        self._summary = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, seq, offset, level, agent, rule):
+        if self.offsets and offset < self.offsets[-1]:
+            self.ordered = False
+        self.offsets.append(offset)
+        self.levels.append(level)
+        self.agents.append(agent)
+        self.rules.append(rule)
+        self.next_seq = max(self.next_seq, seq + 1)
+
+    def sort(self):
+        if self.ordered:
+            return
+        order = sorted(range(len(self.offsets)), key=self.offsets.__getitem__)
+        for name in ("offsets", "levels", "agents", "rules"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, map(column.__getitem__, order)))
+        self.ordered = True
+
+    def seal(self):
+        self.sort()
+        self.agents = _narrow(self.agents)
+        self.rules = _narrow(self.rules)
+
+    def copy(self):
+        """Snapshot of an open partition for a query outside the lock"""
+        snapshot = _Partition(self.start, self.first_seq)
+        snapshot.next_seq = self.next_seq
+        for name in ("offsets", "levels", "agents", "rules"):
+            setattr(snapshot, name, array(getattr(self, name).typecode, getattr(self, name)))
+        snapshot.ordered = self.ordered
+        snapshot.sort()
+        return snapshot
+
+    def summary(self):
+        """Counts by level, agent and rule code of a sealed partition, cached"""
+        if self._summary is None:
+            self._summary = (Counter(self.levels), Counter(self.agents), Counter(self.rules))
+        return self._summary
+
+    def save(self, directory):
+        name = time.strftime("%Y%m%dT%H", time.gmtime(self.start))
+        self.path = os.path.join(directory, f"{name}-{self.first_seq:020d}{PARTITION_SUFFIX}")
+        columns = []
+        for column in (self.offsets, self.levels, self.agents, self.rules):
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            columns.append((column.typecode.encode(), zlib.compress(column.tobytes())))
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.start, len(self), self.first_seq, self.next_seq))
+            for typecode, data in columns:
+                f.write(COLUMN.pack(typecode, len(data)))
+            for _, data in columns:
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, start, rows, first_seq, next_seq = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an archive partition")
+        partition = cls(start, first_seq)
+        partition.next_seq = next_seq
+        partition.path = path
+        offset = HEADER.size + 4 * COLUMN.size
+        for index, name in enumerate(("offsets", "levels", "agents", "rules")):
+            typecode, length = COLUMN.unpack_from(data, HEADER.size + index * COLUMN.size)
+            column = array(typecode.decode())
+            column.frombytes(zlib.decompress(data[offset:offset + length]))
+            if sys.byteorder == "big":
+                column.byteswap()
+            if len(column) != rows:
+                raise ValueError(f"column {name} has {len(column)} rows, expected {rows}")
+            setattr(partition, name, column)
+            offset += length
+        return partition
+
+
+def _narrow(column):
+    """Copy of a code column in the smallest typecode that fits"""
+    top = max(column, default=0)
+    typecode = "B" if top < 1 << 8 else "H" if top < 1 << 16 else "I"
+    return column if typecode == column.typecode else array(typecode, column)
+
+
+class AlertArchive:
+    """
+    Columnar, hour-partitioned record of every stored alert
+
+    Keeps only what trend reports need, receive time, rule level, agent
+    and rule ID, at a few bytes per alert. Agent names and rule IDs are
+    dictionary-encoded into small integer codes shared by all
+    partitions. An hour's partition is sealed SEAL_DELAY seconds after
+    the hour ends; with a directory, sealed partitions are written there
+    as compressed column files and loaded again on startup. Aggregations
+    count whole unfiltered partitions from cached per-partition counts
+    and otherwise count the column arrays (``Counter`` over ``compress``),
+    without looking at any alert JSON.
+    """
+
+    def __init__(self, directory=None, retention_seconds=90 * 86400):
+        """
+        Args:
+            directory: Where sealed partitions are written; None keeps
+                the archive in memory only
+            retention_seconds: Partitions older than this are dropped
+                (None keeps everything)
+        """
+        self.directory = directory
+        self.retention_seconds = retention_seconds
+
+        self._agents = _Dictionary()
+        self._rules = _Dictionary()
+        self._sealed = []
+        self._starts = []
+        self._open = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    @property
+    def next_seq(self):
+        """Sequence number after the newest archived alert"""
+        return self._next_seq
+
+    def __len__(self):
+        with self._lock:
+            return sum(map(len, self._sealed)) + sum(map(len, self._open.values()))
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "partitions": len(self._sealed),
+                "open_partitions": len(self._open),
+                "alerts": sum(map(len, self._sealed)) + sum(map(len, self._open.values())),
+                "agents": len(self._agents.values),
+                "rules": len(self._rules.values),
+            }
+            paths = [partition.path for partition in self._sealed if partition.path]
+        disk_bytes = 0
+        for path in paths:
+            try:
+                disk_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        stats["disk_bytes"] = disk_bytes
+        return stats
+
+    def add(self, seq, level, agent, rule, ts=None):
+        """
+        Archive one alert
+
+        Args:
+            seq: Alert sequence number
+            level: Rule level
+            agent: Agent name
+            rule: Rule ID
+            ts: Epoch seconds the alert was received (defaults to now)
+        """
+        with self._lock:
+            if ts is None:
+                ts = time.time()
+            start = int(ts // PARTITION_SECONDS) * PARTITION_SECONDS
+            partition = self._open.get(start)
+            if partition is None:
+                partition = self._open[start] = _Partition(start, seq)
+            level = level if isinstance(level, int) and 0 <= level < UNKNOWN_LEVEL else UNKNOWN_LEVEL
+            partition.append(seq, int(ts - start), level, self._agents.code(agent), self._rules.code(rule))
+            self._next_seq = max(self._next_seq, seq + 1)
+
+            expired = [start for start in self._open if start + PARTITION_SECONDS + SEAL_DELAY <= ts]
+            if expired:
+                self._seal(expired, now=ts)
+
+    def close(self):
+        """Seal the open partitions, e.g. at shutdown"""
+        with self._lock:
+            self._seal(list(self._open))
+
+    def aggregate(self, since=None, until=None, group_by=GROUPS, interval=3600,
+                  min_level=None, agent=None, rule_id=None):
+        """
+        Count archived alerts received in [since, until)
+
+        Receive times are kept to the second, so the bounds are rounded
+        down to whole seconds.
+
+        Args:
+            since: Epoch seconds, or None for the oldest partition
+            until: Epoch seconds, or None for now
+            group_by: Breakdowns to return, of "level", "agent" and "rule"
+            interval: Timeline bucket width in seconds (None: no timeline)
+            min_level: Only alerts with rule_level >= min_level
+            agent: Case-insensitive substring of the agent name
+            rule_id: Exact rule ID
+
+        Returns:
+            dict: ``total_alerts``, ``alerts_by_<group>`` and, with an
+            interval, ``timeline`` buckets aligned to multiples of it
+        """
+        since = None if since is None else int(since // 1)
+        until = None if until is None else int(until // 1)
+        with self._lock:
+            low = 0 if since is None else bisect.bisect_left(self._starts, since - PARTITION_SECONDS + 1)
+            high = len(self._starts) if until is None else bisect.bisect_left(self._starts, until)
+            partitions = self._sealed[low:high]
+            partitions.extend(partition.copy() for partition in self._open.values()
+                              if (since is None or partition.start + PARTITION_SECONDS > since)
+                              and (until is None or partition.start < until))
+            agents = list(self._agents.values)
+            rules = list(self._rules.values)
+
+        # Filters become sets of accepted codes (and their cached mask tables)
+        filters = []
+        if min_level:
+            filters.append(("level", set(range(max(min_level, 0), UNKNOWN_LEVEL)), {}))
+        if agent:
+            needle = agent.lower()
+            filters.append(("agent", {code for code, name in enumerate(agents) if needle in name.lower()}, {}))
+        if rule_id:
+            filters.append(("rule", {code for code, rule in enumerate(rules) if rule == str(rule_id)}, {}))
+
+        total = 0
+        counts = {group: Counter() for group in group_by}
+        timeline = Counter()
+        for partition in partitions:
+            lo, hi = 0, len(partition)
+            if since is not None and since > partition.start:
+                lo = bisect.bisect_left(partition.offsets, since - partition.start)
+            if until is not None and until < partition.start + PARTITION_SECONDS:
+                hi = bisect.bisect_left(partition.offsets, until - partition.start)
+            if lo >= hi:
+                continue
+
+            # The partition's code counts skip it when no code passes a
+            # filter, and drop filters that every code passes
+            summary = dict(zip(GROUPS, partition.summary()))
+            active = []
+            for name, accepted, tables in filters:
+                if accepted.isdisjoint(summary[name]):
+                    break
+                if not accepted.issuperset(summary[name]):
+                    active.append((name, accepted, tables))
+            else:
+                whole = lo == 0 and hi == len(partition)
+                if not active and whole:
+                    for group in group_by:
+                        counts[group].update(summary[group])
+                    total += hi
+                    if interval:
+                        _count_timeline(timeline, partition.start, partition.offsets, interval)
+                    continue
+
+                selected = None
+                for name, accepted, tables in active:
+                    mask = _mask(getattr(partition, COLUMNS[name])[lo:hi], accepted, tables)
+                    selected = mask if selected is None else _both(selected, mask)
+
+                offsets = partition.offsets if whole else partition.offsets[lo:hi]
+                if selected is not None:
+                    offsets = array(offsets.typecode, compress(offsets, selected))
+                total += len(offsets)
+                for group in group_by:
+                    column = getattr(partition, COLUMNS[group])[lo:hi]
+                    counts[group].update(column if selected is None else compress(column, selected))
+                if interval:
+                    _count_timeline(timeline, partition.start, offsets, interval)
+
+        result = {"total_alerts": total}
+        names = {"level": None, "agent": agents, "rule": rules}
+        for group in group_by:
+            values = names[group]
+            if values is None:
+                result["alerts_by_level"] = {
+                    ("N/A" if code == UNKNOWN_LEVEL else str(code)): count for code, count in counts[group].items()
+                }
+            else:
+                result[f"alerts_by_{group}"] = {values[code]: count for code, count in counts[group].items()}
+        if interval:
+            result["bucket_seconds"] = interval
+            result["timeline"] = [{"start": start, "count": count} for start, count in sorted(timeline.items())]
+        return result
+
+    def _seal(self, starts, now=None):
+        for start in sorted(starts):
+            partition = self._open.pop(start)
+            partition.seal()
+            if self.directory:
+                self._save_dictionaries()
+                try:
+                    partition.save(self.directory)
+                except OSError as e:
+                    logging.error(f"Could not write archive partition: {str(e)}")
+            index = bisect.bisect_right(self._starts, start)
+            self._starts.insert(index, start)
+            self._sealed.insert(index, partition)
+
+        if self.retention_seconds is not None:
+            cutoff = (now or time.time()) - self.retention_seconds
+            while self._sealed and self._sealed[0].start + PARTITION_SECONDS <= cutoff:
+                expired = self._sealed.pop(0)
+                self._starts.pop(0)
+                if expired.path:
+                    try:
+                        os.remove(expired.path)
+                    except OSError:
+                        pass
+
+    def _dictionary_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _save_dictionaries(self):
+        # Codes are only ever appended, so rewriting the lists before any
+        # partition that uses new codes keeps every file readable
+        for name, dictionary in (("agents", self._agents), ("rules", self._rules)):
+            if dictionary.saved == len(dictionary.values):
+                continue
+            path = self._dictionary_path(name)
+            with open(path + ".tmp", "w") as f:
+                json.dump(dictionary.values, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            dictionary.saved = len(dictionary.values)
+
+    def _load(self):
+        for name in ("agents", "rules"):
+            try:
+                with open(self._dictionary_path(name)) as f:
+                    setattr(self, f"_{name}", _Dictionary(json.load(f)))
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logging.error(f"Unreadable archive dictionary {name}: {str(e)}")
+
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(PARTITION_SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                partition = _Partition.load(path)
+            except (OSError, ValueError, struct.error, zlib.error) as e:
+                logging.error(f"Skipping archive partition {filename}: {str(e)}")
+                continue
+            if max(partition.agents, default=0) >= len(self._agents.values) or \
+                    max(partition.rules, default=0) >= len(self._rules.values):
+                logging.error(f"Skipping archive partition {filename}: codes missing from the dictionaries")
+                continue
+            index = bisect.bisect_right(self._starts, partition.start)
+            self._starts.insert(index, partition.start)
+            self._sealed.insert(index, partition)
+            self._next_seq = max(self._next_seq, partition.next_seq)
+        if self._sealed:
+            logging.info(f"Loaded {len(self._sealed)} archive partitions from {self.directory}")
+
+
+def _mask(column, accepted, tables):
+    """
+    Bytes of 1 for the rows whose code is accepted, 0 otherwise
+
+    ``tables`` caches the filter's lookup tables across partitions.
+    """
+    if column.typecode == "B":
+        # One C-level pass through a 256-entry lookup table
+        if "B" not in tables:
+            tables["B"] = _table(accepted)
+        return column.tobytes().translate(tables["B"])
+    if column.typecode == "H":
+        # Per high byte in use: rows with that high byte AND an accepted low byte
+        if "H" not in tables:
+            by_high = {}
+            for code in accepted:
+                by_high.setdefault(code >> 8, set()).add(code & 0xFF)
+            tables["H"] = [(_table((top,)), _table(lows)) for top, lows in by_high.items()]
+        data = column.tobytes()
+        low, high = (data[0::2], data[1::2]) if sys.byteorder == "little" else (data[1::2], data[0::2])
+        mask = 0
+        for high_table, low_table in tables["H"]:
+            mask |= (int.from_bytes(high.translate(high_table), "little")
+                     & int.from_bytes(low.translate(low_table), "little"))
+        return mask.to_bytes(len(column), "little")
+    return bytes(map(accepted.__contains__, column))
+
+
+def _table(accepted):
+    return bytes(code in accepted for code in range(256))
+
+
+def _both(first, second):
+    """Row-wise AND of two masks"""
+    both = int.from_bytes(first, "little") & int.from_bytes(second, "little")
+    return both.to_bytes(len(first), "little")
+
+
+def _count_timeline(timeline, start, offsets, interval):
+    """Add the counts of sorted offsets to interval-aligned buckets"""
+    if not offsets:
+        return
+    if interval % PARTITION_SECONDS == 0:
+        timeline[start // interval * interval] += len(offsets)
+        return
+    position = 0
+    while position < len(offsets):
+        bucket = (start + offsets[position]) // interval * interval
+        edge = bisect.bisect_left(offsets, bucket + interval - start, position)
+        timeline[bucket] += edge - position
+        position = edge
@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import deque
+
+from alert_page import project
+from raw_alert import encode_alert
+
+
+class Subscription:
+    """
+    One live-stream client: its filters and a bounded event buffer
+
+    When the client falls ``maxsize`` events behind, the subscription is
+    marked overflowed and stops buffering; the client is expected to
+    reconnect and resume from the last event it received.
+    """
+
+    def __init__(self, min_level=None, agent=None, rule_id=None, fields=None, maxsize=1000):
+        self.min_level = min_level
+        self.needle = agent.lower() if agent else None
+        self.rule_id = rule_id
+        self.fields = fields
+        self.maxsize = maxsize
+
+        self.overflowed = False
+        self.delivered = 0
+
+        self._events = deque()
+        self._cond = threading.Condition()
+
+    def matches(self, alert):
+        """Check a processed alert against the subscription filters"""
+        level = alert.get("rule_level")
+        if self.min_level and not (isinstance(level, int) and level >= self.min_level):
+            return False
+        name = alert.get("agent_name")
+        if self.needle and not (isinstance(name, str) and self.needle in name.lower()):
+            return False
+        if self.rule_id and alert.get("rule_id") != self.rule_id:
+            return False
+        return True
+
+    def push(self, seq, payload):
+        """
+        Buffer an encoded event
+
+        Returns:
+            bool: False if the buffer is full and the subscription overflowed
+        """
+        with self._cond:
+            if self.overflowed:
+                return False
+            if len(self._events) >= self.maxsize:
+                self.overflowed = True
+                self._events.clear()
+                self._cond.notify()
+                return False
+            self._events.append((seq, payload))
+            self._cond.notify()
+        return True
+
+    def get(self, timeout=None, linger=0.0):
+        """
+        Wait for buffered events
+
+        Args:
+            timeout: Maximum seconds to wait for the first event
+            linger: Seconds to keep collecting once an event arrived, so a
+                burst is written to the client in one go
+
+        Returns:
+            list: (seq, encoded alert) pairs, empty on timeout or overflow
+        """
+        with self._cond:
+            if not self._events and not self.overflowed:
+                self._cond.wait(timeout)
+        if linger and self._events:
+            time.sleep(linger)
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+        self.delivered += len(events)
+        return events
+
+    def __len__(self):
+        return len(self._events)
+
+
+class AlertBroker:
+    """
+    Fan-out of processed alerts to live-stream subscribers
+
+    ``publish`` runs on the ingest path, so it only filters and appends
+    to each subscriber's buffer. Each alert is JSON-encoded at most once
+    per distinct field projection, however many clients receive it. The
+    subscriber list is replaced rather than mutated, so publishing never
+    waits on subscribe/unsubscribe.
+
+    Ingest workers publish concurrently, so alerts can arrive slightly out
+    of sequence order. An alert that arrives ahead of its predecessors is
+    held until they are delivered. A sequence number still missing after
+    ``MAX_HOLD_SECONDS`` is given up on.
+    """
+
+    MAX_HOLD_SECONDS = 1.0
+
+    def __init__(self, buffer_size=1000, max_subscribers=1000):
+        """
+        Args:
+            buffer_size: Events buffered per subscriber before it overflows
+            max_subscribers: Maximum concurrent subscriptions
+        """
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+
+        self.published = 0
+        self.overflows = 0
+
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+        # Next sequence number to deliver, and what arrived ahead of it
+        self._order_lock = threading.Lock()
+        self._next_seq = None
+        self._held = {}
+        self._held_since = None
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, min_level=None, agent=None, rule_id=None, fields=None):
+        """
+        Register a subscriber
+
+        Returns:
+            Subscription: The new subscription, or None if the broker is full
+        """
+        subscription = Subscription(min_level, agent, rule_id, fields, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, seq, alert):
+        """
+        Deliver a processed alert to every matching subscriber
+
+        Filtering and encoding run in the caller's thread; only handing
+        the payloads over in sequence order is serialized.
+
+        Args:
+            seq: Alert sequence number, used as the event ID
+            alert: Processed alert dict
+        """
+        deliveries = self._deliveries(seq, alert)
+        with self._order_lock:
+            if self._next_seq is None:
+                self._next_seq = seq
+            if seq < self._next_seq:
+                # Given up on earlier; late, but not lost
+                self._push(seq, deliveries)
+                return
+            self._held[seq] = deliveries
+            if seq != self._next_seq:
+                now = time.monotonic()
+                if self._held_since is None:
+                    self._held_since = now
+                elif now - self._held_since > self.MAX_HOLD_SECONDS:
+                    self._next_seq = min(self._held)
+            if self._next_seq in self._held:
+                while self._next_seq in self._held:
+                    self._push(self._next_seq, self._held.pop(self._next_seq))
+                    self._next_seq += 1
+                self._held_since = None
+
+    def _deliveries(self, seq, alert):
+        """
+        (subscription, payload) pairs of the subscribers an alert matches,
+        or None when nobody is subscribed
+        """
+        subscribers = self._subscribers
+        if not subscribers:
+            return None
+
+        deliveries = []
+        encoded = {}
+        for subscription in subscribers:
+            if subscription.overflowed or not subscription.matches(alert):
+                continue
+            payload = encoded.get(subscription.fields)
+            if payload is None:
+                payload = encoded[subscription.fields] = encode_alert(
+                    project(seq, alert, subscription.fields)
+                ).decode()
+            deliveries.append((subscription, payload))
+        return deliveries
+
+    def _push(self, seq, deliveries):
+        if deliveries is None:
+            return
+        self.published += 1
+        for subscription, payload in deliveries:
+            if not subscription.push(seq, payload):
+                self.overflows += 1
+
+    def stats(self):
+        """Return subscriber count, buffered events and overflow counters"""
+        subscribers = self._subscribers
+        return {
+            "subscribers": len(subscribers),
+            "buffered_events": sum(len(s) for s in subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
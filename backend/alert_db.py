@@ -0,0 +1,335 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from raw_alert import encode_alert
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    seq INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    rule_level INTEGER,
+    agent_name TEXT,
+    rule_id TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    alert TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp);
+CREATE INDEX IF NOT EXISTS idx_alerts_level ON alerts (rule_level);
+CREATE INDEX IF NOT EXISTS idx_alerts_agent ON alerts (agent_name);
+CREATE INDEX IF NOT EXISTS idx_alerts_rule ON alerts (rule_id);
+CREATE TABLE IF NOT EXISTS agents (
+    name TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+INSERT_ALERT = "INSERT INTO alerts (seq, timestamp, rule_level, agent_name, rule_id, size, alert) VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_AGENT = "INSERT OR IGNORE INTO agents (name) VALUES (?)"
+UPDATE_OCCURRENCES = "UPDATE alerts SET alert = json_set(alert, '$.occurrences', ?, '$.last_seen', ?) WHERE seq = ?"
+
+
+def _column(value, types):
+    """Indexed columns only hold well-typed values; the JSON keeps the original"""
+    return value if isinstance(value, types) and not isinstance(value, bool) else None
+
+
+class AlertDatabase:
+    """
+    SQLite persistence for processed alerts
+
+    The database runs in WAL mode so readers never wait for the writer.
+    ``add`` only queues the alert; a writer thread inserts queued alerts
+    in one transaction per ``batch_size`` alerts or ``batch_interval``
+    seconds, whichever comes first. Timestamp, level, agent and rule ID
+    are indexed columns and queries page by sequence number (keyset),
+    so every page costs the same regardless of how deep it is.
+    """
+
+    def __init__(self, path, batch_size=500, batch_interval=0.2, max_pending=100000):
+        """
+        Args:
+            path: SQLite database file
+            batch_size: Alerts per write transaction
+            batch_interval: Maximum seconds an alert waits before it is written
+            max_pending: Queued alerts beyond this are dropped and counted
+                in ``dropped``; alerts of batches that fail to write are
+                counted in ``failed``
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_pending = max_pending
+        self.logger = logging.getLogger(__name__)
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._pending = deque()
+        self._touched = {}
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._running = True
+        self._local = threading.local()
+        self._known_agents = set()
+
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._known_agents.update(name for name, in self._writer.execute("SELECT name FROM agents"))
+
+        self._thread = threading.Thread(target=self._write_loop, name="alert-db-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        """Per-thread read connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def __len__(self):
+        return self._reader().execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    @property
+    def next_seq(self):
+        """Sequence number following the newest stored alert"""
+        row = self._reader().execute("SELECT MAX(seq) FROM alerts").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, seq, alert, size=0):
+        """
+        Queue a processed alert for the next write batch
+
+        Args:
+            seq: Alert sequence number (the primary key)
+            alert: Processed alert dict
+            size: Size of the original alert payload in bytes
+
+        Returns:
+            bool: False if the queue was full and the alert was dropped
+        """
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append((seq, alert, size or 0))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def touch(self, seq, occurrences, last_seen):
+        """
+        Queue an occurrence count update for a stored alert
+
+        Updates to the same alert are coalesced until the next batch.
+        """
+        with self._cond:
+            self._touched[seq] = (occurrences, last_seen)
+
+    def flush(self):
+        """Write every queued alert now"""
+        with self._cond:
+            batch = list(self._pending)
+            self._pending.clear()
+            touched = self._take_touched()
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            self._write(chunk, {seq: touched.pop(seq) for seq, _, _ in chunk if seq in touched})
+        self._write([], touched)
+
+    def _take_touched(self):
+        """Updates for alerts no longer waiting in the queue (under _cond)"""
+        if not self._touched:
+            return {}
+        first_pending = self._pending[0][0] if self._pending else None
+        touched = {}
+        for seq, update in list(self._touched.items()):
+            if first_pending is None or seq < first_pending:
+                touched[seq] = self._touched.pop(seq)
+        return touched
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.batch_interval
+                while self._running and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                count = min(len(self._pending), self.batch_size)
+                batch = [self._pending.popleft() for _ in range(count)]
+                touched = self._take_touched()
+                running = self._running
+            try:
+                self._write(batch, touched)
+            except sqlite3.Error as e:
+                # Includes a sequence number that is already stored, which
+                # means the listener's numbering went back
+                self.failed += len(batch)
+                self.logger.error(f"Error writing {len(batch)} alerts to {self.path}: {str(e)}")
+            if not running and not self._pending:
+                return
+
+    def _write(self, batch, touched=None):
+        """Insert a batch and apply occurrence updates in one transaction"""
+        touched = touched if touched is not None else {}
+        if not batch and not touched:
+            return
+        rows = []
+        agents = []
+        for seq, alert, size in batch:
+            update = touched.pop(seq, None)
+            if update is not None:
+                alert = dict(alert, occurrences=update[0], last_seen=update[1])
+            agent = _column(alert.get("agent_name"), str)
+            if agent is not None and agent not in self._known_agents:
+                agents.append((agent,))
+            rows.append((
+                seq,
+                _column(alert.get("timestamp"), str),
+                _column(alert.get("rule_level"), int),
+                agent,
+                _column(alert.get("rule_id"), (str, int)),
+                size,
+                encode_alert(alert).decode(),
+            ))
+
+        # One transaction per batch: a single WAL commit for all rows
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN")
+            try:
+                if rows:
+                    conn.executemany(INSERT_ALERT, rows)
+                if touched:
+                    conn.executemany(UPDATE_OCCURRENCES, [
+                        (occurrences, last_seen, seq) for seq, (occurrences, last_seen) in touched.items()
+                    ])
+                if agents:
+                    conn.executemany(INSERT_AGENT, agents)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            self._known_agents.update(name for name, in agents)
+            self.written += len(rows)
+            self.batches += 1
+            touched.clear()
+
+    def close(self):
+        """Write what is queued, stop the writer and close the database"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=10)
+        self.flush()
+        self._writer.close()
+
+    def matching_agents(self, agent):
+        """Stored agent names containing agent (case-insensitive)"""
+        needle = agent.lower()
+        return [
+            name for name, in self._reader().execute("SELECT name FROM agents")
+            if needle in name.lower()
+        ]
+
+    def query(self, min_level=None, agent=None, rule_id=None, since=None, before_seq=None, after_seq=None,
+              limit=50):
+        """
+        Return the newest stored alerts matching the given filters
+
+        Args:
+            min_level: Only alerts with rule_level >= min_level
+            agent: Case-insensitive substring of the agent name
+            rule_id: Exact rule ID
+            since: Only alerts with a timestamp at or after this (epoch seconds)
+            before_seq: Keyset cursor; only alerts with seq < before_seq
+            after_seq: Keyset cursor; only alerts with seq > after_seq, and
+                the oldest matches are returned instead of the newest
+            limit: Maximum number of alerts to return
+
+        Returns:
+            list: (seq, processed alert, payload size) tuples, oldest first
+        """
+        if limit is None or limit <= 0:
+            return []
+
+        clauses = []
+        params = []
+        if min_level:
+            clauses.append("rule_level >= ?")
+            params.append(min_level)
+        if agent:
+            # The substring match runs over the small agents table; the
+            # alerts table is then hit through its agent_name index. The
+            # names go in as one JSON array, as a broad match can exceed
+            # SQLite's limit on bound parameters
+            names = self.matching_agents(agent)
+            if not names:
+                return []
+            clauses.append("agent_name IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(names))
+        if rule_id:
+            clauses.append("rule_id = ?")
+            params.append(rule_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(datetime.fromtimestamp(since).isoformat())
+        if before_seq is not None:
+            clauses.append("seq < ?")
+            params.append(before_seq)
+        if after_seq is not None:
+            clauses.append("seq > ?")
+            params.append(after_seq)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if after_seq is not None else "DESC"
+        rows = self._reader().execute(
+            f"SELECT seq, alert, size FROM alerts {where} ORDER BY seq {order} LIMIT ?",
+            params + [limit]
+        ).fetchall()
+
+        if after_seq is None:
+            rows.reverse()
+        return [(seq, json.loads(alert), size) for seq, alert, size in rows]
+
+    def replay(self, max_records):
+        """
+        Iterate over the newest max_records alerts, oldest first
+
+        Yields:
+            tuple: (seq, processed alert, payload size)
+        """
+        start = self.next_seq - max_records
+        for seq, alert, size in self._reader().execute(
+            "SELECT seq, alert, size FROM alerts WHERE seq >= ? ORDER BY seq", (start,)
+        ):
+            yield seq, json.loads(alert), size
+
+    def stats(self):
+        """Return writer throughput counters"""
+        return {
+            "path": self.path,
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+
+# Fingerprint used when none is configured: the same rule on the same agent
+# and log location, for the same file and checksum (syscheck) or log line
+DEFAULT_FIELDS = (
+    "rule_id",
+    "agent_name",
+    "location",
+    "raw_alert.syscheck.path",
+    "raw_alert.syscheck.sha256_after",
+    "full_log",
+)
+
+
+def _lookup(alert, path):
+    value = alert
+    for part in path:
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(part)
+    return value
+
+
+class _Entry:
+    __slots__ = ("record", "count", "first_seen", "last_seen")
+
+    def __init__(self, now):
+        self.record = None
+        self.count = 1
+        self.first_seen = now
+        self.last_seen = now
+
+
+class AlertDeduplicator:
+    """
+    Time-bounded table of recently stored alert fingerprints
+
+    A fingerprint is a 16-byte BLAKE2b digest of the configured fields,
+    so memory per entry does not depend on alert size. An alert whose
+    fingerprint was first stored less than ``window`` seconds ago is a
+    repeat: it bumps the stored record's ``occurrences`` and
+    ``last_seen`` instead of being stored again. Entries are kept in
+    first-seen order, so expired ones are popped from the front as
+    alerts arrive; ``max_entries`` caps the table under floods of
+    distinct alerts.
+    """
+
+    def __init__(self, window=10, fields=DEFAULT_FIELDS, max_entries=100000):
+        """
+        Args:
+            window: Seconds after the first copy during which repeats are folded
+            fields: Processed alert fields (dotted paths into nested dicts)
+                that make up the fingerprint
+            max_entries: Fingerprints kept at most; the oldest go first
+        """
+        self.window = window
+        self.fields = tuple(fields)
+        self.max_entries = max_entries
+
+        self.unique = 0
+        self.repeats = 0
+
+        self._paths = [tuple(field.split(".")) for field in self.fields]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fingerprint(self, alert):
+        """Digest of the configured fields of a processed alert"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in self._paths:
+            digest.update(repr(_lookup(alert, path)).encode())
+            digest.update(b"\0")
+        return digest.digest()
+
+    def check(self, key, now=None):
+        """
+        Register an alert fingerprint
+
+        Args:
+            key: Fingerprint from fingerprint()
+            now: Time in epoch seconds (default: current time)
+
+        Returns:
+            tuple: (repeat, record). repeat is True if the alert repeats
+            one stored within the window; record is that stored record,
+            already updated, or None if it is still being stored
+        """
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(now)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self.unique += 1
+                return False, None
+
+            entry.count += 1
+            entry.last_seen = now
+            self._update(entry)
+            self.repeats += 1
+            return True, entry.record
+
+    def attach(self, key, record):
+        """Link a fingerprint to the record stored for its first copy"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.record = record
+                # Repeats that arrived while the first copy was being stored
+                self._update(entry)
+
+    def discard(self, key):
+        """
+        Forget a fingerprint whose first copy was not stored after all
+
+        Later copies are then checked as new alerts instead of being
+        folded into a record that does not exist.
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.unique -= 1
+
+    def _update(self, entry):
+        record = entry.record
+        if record is not None and entry.count > 1:
+            record.occurrences = entry.count
+            record.last_seen = datetime.fromtimestamp(entry.last_seen).isoformat()
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.first_seen >= cutoff:
+                break
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return table size and unique/repeat counters"""
+        with self._lock:
+            return {
+                "window_seconds": self.window,
+                "tracked": len(self._entries),
+                "unique": self.unique,
+                "repeats": self.repeats,
+            }
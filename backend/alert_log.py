@@ -0,0 +1,402 @@
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from raw_alert import encode_alert
+
+# Record header: payload length, sequence number, payload size, CRC32 of payload
+HEADER = struct.Struct("<IQII")
+
+# Sparse index file: next_seq and segment size, then (seq, offset) pairs
+INDEX_HEADER = struct.Struct("<QQ")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+SEGMENT_SUFFIX = ".log"
+INDEX_SUFFIX = ".idx"
+
+
+def _scan(buf, offset, end):
+    """
+    Walk the records in buf[offset:end]
+
+    Stops at the first torn or corrupt record.
+
+    Yields:
+        tuple: (seq, size, payload start, payload end)
+    """
+    while offset + HEADER.size <= end:
+        length, seq, size, crc = HEADER.unpack_from(buf, offset)
+        start = offset + HEADER.size
+        stop = start + length
+        if stop > end or zlib.crc32(buf[start:stop]) != crc:
+            return
+        yield seq, size, start, stop
+        offset = stop
+
+
+class _Segment:
+    """One log file holding records base_seq <= seq < next_seq"""
+
+    __slots__ = ("path", "base_seq", "next_seq", "size", "index_seqs", "index_offsets", "unindexed", "_map")
+
+    def __init__(self, directory, base_seq):
+        self.path = os.path.join(directory, f"{base_seq:020d}{SEGMENT_SUFFIX}")
+        self.base_seq = base_seq
+        self.next_seq = base_seq
+        self.size = 0
+        self.index_seqs = []
+        self.index_offsets = []
+        self.unindexed = 0
+        self._map = None
+
+    @property
+    def index_path(self):
+        return self.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+    def note(self, seq, offset, length, index_interval):
+        """Account for a record appended at offset"""
+        if not self.index_seqs or self.unindexed >= index_interval:
+            self.index_seqs.append(seq)
+            self.index_offsets.append(offset)
+            self.unindexed = 0
+        self.unindexed += 1
+        self.next_seq = seq + 1
+        self.size = offset + length
+
+    def offset_for(self, seq):
+        """Offset of the last indexed record at or before seq"""
+        pos = bisect.bisect_right(self.index_seqs, seq) - 1
+        return self.index_offsets[pos] if pos >= 0 else 0
+
+    def recover(self, index_interval):
+        """
+        Rebuild the sparse index by scanning the file
+
+        Returns:
+            int: Offset just past the last intact record
+        """
+        self.index_seqs = []
+        self.index_offsets = []
+        self.unindexed = 0
+        self.size = 0
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for seq, size, start, stop in _scan(data, 0, len(data)):
+            self.note(seq, start - HEADER.size, stop - start + HEADER.size, index_interval)
+        return self.size
+
+    def load_index(self):
+        """
+        Load the persisted sparse index of a sealed segment
+
+        Returns:
+            bool: False if the index is missing or does not match the file
+        """
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        if len(data) < INDEX_HEADER.size or (len(data) - INDEX_HEADER.size) % INDEX_ENTRY.size:
+            return False
+        next_seq, size = INDEX_HEADER.unpack_from(data, 0)
+        if size != os.path.getsize(self.path):
+            return False
+        entries = list(INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size:]))
+        self.next_seq = next_seq
+        self.size = size
+        self.index_seqs = [seq for seq, _ in entries]
+        self.index_offsets = [offset for _, offset in entries]
+        return True
+
+    def save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(self.next_seq, self.size))
+            for seq, offset in zip(self.index_seqs, self.index_offsets):
+                f.write(INDEX_ENTRY.pack(seq, offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def mapping(self, sealed):
+        """
+        Map the segment into memory
+
+        Sealed segments keep their mapping; the active one is mapped
+        afresh on every read since it keeps growing.
+        """
+        if self._map is not None:
+            return self._map
+        if not self.size:
+            return None
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+        if sealed:
+            self._map = mapped
+        return mapped
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def delete(self):
+        self.close()
+        for path in (self.path, self.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class AlertLog:
+    """
+    Durable, segmented append-only log of processed alerts
+
+    Records are length-prefixed, checksummed JSON keyed by the alert
+    sequence number. Appends are plain writes to the active segment; a
+    background thread fsyncs at most every ``sync_interval`` seconds, so
+    many appends share one fsync (group commit). Each segment keeps a
+    sparse seq -> offset index, persisted when the segment is sealed, so
+    historical reads mmap the segment and seek close to the wanted record.
+    Sealed segments beyond the retention limits are deleted.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, index_interval=64, sync_interval=0.05,
+                 retention_bytes=1024 * 1024 * 1024, retention_seconds=None):
+        """
+        Args:
+            directory: Directory holding the segment files
+            segment_bytes: Size at which the active segment is sealed
+            index_interval: Records between sparse index entries
+            sync_interval: Maximum seconds between group-commit fsyncs
+            retention_bytes: Delete the oldest sealed segments beyond this total size
+            retention_seconds: Delete sealed segments not written for this long
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.sync_interval = sync_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self.durable_seq = 0
+        self.syncs = 0
+
+        self._segments = []
+        self._fd = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+        self._thread = threading.Thread(target=self._sync_loop, name="alert-log-sync", daemon=True)
+        self._thread.start()
+
+    @property
+    def first_seq(self):
+        return self._segments[0].base_seq
+
+    @property
+    def next_seq(self):
+        return self._segments[-1].next_seq
+
+    @property
+    def total_bytes(self):
+        return sum(segment.size for segment in self._segments)
+
+    def _open(self):
+        bases = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        for base in bases:
+            segment = _Segment(self.directory, base)
+            if base != bases[-1] and segment.load_index():
+                self._segments.append(segment)
+                continue
+            end = segment.recover(self.index_interval)
+            if os.path.getsize(segment.path) != end:
+                # Torn write from a crash: drop everything after the last intact record
+                self.logger.warning(f"Truncating {segment.path} to last intact record at offset {end}")
+                with open(segment.path, "r+b") as f:
+                    f.truncate(end)
+            self._segments.append(segment)
+
+        if not self._segments:
+            self._segments.append(_Segment(self.directory, 0))
+        self._fd = os.open(self._segments[-1].path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+        self.durable_seq = self.next_seq
+
+    def append(self, seq, alert, size=0):
+        """
+        Append a processed alert
+
+        Args:
+            seq: Sequence number; must be at least next_seq
+            alert: Processed alert dict
+            size: Size of the original alert payload in bytes
+
+        Raises:
+            OSError: If the record could not be written; the log is unchanged
+        """
+        payload = encode_alert(alert)
+        record = HEADER.pack(len(payload), seq, size or 0, zlib.crc32(payload)) + payload
+
+        with self._lock:
+            segment = self._segments[-1]
+            if seq < segment.next_seq:
+                raise ValueError(f"Sequence {seq} is behind the log ({segment.next_seq})")
+            if segment.size and segment.size + len(record) > self.segment_bytes:
+                segment = self._roll(seq)
+            try:
+                written = os.write(self._fd, record)
+                if written != len(record):
+                    raise OSError(f"Short write to the alert log ({written} of {len(record)} bytes)")
+            except OSError:
+                # Cut off a partial record so the records appended after it stay readable
+                os.ftruncate(self._fd, segment.size)
+                raise
+            segment.note(seq, segment.size, len(record), self.index_interval)
+            self._dirty = True
+
+    def _roll(self, seq):
+        """Seal the active segment and start a new one at seq"""
+        sealed = self._segments[-1]
+        os.fsync(self._fd)
+        os.close(self._fd)
+        sealed.save_index()
+        self.durable_seq = sealed.next_seq
+
+        segment = _Segment(self.directory, seq)
+        segment.next_seq = seq
+        self._fd = os.open(segment.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+        self._segments.append(segment)
+        self._apply_retention()
+        return segment
+
+    def _apply_retention(self):
+        total = self.total_bytes
+        now = time.time()
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            expired = False
+            if self.retention_seconds:
+                try:
+                    expired = now - os.path.getmtime(oldest.path) > self.retention_seconds
+                except FileNotFoundError:
+                    expired = True
+            if not expired and (not self.retention_bytes or total <= self.retention_bytes):
+                break
+            total -= oldest.size
+            self._segments.pop(0)
+            oldest.delete()
+
+    def sync(self):
+        """Flush appended records to disk now"""
+        with self._lock:
+            if not self._dirty:
+                return
+            fd = os.dup(self._fd)
+            seq = self.next_seq
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.durable_seq = max(self.durable_seq, seq)
+        self.syncs += 1
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except OSError as e:
+                self.logger.error(f"Error syncing alert log: {str(e)}")
+
+    def close(self):
+        """Stop the sync thread, flush and close the log"""
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.sync()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            for segment in self._segments:
+                segment.close()
+
+    def iter_records(self, from_seq=0):
+        """
+        Iterate over stored alerts starting at from_seq
+
+        Yields:
+            tuple: (seq, processed alert, payload size)
+        """
+        with self._lock:
+            segments = list(self._segments)
+        pos = max(bisect.bisect_right([segment.base_seq for segment in segments], from_seq) - 1, 0)
+
+        for segment in segments[pos:]:
+            if segment.next_seq <= from_seq:
+                continue
+            sealed = segment is not segments[-1]
+            try:
+                mapped = segment.mapping(sealed)
+            except (FileNotFoundError, ValueError):
+                # Deleted by retention while we were reading
+                continue
+            if mapped is None:
+                continue
+            try:
+                end = min(segment.size, len(mapped))
+                for seq, size, start, stop in _scan(mapped, segment.offset_for(from_seq), end):
+                    if seq >= from_seq:
+                        yield seq, json.loads(mapped[start:stop]), size
+            except ValueError:
+                # Mapping closed by retention mid-read
+                continue
+            finally:
+                if not sealed:
+                    mapped.close()
+
+    def read(self, from_seq, limit=50, predicate=None):
+        """
+        Read up to limit alerts with seq >= from_seq, oldest first
+
+        Args:
+            from_seq: First sequence number to return
+            limit: Maximum number of alerts
+            predicate: Optional callable filtering processed alerts
+
+        Returns:
+            list: (seq, processed alert, payload size) tuples
+        """
+        results = []
+        if limit is None or limit <= 0:
+            return results
+        for seq, alert, size in self.iter_records(from_seq):
+            if predicate is None or predicate(alert):
+                results.append((seq, alert, size))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def replay(self, max_records):
+        """
+        Iterate over the newest max_records alerts, touching only tail segments
+
+        Yields:
+            tuple: (seq, processed alert, payload size)
+        """
+        return self.iter_records(max(self.first_seq, self.next_seq - max_records))
@@ -0,0 +1,125 @@
+import base64
+import json
+
+from alert_store import AlertRecord
+from raw_alert import encode_alert
+
+# Fields a client may request with fields=; seq is the alert sequence number
+FIELDS = ("seq",) + AlertRecord.FIELDS
+
+# Fields AlertRecord derives when de-duplication has not set them
+OCCURRENCE_FIELDS = ("occurrences", "first_seen", "last_seen")
+
+CURSOR_PREFIX = "s:"
+
+# Encoded alerts are buffered up to this many bytes per response chunk
+CHUNK_BYTES = 64 * 1024
+
+
+def encode_cursor(seq):
+    """Opaque page cursor for an alert sequence number"""
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Sequence number behind a cursor from encode_cursor
+
+    Raises:
+        ValueError: If the token is not a valid cursor
+    """
+    try:
+        text = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    if not text.startswith(CURSOR_PREFIX) or not text[len(CURSOR_PREFIX):].isdigit():
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return int(text[len(CURSOR_PREFIX):])
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated fields= projection
+
+    Returns:
+        tuple: Requested fields in FIELDS order, or None for the full alert
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested.difference(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in FIELDS if name in requested)
+
+
+def project(seq, alert, fields):
+    """
+    Build the response dict for one alert
+
+    Args:
+        seq: Alert sequence number
+        alert: AlertRecord or processed alert dict
+        fields: Fields to include, or None for the full alert
+    """
+    if isinstance(alert, AlertRecord):
+        if fields is None:
+            return alert.to_dict()
+        return {name: seq if name == "seq" else getattr(alert, name) for name in fields}
+    if fields is None:
+        return dict(alert, **{name: _dict_field(alert, name) for name in OCCURRENCE_FIELDS})
+    return {name: seq if name == "seq" else _dict_field(alert, name) for name in fields}
+
+
+def _dict_field(alert, name):
+    # Persisted alerts only carry occurrence counts once a repeat was folded in
+    if name in alert:
+        return alert[name]
+    if name == "occurrences":
+        return 1
+    if name in ("first_seen", "last_seen"):
+        return alert.get("timestamp")
+    return None
+
+
+def iter_page_json(entries, fields=None, extra=None):
+    """
+    Encode a page of alerts as JSON, one bounded chunk at a time
+
+    Alerts are encoded as they are consumed, so the memory needed for the
+    response does not grow with the page or with the raw alert sizes.
+    Raw alerts kept as bytes are spliced in without re-encoding. The
+    object carries ``alerts``, ``total_alerts`` and the ``extra`` keys.
+
+    Args:
+        entries: Iterable of (seq, alert) pairs, oldest first
+        fields: Projection from parse_fields
+        extra: Further top-level keys, encoded after the alerts
+
+    Yields:
+        bytes: Response body chunks
+    """
+    buffer = [b'{"alerts":[']
+    buffered = 0
+    total = 0
+    for seq, alert in entries:
+        encoded = encode_alert(project(seq, alert, fields))
+        if total:
+            buffer.append(b",")
+        buffer.append(encoded)
+        buffered += len(encoded)
+        total += 1
+        if buffered >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+
+    tail = [f'],"total_alerts":{total}']
+    for key, value in (extra or {}).items():
+        tail.append(f",{json.dumps(key)}:{json.dumps(value, default=str)}")
+    tail.append("}")
+    buffer.append("".join(tail).encode())
+    yield b"".join(buffer)
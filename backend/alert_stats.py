@@ -0,0 +1,168 @@
+import threading
+import time
+
+
+class TimeBuckets:
+    """
+    Ring of fixed-width time buckets holding alert counters
+
+    Each slot covers ``width`` seconds and the ring spans ``count`` slots.
+    A slot is reset the first time it is written after its window has
+    rolled over, so old counts expire without any background work.
+    """
+
+    def __init__(self, width, count):
+        self.width = width
+        self.count = count
+        self._starts = [None] * count
+        self._totals = [0] * count
+        self._levels = [None] * count
+        self._agents = [None] * count
+        self._rules = [None] * count
+
+    @property
+    def span(self):
+        return self.width * self.count
+
+    def add(self, ts, level, agent, rule):
+        index = int(ts // self.width)
+        slot = index % self.count
+        start = index * self.width
+
+        if self._starts[slot] != start:
+            self._starts[slot] = start
+            self._totals[slot] = 0
+            self._levels[slot] = {}
+            self._agents[slot] = {}
+            self._rules[slot] = {}
+
+        self._totals[slot] += 1
+        _increment(self._levels[slot], level)
+        _increment(self._agents[slot], agent)
+        _increment(self._rules[slot], rule)
+
+    def collect(self, since, now):
+        """
+        Sum every live bucket that overlaps [since, now]
+
+        The bucket containing ``since`` is counted whole, so results are
+        accurate to one bucket width.
+        """
+        oldest = now - self.span
+        total = 0
+        levels = {}
+        agents = {}
+        rules = {}
+        timeline = []
+
+        for slot in range(self.count):
+            start = self._starts[slot]
+            if start is None or start + self.width <= since or start + self.width <= oldest or start > now:
+                continue
+            total += self._totals[slot]
+            _merge(levels, self._levels[slot])
+            _merge(agents, self._agents[slot])
+            _merge(rules, self._rules[slot])
+            timeline.append((start, self._totals[slot]))
+
+        timeline.sort()
+        return total, levels, agents, rules, timeline
+
+
+class AlertStats:
+    """
+    Incrementally maintained alert statistics
+
+    Lifetime counters by level, agent and rule are updated in O(1) per
+    alert. Two bucket rings (per ``interval`` seconds, default one minute,
+    and per hour) answer windowed queries without touching stored alerts.
+    """
+
+    def __init__(self, interval=60, minute_buckets=60, hour_buckets=24 * 7):
+        self.total = 0
+        self.level_counts = {}
+        self.agent_counts = {}
+        self.rule_counts = {}
+        self.first_seen = None
+        self.last_seen = None
+
+        self.minutes = TimeBuckets(interval, minute_buckets)
+        self.hours = TimeBuckets(3600, hour_buckets)
+
+        self._lock = threading.Lock()
+
+    def add(self, level, agent, rule, ts=None):
+        """
+        Account for one alert
+
+        Args:
+            level: Rule level
+            agent: Agent name
+            rule: Rule ID
+            ts: Epoch seconds the alert was received (defaults to now)
+        """
+        if ts is None:
+            ts = time.time()
+
+        with self._lock:
+            self.total += 1
+            _increment(self.level_counts, level)
+            _increment(self.agent_counts, agent)
+            _increment(self.rule_counts, rule)
+
+            if self.first_seen is None:
+                self.first_seen = ts
+            self.last_seen = ts
+
+            self.minutes.add(ts, level, agent, rule)
+            self.hours.add(ts, level, agent, rule)
+
+    def snapshot(self, since=None, now=None):
+        """
+        Return counters for all alerts, or for alerts received since a time
+
+        Args:
+            since: Epoch seconds; None returns lifetime counters
+            now: Current epoch seconds (defaults to now)
+
+        Returns:
+            dict: Totals and breakdowns by level, agent and rule
+        """
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            if since is None:
+                return {
+                    "total_alerts": self.total,
+                    "alerts_by_level": dict(self.level_counts),
+                    "alerts_by_agent": dict(self.agent_counts),
+                    "alerts_by_rule": dict(self.rule_counts),
+                }
+
+            # Use the finest ring that still covers the requested window
+            buckets = self.minutes if since >= now - self.minutes.span else self.hours
+            total, levels, agents, rules, timeline = buckets.collect(since, now)
+
+        return {
+            "total_alerts": total,
+            "alerts_by_level": levels,
+            "alerts_by_agent": agents,
+            "alerts_by_rule": rules,
+            "bucket_seconds": buckets.width,
+            "timeline": [{"start": start, "count": count} for start, count in timeline],
+            "window_truncated": since < now - buckets.span,
+        }
+
+
+def _increment(counts, key):
+    try:
+        counts[key] = counts.get(key, 0) + 1
+    except TypeError:
+        # Unhashable values from malformed alerts are counted as unknown
+        counts["N/A"] = counts.get("N/A", 0) + 1
+
+
+def _merge(target, source):
+    for key, count in source.items():
+        target[key] = target.get(key, 0) + count
@@ -0,0 +1,391 @@
+import heapq
+import threading
+from collections import deque
+
+from text_index import TextIndex, indexed_text
+
+
+# Rough per-record overhead (slots, index entries, summary strings) added to
+# the payload size when accounting against the byte budget
+RECORD_OVERHEAD = 512
+
+
+class AlertRecord:
+    """
+    Compact in-memory representation of a processed Wazuh alert
+
+    ``raw_alert`` is usually a RawAlert holding the original request bytes.
+    """
+
+    __slots__ = (
+        "seq",
+        "timestamp",
+        "alert_id",
+        "rule_id",
+        "rule_level",
+        "rule_description",
+        "agent_name",
+        "agent_ip",
+        "location",
+        "full_log",
+        "raw_alert",
+        "size",
+        "occurrences",
+        "last_seen",
+    )
+
+    FIELDS = (
+        "timestamp",
+        "alert_id",
+        "rule_id",
+        "rule_level",
+        "rule_description",
+        "agent_name",
+        "agent_ip",
+        "location",
+        "full_log",
+        "raw_alert",
+        "occurrences",
+        "first_seen",
+        "last_seen",
+    )
+
+    def __init__(self, seq, processed, size):
+        self.seq = seq
+        self.timestamp = processed["timestamp"]
+        self.alert_id = processed["alert_id"]
+        self.rule_id = processed["rule_id"]
+        self.rule_level = processed["rule_level"]
+        self.rule_description = processed["rule_description"]
+        self.agent_name = processed["agent_name"]
+        self.agent_ip = processed["agent_ip"]
+        self.location = processed["location"]
+        self.full_log = processed["full_log"]
+        self.raw_alert = processed["raw_alert"]
+        self.size = size
+        # Updated in place when ingest de-duplication folds repeats into this record
+        self.occurrences = processed.get("occurrences", 1)
+        self.last_seen = processed.get("last_seen", self.timestamp)
+
+    @property
+    def first_seen(self):
+        return self.timestamp
+
+    def to_dict(self):
+        """Return the alert as process_wazuh_alert shapes it, plus occurrence counts"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class AlertStore:
+    """
+    Fixed-capacity ring buffer of alerts with secondary indexes
+
+    Every alert gets a monotonically increasing sequence number. The
+    buffer keeps at most ``max_alerts`` records and at most ``max_bytes``
+    of accounted payload, evicting the oldest records first. Indexes by
+    rule level, agent name and rule ID hold sequence numbers in insertion
+    order, so eviction only ever pops from their left end. With
+    ``search_index`` the words of each alert's text go into a TextIndex,
+    which is pruned the same way.
+    """
+
+    def __init__(self, max_alerts=10000, max_bytes=64 * 1024 * 1024, search_index=False):
+        if max_alerts <= 0:
+            raise ValueError("max_alerts must be positive")
+
+        self.max_alerts = max_alerts
+        self.max_bytes = max_bytes
+
+        self._slots = [None] * max_alerts
+        self._head_seq = 0
+        self._next_seq = 0
+        self._bytes = 0
+
+        self._by_level = {}
+        self._by_agent = {}
+        self._by_rule = {}
+        self._text = TextIndex() if search_index else None
+
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._next_seq - self._head_seq
+
+    @property
+    def next_seq(self):
+        """Sequence number the next added alert gets"""
+        return self._next_seq
+
+    @property
+    def total_bytes(self):
+        return self._bytes
+
+    @property
+    def search_words(self):
+        """Distinct words in the search index, or None without one"""
+        return len(self._text) if self._text is not None else None
+
+    def add(self, processed, size=0):
+        """
+        Store a processed alert
+
+        Args:
+            processed: Alert dict as returned by process_wazuh_alert
+            size: Size of the original alert payload in bytes
+
+        Returns:
+            AlertRecord: The stored record
+        """
+        size = (size or 0) + RECORD_OVERHEAD
+
+        with self._lock:
+            if len(self) == self.max_alerts:
+                self._evict_oldest()
+            while len(self) and self._bytes + size > self.max_bytes:
+                self._evict_oldest()
+
+            seq = self._next_seq
+            record = AlertRecord(seq, processed, size)
+
+            self._slots[seq % self.max_alerts] = record
+            self._next_seq = seq + 1
+            self._bytes += size
+
+            self._index(self._by_level, record.rule_level, seq)
+            self._index(self._by_agent, record.agent_name, seq)
+            self._index(self._by_rule, record.rule_id, seq)
+            if self._text is not None:
+                self._text.add(seq, record)
+
+            return record
+
+    def advance_to(self, seq):
+        """
+        Continue numbering at seq, e.g. after a durable log was replayed
+
+        Numbering never goes back. The store holds one consecutive run of
+        sequence numbers, so alerts already stored are evicted when it
+        jumps ahead.
+        """
+        with self._lock:
+            if seq == self._next_seq:
+                return
+            if seq < self._next_seq:
+                raise ValueError(f"Cannot advance a store at {self._next_seq} to {seq}")
+            while len(self):
+                self._evict_oldest()
+            self._head_seq = self._next_seq = seq
+
+    def get(self, seq):
+        """Return the record with the given sequence number, if still stored"""
+        if seq < self._head_seq or seq >= self._next_seq:
+            return None
+        record = self._slots[seq % self.max_alerts]
+        if record is None or record.seq != seq:
+            return None
+        return record
+
+    def latest(self):
+        """Return the most recently stored record"""
+        with self._lock:
+            if not len(self):
+                return None
+            return self._slots[(self._next_seq - 1) % self.max_alerts]
+
+    def query(self, min_level=None, agent=None, rule_id=None, limit=50, before_seq=None, after_seq=None):
+        """
+        Return the newest alerts matching the given filters
+
+        Args:
+            min_level: Only alerts with rule_level >= min_level
+            agent: Case-insensitive substring of the agent name
+            rule_id: Exact rule ID
+            limit: Maximum number of alerts to return
+            before_seq: Only alerts with seq < before_seq
+            after_seq: Only alerts with seq > after_seq; the oldest
+                matches are returned instead of the newest
+
+        Returns:
+            list: Matching records, oldest first
+        """
+        if limit is None or limit <= 0:
+            return []
+
+        needle = agent.lower() if agent else None
+
+        with self._lock:
+            low = self._head_seq if after_seq is None else max(self._head_seq, after_seq + 1)
+            high = self._next_seq if before_seq is None else min(self._next_seq, before_seq)
+            if low >= high:
+                return []
+
+            sources = []
+            if min_level:
+                sources.append([
+                    seqs for level, seqs in self._by_level.items()
+                    if isinstance(level, int) and level >= min_level
+                ])
+            if needle:
+                sources.append([
+                    seqs for name, seqs in self._by_agent.items()
+                    if isinstance(name, str) and needle in name.lower()
+                ])
+            if rule_id:
+                seqs = self._by_rule.get(rule_id)
+                sources.append([seqs] if seqs else [])
+
+            if not sources:
+                if after_seq is not None:
+                    seqs = range(low, min(high, low + limit))
+                else:
+                    seqs = range(max(low, high - limit), high)
+                return [self.get(seq) for seq in seqs]
+
+            # Walk the smallest index and check the remaining filters
+            # against the candidate records
+            sources.sort(key=lambda lists: sum(len(seqs) for seqs in lists))
+            driver = sources[0]
+
+            if after_seq is not None:
+                candidates = heapq.merge(*driver)
+            else:
+                candidates = heapq.merge(*(reversed(seqs) for seqs in driver), reverse=True)
+
+            results = []
+            for seq in candidates:
+                # Candidates come in walk order: skip up to the cursor,
+                # stop once past the other end of the range
+                if seq < low:
+                    if after_seq is None:
+                        break
+                    continue
+                if seq >= high:
+                    if after_seq is not None:
+                        break
+                    continue
+                record = self.get(seq)
+                if record is None:
+                    continue
+                if min_level and not (isinstance(record.rule_level, int) and record.rule_level >= min_level):
+                    continue
+                if needle and not (isinstance(record.agent_name, str) and needle in record.agent_name.lower()):
+                    continue
+                if rule_id and record.rule_id != rule_id:
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    break
+
+            if after_seq is None:
+                results.reverse()
+            return results
+
+    def search(self, groups, limit=50, before_seq=None, after_seq=None):
+        """
+        Return the newest alerts whose text matches a search query
+
+        Args:
+            groups: Parsed query from text_index.parse_query
+            limit: Maximum number of alerts to return
+            before_seq: Only alerts with seq < before_seq
+            after_seq: Only alerts with seq > after_seq; the oldest
+                matches are returned instead of the newest
+
+        Returns:
+            list: Matching records, oldest first
+        """
+        if self._text is None:
+            raise RuntimeError("The store has no search index")
+        if limit is None or limit <= 0:
+            return []
+
+        with self._lock:
+            low = self._head_seq if after_seq is None else max(self._head_seq, after_seq + 1)
+            high = self._next_seq if before_seq is None else min(self._next_seq, before_seq)
+            if low >= high:
+                return []
+
+            # Each group walks the postings of its rarest term; the other
+            # terms are checked against the candidate's text
+            drivers = []
+            for group in groups:
+                lists = None
+                for term in group:
+                    postings = self._text.postings(term)
+                    if postings is not None and (lists is None or sum(map(len, postings)) < sum(map(len, lists))):
+                        lists = postings
+                if lists is None:
+                    # No indexed word in the group: every alert is a candidate
+                    drivers = [[range(low, high)]]
+                    break
+                drivers.append(lists)
+            lists = [seqs for driver in drivers for seqs in driver]
+
+            if after_seq is not None:
+                candidates = heapq.merge(*lists)
+            else:
+                candidates = heapq.merge(*(reversed(seqs) for seqs in lists), reverse=True)
+
+            results = []
+            previous = None
+            for seq in candidates:
+                if seq == previous:
+                    continue
+                previous = seq
+                if seq < low:
+                    if after_seq is None:
+                        break
+                    continue
+                if seq >= high:
+                    if after_seq is not None:
+                        break
+                    continue
+                record = self.get(seq)
+                if record is None:
+                    continue
+                text = indexed_text(record)
+                if not any(all(term.matches(text) for term in group) for group in groups):
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    break
+
+            if after_seq is None:
+                results.reverse()
+            return results
+
+    def _index(self, index, key, seq):
+        try:
+            seqs = index.get(key)
+        except TypeError:
+            # Unhashable values coming from malformed alerts are not indexed
+            return
+        if seqs is None:
+            seqs = index[key] = deque()
+        seqs.append(seq)
+
+    def _unindex(self, index, key, seq):
+        try:
+            seqs = index.get(key)
+        except TypeError:
+            return
+        if seqs and seqs[0] == seq:
+            seqs.popleft()
+            if not seqs:
+                del index[key]
+
+    def _evict_oldest(self):
+        seq = self._head_seq
+        slot = seq % self.max_alerts
+        record = self._slots[slot]
+        self._slots[slot] = None
+        self._head_seq = seq + 1
+
+        if record is None:
+            return
+        self._bytes -= record.size
+        self._unindex(self._by_level, record.rule_level, seq)
+        self._unindex(self._by_agent, record.agent_name, seq)
+        self._unindex(self._by_rule, record.rule_id, seq)
+        if self._text is not None:
+            self._text.remove(seq, record)
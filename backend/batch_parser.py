@@ -0,0 +1,186 @@
+import codecs
+import json
+
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+# A value cut by the end of the buffer fails to decode, or decodes as a
+# shorter number, within this many characters of the end (a partial
+# literal, number or \uXXXX escape)
+_TRUNCATION_SLACK = 6
+
+
+def iter_alerts(stream, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally parse a batch of alerts from a file-like byte stream
+
+    The body may be a JSON array of alerts or newline-delimited JSON
+    (one alert per line). The stream is consumed ``chunk_size`` bytes at
+    a time, so the whole body is never buffered.
+
+    Args:
+        stream: Object with a ``read(size)`` method returning bytes
+        chunk_size: Number of bytes to read per call
+
+    Yields:
+        tuple: (alert, text, error) where ``text`` is the JSON source of
+        the item, so it can be kept without re-encoding, and ``error``
+        is None on success
+    """
+    reader = _ChunkReader(stream, chunk_size)
+
+    first = reader.peek_non_whitespace()
+    if first is None:
+        return
+    if first == "[":
+        yield from _iter_array(reader)
+    else:
+        yield from _iter_lines(reader)
+
+
+class _ChunkReader:
+    """Decode a byte stream into text chunks on demand"""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read one more chunk; returns False once the stream is exhausted"""
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self.decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        # Drop consumed text so the buffer only holds the unparsed tail
+        self.buf = self.buf[self.pos:] + self.decoder.decode(data)
+        self.pos = 0
+        return True
+
+    def grow(self):
+        """
+        Read until the unparsed text has doubled; returns False at EOF
+
+        Retrying a decode after each doubling keeps a value spanning many
+        chunks linear to parse rather than rescanning it once per chunk.
+        """
+        tail = self.buf[self.pos:]
+        parts = [tail]
+        size = len(tail)
+        while not self.eof and (len(parts) == 1 or size < 2 * len(tail)):
+            data = self.stream.read(self.chunk_size)
+            self.eof = not data
+            parts.append(self.decoder.decode(data, final=self.eof))
+            size += len(parts[-1])
+        self.buf = "".join(parts)
+        self.pos = 0
+        return size > len(tail)
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek_non_whitespace(self):
+        self.skip_whitespace()
+        if self.pos < len(self.buf):
+            return self.buf[self.pos]
+        return None
+
+
+def _iter_lines(reader):
+    while True:
+        newline = reader.buf.find("\n", reader.pos)
+        if newline == -1:
+            if reader.fill():
+                continue
+            line = reader.buf[reader.pos:]
+            reader.pos = len(reader.buf)
+            if line.strip():
+                yield _decode_line(line)
+            return
+
+        line = reader.buf[reader.pos:newline]
+        reader.pos = newline + 1
+        if line.strip():
+            yield _decode_line(line)
+
+
+def _decode_line(line):
+    try:
+        return json.loads(line), line, None
+    except ValueError as e:
+        return None, line, f"Invalid JSON: {e}"
+
+
+def _iter_array(reader):
+    decoder = json.JSONDecoder()
+
+    # Skip the opening bracket
+    reader.pos += 1
+    expect_value = True
+
+    while True:
+        char = reader.peek_non_whitespace()
+        if char is None:
+            yield None, "", "Unexpected end of JSON array"
+            return
+
+        if char == "]":
+            reader.pos += 1
+            char = reader.peek_non_whitespace()
+            if char is not None:
+                yield None, "", f"Unexpected data after JSON array, found {char!r}"
+            return
+
+        if not expect_value:
+            if char != ",":
+                yield None, "", f"Expected ',' or ']' in JSON array, found {char!r}"
+                return
+            reader.pos += 1
+            expect_value = True
+            continue
+
+        start = reader.pos
+        while True:
+            try:
+                item, end = decoder.raw_decode(reader.buf, reader.pos)
+            except ValueError as e:
+                # The value may simply be cut by the chunk boundary; a
+                # malformed one fails before the end and is reported
+                if _truncated(e, reader.buf) and reader.grow():
+                    start = reader.pos
+                    continue
+                yield None, "", f"Invalid JSON: {e}"
+                return
+
+            # A number near the buffer end may have been cut there ("1." of
+            # "1.5" decodes as 1), so only trust it once more data follows
+            if (not isinstance(item, (dict, list, str)) and len(reader.buf) - end <= _TRUNCATION_SLACK
+                    and not reader.eof):
+                reader.grow()
+                start = reader.pos
+                continue
+            break
+
+        reader.pos = end
+        expect_value = False
+        yield item, reader.buf[start:end], None
+
+
+def _truncated(error, buf):
+    """Whether a decode error may only mean the value continues past ``buf``"""
+    if not isinstance(error, json.JSONDecodeError):
+        return False
+    return error.msg.startswith("Unterminated string") or len(buf) - error.pos <= _TRUNCATION_SLACK
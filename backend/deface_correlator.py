@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+
+# Sub-buckets per sliding window; the window count is exact to 1/BUCKETS of it
+BUCKETS = 10
+
+# Changed paths kept per window and incident, for the aggregated event
+SAMPLE_PATHS = 10
+
+
+def path_prefix(path, depth):
+    """
+    Directory prefix of a file path, e.g. /var/www/html for depth 3
+
+    Windows paths are normalized to forward slashes and lower case.
+    """
+    if "\\" in path:
+        path = path.replace("\\", "/").lower()
+    parts = [part for part in path.split("/")[:-1] if part]
+    return "/" + "/".join(parts[:depth])
+
+
+class _Window:
+    """Change counter for one (agent, path prefix) over a sliding window"""
+
+    __slots__ = ("counts", "index", "total", "last_seen", "samples", "incident")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.index = None
+        self.total = 0
+        self.last_seen = 0.0
+        self.samples = deque(maxlen=SAMPLE_PATHS)
+        self.incident = None
+
+    def add(self, index):
+        """Count one change in sub-bucket index, expiring buckets that fell out"""
+        if self.index is None:
+            self.index = index
+        elif index > self.index:
+            # Each step clears one bucket; never more than a full ring
+            for step in range(self.index + 1, min(index, self.index + BUCKETS) + 1):
+                slot = step % BUCKETS
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+            self.index = index
+        self.counts[self.index % BUCKETS] += 1
+        self.total += 1
+
+
+class DefaceCorrelator:
+    """
+    Streaming detector for bursts of web file changes on one agent
+
+    Every syscheck alert is counted against its (agent, path prefix)
+    key in a sliding window of ``window`` seconds split into fixed
+    sub-buckets, so each key costs constant memory. When a key reaches
+    ``threshold`` changes, one aggregated "deface suspected" event is
+    emitted and an incident opens: further changes under that key are
+    counted into the incident and the per-file alerts are suppressed.
+    The incident closes after ``window`` seconds without changes. Keys
+    are kept in last-seen order and idle ones are dropped as new alerts
+    arrive, so the state only holds recently active directories.
+    """
+
+    def __init__(self, window=5, threshold=20, prefix_depth=3, max_keys=100000, history=100):
+        """
+        Args:
+            window: Sliding window length in seconds
+            threshold: Changes within the window that open an incident
+            prefix_depth: Directory components grouping files into one key
+            max_keys: Keys kept at most; the least recently active go first
+            history: Closed incidents kept for incidents()
+        """
+        if window <= 0 or threshold <= 0:
+            raise ValueError("window and threshold must be positive")
+
+        self.window = window
+        self.threshold = threshold
+        self.prefix_depth = prefix_depth
+        self.max_keys = max_keys
+        self.logger = logging.getLogger(__name__)
+
+        self.observed = 0
+        self.suppressed = 0
+        self.incidents_opened = 0
+
+        self._width = window / BUCKETS
+        self._windows = OrderedDict()
+        self._closed = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def observe(self, alert, now=None):
+        """
+        Count a processed alert if it is a syscheck file change
+
+        Args:
+            alert: Processed alert dict (raw_alert carries the syscheck path)
+            now: Event time in epoch seconds (default: current time)
+
+        Returns:
+            tuple: (suppress, event). suppress is True for per-file alerts
+            folded into an open incident; event is the aggregated
+            incident dict when this alert crossed the threshold.
+        """
+        raw = alert.get("raw_alert")
+        syscheck = raw.get("syscheck") if isinstance(raw, Mapping) else None
+        path = syscheck.get("path") if isinstance(syscheck, Mapping) else None
+        if not isinstance(path, str) or not path:
+            return False, None
+
+        if now is None:
+            now = time.time()
+        key = (alert.get("agent_name"), path_prefix(path, self.prefix_depth))
+
+        with self._lock:
+            self.observed += 1
+            self._expire(now)
+
+            state = self._windows.get(key)
+            if state is None:
+                state = self._windows[key] = _Window()
+                if len(self._windows) > self.max_keys:
+                    self._drop(*self._windows.popitem(last=False))
+            else:
+                self._windows.move_to_end(key)
+
+            state.last_seen = now
+            incident = state.incident
+            if incident is not None:
+                incident["count"] += 1
+                incident["last_seen"] = now
+                if len(incident["sample_paths"]) < SAMPLE_PATHS and path not in incident["sample_paths"]:
+                    incident["sample_paths"].append(path)
+                self.suppressed += 1
+                return True, None
+
+            state.add(int(now // self._width))
+            if path not in state.samples:
+                state.samples.append(path)
+            if state.total < self.threshold:
+                return False, None
+
+            incident = state.incident = {
+                "agent_name": key[0],
+                "path_prefix": key[1],
+                "count": state.total,
+                "window_seconds": self.window,
+                "opened_at": now,
+                "last_seen": now,
+                "sample_paths": list(state.samples),
+            }
+            self.incidents_opened += 1
+            return False, dict(incident, sample_paths=list(incident["sample_paths"]))
+
+    def _expire(self, now):
+        # Keys are in last-seen order, so idle ones are always at the front
+        cutoff = now - self.window
+        while self._windows:
+            key, state = next(iter(self._windows.items()))
+            if state.last_seen >= cutoff:
+                break
+            del self._windows[key]
+            self._drop(key, state)
+
+    def _drop(self, key, state):
+        incident = state.incident
+        if incident is None:
+            return
+        self._closed.append(incident)
+        self.logger.warning(
+            f"Deface incident closed on {key[0]} under {key[1]}: "
+            f"{incident['count']} changes in {incident['last_seen'] - incident['opened_at']:.1f}s"
+        )
+
+    def incidents(self, now=None):
+        """Return open and recently closed incidents, newest first"""
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            active = [dict(state.incident, active=True) for state in self._windows.values() if state.incident]
+            closed = [dict(incident, active=False) for incident in self._closed]
+        active.reverse()
+        closed.reverse()
+        return active + closed
+
+    def stats(self):
+        """Return counters for observed, suppressed and incident alerts"""
+        with self._lock:
+            return {
+                "tracked_keys": len(self._windows),
+                "observed": self.observed,
+                "suppressed": self.suppressed,
+                "incidents_opened": self.incidents_opened,
+                "active_incidents": sum(1 for state in self._windows.values() if state.incident),
+            }
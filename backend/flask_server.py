@@ -1,25 +1,170 @@
 #!/usr/bin/env python3
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import atexit
 import json
 import logging
 from datetime import datetime
 import os
+import threading
+import time
+
+from alert_archive import GROUPS, AlertArchive
+from alert_broker import AlertBroker
+from alert_db import AlertDatabase
+from alert_dedup import DEFAULT_FIELDS, AlertDeduplicator
+from alert_log import AlertLog
+from alert_page import FIELDS, decode_cursor, encode_cursor, iter_page_json, parse_fields, project
+from alert_stats import AlertStats
+from alert_store import AlertStore
+from batch_parser import iter_alerts
+from deface_correlator import DefaceCorrelator
+from ingest_pipeline import IngestPipeline
+from log_queue import setup_logging
+from metrics import StageMetrics, metric
+from raw_alert import RawAlert, decode_alert, encode_alert
+from rule_engine import DEFAULT_RULES, RuleEngine, load_rules
+from sharding import (
+    ShardClient, ShardForwarder, ShardStream, agent_of, decode_shard_cursor, encode_shard_cursor,
+    merge_metrics, merge_stats, scatter_page, shard_for
+)
+from text_index import parse_query
 
 app = Flask(__name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('./log/wazuh_flask_alerts.log'),
-        logging.StreamHandler()
-    ]
+# Configure logging; by default request and worker threads only enqueue
+# records and a listener thread does the file and console writes
+log_queue_handler = setup_logging(
+    './log/wazuh_flask_alerts.log',
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    asynchronous=os.environ.get("LOG_ASYNC", "true").lower() == "true",
+    json_format=os.environ.get("LOG_FORMAT", "text").lower() == "json",
+    console=os.environ.get("LOG_CONSOLE", "true").lower() == "true",
+    rate_limit=float(os.environ.get("LOG_RATE_LIMIT", 0)),
+    rate_burst=int(os.environ.get("LOG_RATE_BURST", 0)) or None,
+    queue_size=int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+)
+
+# Store alerts in a bounded in-memory ring buffer indexed by level, agent and
+# rule, plus a full-text index of their log text for /alerts/search
+SEARCH_ENABLED = os.environ.get("SEARCH_INDEX", "true").lower() == "true"
+alert_store = AlertStore(
+    max_alerts=int(os.environ.get("ALERT_STORE_MAX_ALERTS", 10000)),
+    max_bytes=int(os.environ.get("ALERT_STORE_MAX_BYTES", 64 * 1024 * 1024)),
+    search_index=SEARCH_ENABLED
+)
+
+# Running statistics, bucketed by STATS_INTERVAL seconds for windowed queries
+alert_stats = AlertStats(interval=int(os.environ.get("STATS_INTERVAL", 60)))
+
+# Optional durable alert log, replayed into the store on startup
+alert_log_dir = os.environ.get("ALERT_LOG_DIR")
+alert_log = None
+if alert_log_dir:
+    alert_log = AlertLog(
+        alert_log_dir,
+        segment_bytes=int(os.environ.get("ALERT_LOG_SEGMENT_BYTES", 64 * 1024 * 1024)),
+        sync_interval=int(os.environ.get("ALERT_LOG_SYNC_MS", 50)) / 1000,
+        retention_bytes=int(os.environ.get("ALERT_LOG_RETENTION_BYTES", 1024 * 1024 * 1024)),
+        retention_seconds=int(os.environ.get("ALERT_LOG_RETENTION_HOURS", 0)) * 3600 or None
+    )
+    atexit.register(alert_log.close)
+
+# Optional SQLite persistence; /alerts is then answered with indexed SQL
+alert_db_path = os.environ.get("ALERT_DB_PATH")
+alert_db = None
+if alert_db_path:
+    alert_db = AlertDatabase(
+        alert_db_path,
+        batch_size=int(os.environ.get("ALERT_DB_BATCH_SIZE", 500)),
+        batch_interval=int(os.environ.get("ALERT_DB_BATCH_MS", 200)) / 1000
+    )
+    atexit.register(alert_db.close)
+
+# Columnar, hour-partitioned archive of every stored alert for trend queries
+# (/alerts/aggregate); ARCHIVE_DIR keeps sealed partitions across restarts
+alert_archive = None
+if os.environ.get("ARCHIVE_ENABLED", "true").lower() == "true":
+    alert_archive = AlertArchive(
+        os.environ.get("ARCHIVE_DIR") or None,
+        retention_seconds=int(os.environ.get("ARCHIVE_RETENTION_DAYS", 90)) * 86400 or None
+    )
+    atexit.register(alert_archive.close)
+
+# Live /alerts/stream subscribers, each with a bounded event buffer
+alert_broker = AlertBroker(
+    buffer_size=int(os.environ.get("SSE_CLIENT_BUFFER", 1000)),
+    max_subscribers=int(os.environ.get("SSE_MAX_SUBSCRIBERS", 1000))
 )
 
-# Store alerts in memory (you might want to use a database in production)
-alerts_storage = []
+# Seconds between keep-alive comments on idle streams
+SSE_HEARTBEAT = int(os.environ.get("SSE_HEARTBEAT", 15))
+
+# Seconds a stream keeps collecting after an event, to batch writes to the client
+SSE_LINGER = int(os.environ.get("SSE_LINGER_MS", 20)) / 1000
+
+# Opt-in: repeats of a recently stored alert only bump its occurrence count,
+# and skip the log, the stream and the rule handlers
+dedup_window = int(os.environ.get("DEDUP_WINDOW", 0))
+dedup_fields = os.environ.get("DEDUP_FIELDS")
+alert_dedup = None
+if dedup_window > 0:
+    alert_dedup = AlertDeduplicator(
+        window=dedup_window,
+        fields=[field.strip() for field in dedup_fields.split(",")] if dedup_fields else DEFAULT_FIELDS,
+        max_entries=int(os.environ.get("DEDUP_MAX_ENTRIES", 100000))
+    )
+
+# Bursts of syscheck changes under one web root on one agent become a single
+# "deface suspected" alert; the per-file alerts of an open incident are dropped
+deface_correlator = DefaceCorrelator(
+    window=int(os.environ.get("DEFAULT_WINDOW_SIZE", 5)),
+    threshold=int(os.environ.get("DEFACE_THRESHOLD", 20)),
+    prefix_depth=int(os.environ.get("DEFACE_PREFIX_DEPTH", 3))
+)
+DEFACE_SUPPRESS = os.environ.get("DEFACE_SUPPRESS", "true").lower() == "true"
+DEFACE_LEVEL = int(os.environ.get("DEFACE_LEVEL", 12))
+
+# Latency histograms for each ingest stage, served on /metrics
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+stage_metrics = StageMetrics(("parse", "process", "store", "handlers"), enabled=METRICS_ENABLED)
+
+# Keeps store and log sequence numbers in step across ingest workers
+persist_lock = threading.Lock()
+
+# Alert handlers: a JSON rule table replaces the built-in examples
+rules_file = os.environ.get("ALERT_RULES_FILE")
+alert_rules = RuleEngine(load_rules(rules_file) if rules_file else DEFAULT_RULES)
+
+# Seconds a client is asked to wait when the ingest queue is full
+INGEST_RETRY_AFTER = int(os.environ.get("INGEST_RETRY_AFTER", 1))
+
+# Sharded serving (serve.py): each worker process owns the alerts of the agents
+# hashing to its shard and forwards the others; queries go to every shard
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", 1))
+SHARD_ID = int(os.environ.get("SHARD_ID", 0))
+shard_forwarder = None
+shard_client = None
+if SHARD_COUNT > 1:
+    shard_peers = os.environ["SHARD_PEERS"].split(",")
+    shard_forwarder = ShardForwarder(
+        shard_peers,
+        SHARD_ID,
+        batch_size=int(os.environ.get("SHARD_FORWARD_BATCH", 500)),
+        batch_interval=int(os.environ.get("SHARD_FORWARD_MS", 20)) / 1000,
+        max_pending=int(os.environ.get("SHARD_FORWARD_QUEUE", 20000))
+    )
+    atexit.register(shard_forwarder.close)
+    shard_client = ShardClient(shard_peers, timeout=float(os.environ.get("SHARD_TIMEOUT", 10)))
+
+# Alerts are accepted onto a bounded queue and processed by worker threads
+ingest_pipeline = IngestPipeline(
+    lambda item: process_queued_alert(item),
+    maxsize=int(os.environ.get("INGEST_QUEUE_SIZE", 10000)),
+    workers=int(os.environ.get("INGEST_WORKERS", 4))
+)
+ingest_pipeline.start()
+atexit.register(ingest_pipeline.stop)
 
 @app.route('/webhook/wazuh', methods=['POST'])
 def receive_wazuh_alert():
@@ -28,26 +173,259 @@ def receive_wazuh_alert():
     """
     try:
         # Get the JSON data from the request
+        start = time.perf_counter()
         alert_data = request.get_json()
         
         if not alert_data:
             return jsonify({"error": "No JSON data received"}), 400
         
-        # Extract key information from the alert
-        processed_alert = process_wazuh_alert(alert_data)
+        if not isinstance(alert_data, dict):
+            return jsonify({"error": "Alert must be a JSON object"}), 400
         
-        # Store the alert
-        alerts_storage.append(processed_alert)
+        # Keep the body bytes; the parsed dict is dropped once the alert is handled
+        body = request.get_data()
+        raw_alert = RawAlert(body, alert_data)
+        stage_metrics.observe("parse", time.perf_counter() - start)
         
-        # Log the alert
-        logging.info(f"Wazuh Alert Received: {processed_alert['rule_description']}")
+        # Alerts of agents owned by another shard are handed to that shard
+        if not shard_local_request():
+            owner = shard_for(agent_of(alert_data), SHARD_COUNT)
+            if owner != SHARD_ID:
+                if not shard_forwarder.submit_many({owner: [raw_alert.raw]}):
+                    return queue_full_response()
+                return jsonify({"status": "success", "message": "Alert queued"}), 200
         
-        return jsonify({"status": "success", "message": "Alert processed"}), 200
+        # Processing happens on the ingest workers
+        if not ingest_pipeline.submit((raw_alert, len(body))):
+            return queue_full_response()
+        
+        return jsonify({"status": "success", "message": "Alert queued"}), 200
         
     except Exception as e:
         logging.error(f"Error processing Wazuh alert: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/webhook/wazuh/batch', methods=['POST'])
+def receive_wazuh_alert_batch():
+    """
+    Webhook endpoint to receive many Wazuh alerts in one request
+    
+    The body is either a JSON array of alerts or NDJSON (one alert per
+    line). It is parsed incrementally and every item gets its own
+    accept/reject result. Accepted alerts are queued all or nothing:
+    429 means nothing was queued, 413 means the batch must be split.
+    """
+    results = []
+    queued = []
+    
+    try:
+        start = time.perf_counter()
+        for index, (alert_data, text, error) in enumerate(iter_alerts(request.stream)):
+            if error is None and (not isinstance(alert_data, dict) or not alert_data):
+                error = "Alert must be a non-empty JSON object"
+            
+            if error is None:
+                body = text.encode()
+                queued.append((RawAlert(body, alert_data), len(body)))
+                results.append({"index": index, "status": "accepted"})
+                # A batch that can never fit must be split by the sender;
+                # stop reading it rather than holding all of it
+                if len(queued) > ingest_pipeline.maxsize:
+                    return jsonify({
+                        "error": "Batch larger than ingest queue",
+                        "max_alerts": ingest_pipeline.maxsize
+                    }), 413
+            else:
+                results.append({"index": index, "status": "rejected", "error": error})
+            
+            # Each item's time from the end of the previous one
+            now = time.perf_counter()
+            stage_metrics.observe("parse", now - start)
+            start = now
+        
+    except Exception as e:
+        logging.error(f"Error processing Wazuh alert batch: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+    
+    if not results:
+        return jsonify({"error": "No alerts received"}), 400
+    
+    accepted = len(queued)
+    rejected = len(results) - accepted
+    
+    # Split off the alerts owned by other shards
+    forwarded = {}
+    if not shard_local_request():
+        local = []
+        for raw_alert, size in queued:
+            owner = shard_for(agent_of(raw_alert), SHARD_COUNT)
+            if owner == SHARD_ID:
+                local.append((raw_alert, size))
+            else:
+                forwarded.setdefault(owner, []).append(raw_alert.raw)
+        queued = local
+    
+    # All or nothing, so the sender can safely retry the whole batch; with
+    # sharding, a 429 for the local part may follow forwarded alerts, which
+    # the retry then delivers again (at-least-once)
+    if forwarded and not shard_forwarder.submit_many(forwarded):
+        return queue_full_response()
+    if queued and not ingest_pipeline.submit_many(queued):
+        return queue_full_response()
+    
+    logging.info(f"Wazuh Alert Batch Received: {accepted} accepted, {rejected} rejected")
+    
+    return jsonify({
+        "status": "success",
+        "accepted": accepted,
+        "rejected": rejected,
+        "results": results
+    }), 200
+
+def shard_local_request():
+    """
+    Whether the current request is answered from this process's alerts only
+    
+    True without sharding, and for requests on a worker's internal port
+    (forwarded alerts and per-shard queries from other workers).
+    """
+    return SHARD_COUNT == 1 or request.environ.get("wazuh.shard_local", False)
+
+def queue_full_response():
+    """
+    Backpressure response sent when the ingest queue is full
+    """
+    response = jsonify({"error": "Ingest queue full, retry later"})
+    response.headers["Retry-After"] = str(INGEST_RETRY_AFTER)
+    return response, 429
+
+def ingest_alert(alert_data, size=0):
+    """
+    Process a raw Wazuh alert, store it and update statistics
+    
+    Returns None if the alert was not stored: it repeated a recently
+    stored alert, or was folded into an open deface incident.
+    """
+    start = time.perf_counter()
+    processed_alert = process_wazuh_alert(alert_data)
+    stage_metrics.observe("process", time.perf_counter() - start)
+    
+    if alert_dedup is not None:
+        key = alert_dedup.fingerprint(processed_alert)
+        repeat, original = alert_dedup.check(key)
+        if repeat:
+            if original is not None and alert_db is not None:
+                alert_db.touch(original.seq, original.occurrences, original.last_seen)
+            return None
+    
+    suppress, incident = deface_correlator.observe(processed_alert)
+    if suppress and DEFACE_SUPPRESS:
+        if alert_dedup is not None:
+            alert_dedup.discard(key)
+        return None
+    
+    start = time.perf_counter()
+    try:
+        record = persist_alert(processed_alert, size=size)
+    except Exception:
+        if alert_dedup is not None:
+            alert_dedup.discard(key)
+        raise
+    stage_metrics.observe("store", time.perf_counter() - start)
+    
+    if alert_dedup is not None:
+        alert_dedup.attach(key, record)
+        if record.occurrences > 1 and alert_db is not None:
+            alert_db.touch(record.seq, record.occurrences, record.last_seen)
+    
+    if incident is not None:
+        report_deface_incident(incident, processed_alert)
+    
+    return processed_alert
+
+def persist_alert(processed_alert, size=0):
+    """
+    Store, log and publish a processed alert and count it in the statistics
+    
+    Returns:
+        AlertRecord: The stored record
+    
+    Raises:
+        Exception: If the alert log could not take the alert; nothing was stored
+    """
+    with persist_lock:
+        if alert_log is not None:
+            # Logged first: an alert the log fails to take is not stored
+            # either, so store and log keep the same numbering
+            seq = alert_store.next_seq
+            try:
+                alert_log.append(seq, processed_alert, size=size)
+            except Exception as e:
+                logging.error(f"Could not append alert {seq} to the alert log: {e}")
+                raise
+        record = alert_store.add(processed_alert, size=size)
+        if alert_db is not None:
+            alert_db.add(record.seq, processed_alert, size=size)
+    # Outside the lock so stream fan-out does not hold up ingestion; the
+    # broker puts concurrently published alerts back in sequence order
+    alert_broker.publish(record.seq, processed_alert)
+    alert_stats.add(
+        processed_alert['rule_level'],
+        processed_alert['agent_name'],
+        processed_alert['rule_id']
+    )
+    if alert_archive is not None:
+        alert_archive.add(
+            record.seq,
+            processed_alert['rule_level'],
+            processed_alert['agent_name'],
+            processed_alert['rule_id']
+        )
+    
+    return record
+
+def report_deface_incident(incident, trigger):
+    """
+    Store and handle the aggregated alert for a newly opened deface incident
+    """
+    deface_alert = {
+        "timestamp": datetime.now().isoformat(),
+        "alert_id": f"deface-{incident['opened_at']:.6f}",
+        "rule_id": "deface_suspected",
+        "rule_level": DEFACE_LEVEL,
+        "rule_description": (
+            f"Defacement suspected: {incident['count']} files changed under "
+            f"{incident['path_prefix']} within {incident['window_seconds']}s"
+        ),
+        "agent_name": incident['agent_name'],
+        "agent_ip": trigger['agent_ip'],
+        "location": "deface-correlator",
+        "full_log": "\n".join(incident['sample_paths']),
+        "raw_alert": incident
+    }
+    persist_alert(deface_alert)
+    logging.warning(f"{deface_alert['rule_description']} on {incident['agent_name']}")
+    handle_specific_alerts(deface_alert)
+
+def process_queued_alert(item):
+    """
+    Ingest worker: normalize, persist and run the rule handlers
+    """
+    alert_data, size = item
+    try:
+        processed_alert = ingest_alert(alert_data, size=size)
+        if processed_alert is None:
+            return
+        
+        logging.debug("Wazuh Alert Received: %s", processed_alert['rule_description'])
+        
+        start = time.perf_counter()
+        handle_specific_alerts(processed_alert)
+        stage_metrics.observe("handlers", time.perf_counter() - start)
+    finally:
+        # The stored record keeps only the original bytes
+        alert_data.release()
+
 def process_wazuh_alert(alert_data):
     """
     Process and extract relevant information from Wazuh alert
@@ -67,73 +445,639 @@ def process_wazuh_alert(alert_data):
     
     return processed
 
+def handle_specific_alerts(alert):
+    """
+    Handle specific types of alerts with custom logic
+    
+    Handlers are declared in the rule table (rule_engine.DEFAULT_RULES,
+    or ALERT_RULES_FILE) and dispatched through the compiled lookups.
+    """
+    return alert_rules.dispatch(alert)
+
 @app.route('/alerts', methods=['GET'])
 def get_alerts():
     """
     API endpoint to retrieve stored alerts
+    
+    Pages are addressed with the opaque cursors returned in ``cursors``:
+    ``before`` fetches the next older page, ``after`` the next newer one
+    (oldest first, for polling). ``fields`` limits each alert to a
+    comma-separated list of fields, e.g. to leave out ``raw_alert``.
+    The body is streamed, so large pages are never built in memory.
     """
+    if not shard_local_request():
+        return scatter_alerts()
+    
     # Get query parameters for filtering
     limit = request.args.get('limit', 50, type=int)
     level_filter = request.args.get('level', type=int)
     agent_filter = request.args.get('agent')
+    rule_filter = request.args.get('rule_id')
+    from_seq = request.args.get('from_seq', type=int)
     
-    filtered_alerts = alerts_storage
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        before = request.args.get('before')
+        after = request.args.get('after')
+        before_seq = decode_cursor(before) if before else request.args.get('before_seq', type=int)
+        after_seq = decode_cursor(after) if after else request.args.get('after_seq', type=int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Apply filters
-    if level_filter:
-        filtered_alerts = [a for a in filtered_alerts if a['rule_level'] >= level_filter]
+    # Historical ranges are read from the durable log, oldest first
+    if from_seq is not None:
+        if alert_log is None:
+            return jsonify({"error": "from_seq requires ALERT_LOG_DIR"}), 400
+        
+        entries = [(seq, alert) for seq, alert, _ in alert_log.read(
+            max(from_seq, 0),
+            limit=limit,
+            predicate=lambda alert: alert_matches(alert, level_filter, agent_filter, rule_filter)
+        )]
+        
+        return alerts_page_response(entries, fields, before, after, {
+            "next_seq": entries[-1][0] + 1 if entries else max(from_seq, alert_log.first_seq)
+        })
     
-    if agent_filter:
-        filtered_alerts = [a for a in filtered_alerts if agent_filter.lower() in a['agent_name'].lower()]
+    # With a database, filters and keyset paging run as indexed SQL
+    if alert_db is not None:
+        since = request.args.get('since')
+        if since:
+            since = parse_since(since)
+            if since is None:
+                return jsonify({"error": "Invalid 'since' value"}), 400
+        
+        entries = [(seq, alert) for seq, alert, _ in alert_db.query(
+            min_level=level_filter,
+            agent=agent_filter,
+            rule_id=rule_filter,
+            since=since or None,
+            before_seq=before_seq,
+            after_seq=after_seq,
+            limit=limit
+        )]
+        
+        return alerts_page_response(entries, fields, before, after, {
+            "next_before_seq": entries[0][0] if entries else None
+        })
     
-    # Limit results
-    filtered_alerts = filtered_alerts[-limit:]
+    # Filters are resolved through the store indexes
+    filtered_alerts = alert_store.query(
+        min_level=level_filter,
+        agent=agent_filter,
+        rule_id=rule_filter,
+        limit=limit,
+        before_seq=before_seq,
+        after_seq=after_seq
+    )
     
-    return jsonify({
-        "total_alerts": len(filtered_alerts),
-        "alerts": filtered_alerts
+    return alerts_page_response([(record.seq, record) for record in filtered_alerts], fields, before, after)
+
+def alerts_page_response(entries, fields, before=None, after=None, extra=None):
+    """
+    Stream a page of (seq, alert) entries with cursors to the adjacent pages
+    
+    An empty page hands back the cursors it was called with, so a client
+    polling with ``after`` keeps its position.
+    """
+    cursors = {
+        "before": encode_cursor(entries[0][0]) if entries else before,
+        "after": encode_cursor(entries[-1][0]) if entries else after
+    }
+    body = iter_page_json(entries, fields, dict(extra or {}, cursors=cursors))
+    return Response(body, mimetype='application/json')
+
+@app.route('/alerts/search', methods=['GET'])
+def search_alerts():
+    """
+    Full-text search over the stored alerts' full_log, rule_description
+    and location
+    
+    ``q`` holds whitespace-separated terms that must all match, ``OR``
+    between alternatives, ``"quoted phrases"`` and ``prefix*`` terms.
+    Paging (``limit``, ``before``, ``after``) and ``fields`` work as for
+    /alerts. Only alerts still in the in-memory store are searched.
+    """
+    if not SEARCH_ENABLED:
+        return jsonify({"error": "Search is disabled"}), 404
+    try:
+        groups = parse_query(request.args.get('q'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not shard_local_request():
+        return scatter_alerts('/alerts/search')
+    
+    limit = request.args.get('limit', 50, type=int)
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        before = request.args.get('before')
+        after = request.args.get('after')
+        before_seq = decode_cursor(before) if before else request.args.get('before_seq', type=int)
+        after_seq = decode_cursor(after) if after else request.args.get('after_seq', type=int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    matches = alert_store.search(groups, limit=limit, before_seq=before_seq, after_seq=after_seq)
+    return alerts_page_response([(record.seq, record) for record in matches], fields, before, after)
+
+def scatter_alerts(path='/alerts'):
+    """
+    Answer /alerts (or /alerts/search) with sharding: every shard returns
+    a page and the pages are merged by timestamp
+    
+    Takes the same parameters as /alerts, except ``from_seq``; the
+    cursors hold one position per shard.
+    """
+    if request.args.get('from_seq') is not None:
+        return jsonify({"error": "from_seq is not supported with sharding"}), 400
+    
+    limit = request.args.get('limit', 50, type=int)
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Shards always return seq and timestamp, which the merge needs
+    shard_fields = ",".join(
+        name for name in FIELDS if fields is None or name in fields or name in ("seq", "timestamp")
+    )
+    filters = {key: value for key, value in request.args.items() if key in ('level', 'agent', 'rule_id', 'since', 'q')}
+    try:
+        taken, next_before, next_after, missing = scatter_page(
+            lambda params: shard_client.gather(path, params), SHARD_COUNT, dict(filters, fields=shard_fields),
+            limit, before=request.args.get('before'), after=request.args.get('after')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if fields is None:
+        # Same shape as an unsharded full alert
+        entries = [(alert["seq"], {k: v for k, v in alert.items() if k != "seq"}) for _, alert in taken]
+    else:
+        entries = [(alert["seq"], alert) for _, alert in taken]
+    extra = {
+        "cursors": {"before": next_before, "after": next_after},
+        "missing_shards": missing
+    }
+    return Response(iter_page_json(entries, fields, extra), mimetype='application/json')
+
+@app.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """
+    Server-Sent Events stream of processed alerts
+    
+    Takes the ``level``, ``agent``, ``rule_id`` and ``fields`` filters of
+    /alerts. Event IDs are alert sequence numbers; a reconnecting client
+    sends ``Last-Event-ID`` (or ``last_event_id``) and first receives the
+    stored alerts it missed. A client that falls too far behind gets an
+    ``overflow`` event and is disconnected, so it can resume the same way.
+    """
+    if not shard_local_request():
+        return scatter_stream()
+    
+    level_filter = request.args.get('level', type=int)
+    agent_filter = request.args.get('agent')
+    rule_filter = request.args.get('rule_id')
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        last_seq = int(last_event_id) if last_event_id else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if len(alert_broker) >= alert_broker.max_subscribers:
+        return jsonify({"error": "Too many stream subscribers"}), 503
+    
+    def generate():
+        subscription = alert_broker.subscribe(
+            min_level=level_filter,
+            agent=agent_filter,
+            rule_id=rule_filter,
+            fields=fields
+        )
+        if subscription is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Too many stream subscribers'})}\n\n"
+            return
+        
+        try:
+            yield f"retry: {SSE_HEARTBEAT * 1000}\n\n"
+            
+            # Subscribed first, so nothing falls between backlog and live events
+            last = -1 if last_seq is None else last_seq
+            while last_seq is not None:
+                backlog = alert_store.query(
+                    min_level=level_filter,
+                    agent=agent_filter,
+                    rule_id=rule_filter,
+                    limit=500,
+                    after_seq=last
+                )
+                if not backlog:
+                    break
+                for record in backlog:
+                    payload = encode_alert(project(record.seq, record, fields)).decode()
+                    yield f"id: {record.seq}\nevent: alert\ndata: {payload}\n\n"
+                last = backlog[-1].seq
+            
+            if SHARD_COUNT > 1:
+                # Where this shard's part of a merged stream starts
+                position = last if last_seq is not None else alert_store.next_seq - 1
+                yield f"event: position\ndata: {position}\n\n"
+            
+            while True:
+                events = subscription.get(timeout=SSE_HEARTBEAT, linger=SSE_LINGER)
+                if subscription.overflowed:
+                    yield f"event: overflow\ndata: {json.dumps({'last_event_id': last})}\n\n"
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                chunk = []
+                for seq, payload in events:
+                    if seq > last:
+                        chunk.append(f"id: {seq}\nevent: alert\ndata: {payload}\n\n")
+                        last = seq
+                yield "".join(chunk)
+        finally:
+            alert_broker.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
     })
 
+def scatter_stream():
+    """
+    Answer /alerts/stream with sharding: the streams of every shard merged
+    into one
+    
+    Event IDs are shard cursors holding the last sequence number sent
+    from every shard, so ``Last-Event-ID`` resumes each shard where the
+    client left it. A shard stream that ends sends an ``error`` event
+    with the cursor to resume from.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        parse_fields(request.args.get('fields'))
+        positions = decode_shard_cursor(last_event_id, SHARD_COUNT) if last_event_id else [None] * SHARD_COUNT
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    filters = {key: value for key, value in request.args.items() if key in ('level', 'agent', 'rule_id', 'fields')}
+    params = [dict(filters, last_event_id=position) if position is not None else filters for position in positions]
+    
+    def generate():
+        stream = ShardStream(
+            shard_peers,
+            params,
+            positions,
+            maxsize=alert_broker.buffer_size,
+            timeout=shard_client.timeout,
+            read_timeout=2 * SSE_HEARTBEAT + shard_client.timeout
+        )
+        try:
+            yield f"retry: {SSE_HEARTBEAT * 1000}\n\n"
+            while True:
+                event = stream.get(timeout=SSE_HEARTBEAT)
+                if stream.overflowed:
+                    yield f"event: overflow\ndata: {json.dumps({'last_event_id': encode_shard_cursor(stream.positions)})}\n\n"
+                    return
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                shard, kind, event_id, data = event
+                if kind == "alert":
+                    seq = int(event_id)
+                    if stream.positions[shard] is None or seq > stream.positions[shard]:
+                        stream.positions[shard] = seq
+                        yield f"id: {encode_shard_cursor(stream.positions)}\nevent: alert\ndata: {data}\n\n"
+                elif kind == "position":
+                    if stream.positions[shard] is None:
+                        stream.positions[shard] = int(data)
+                elif kind == "overflow":
+                    yield f"event: overflow\ndata: {json.dumps({'last_event_id': encode_shard_cursor(stream.positions)})}\n\n"
+                    return
+                elif kind in ("end", "error"):
+                    error = {"error": f"Stream from shard {shard} ended", "last_event_id": encode_shard_cursor(stream.positions)}
+                    yield f"event: error\ndata: {json.dumps(error)}\n\n"
+                    return
+        finally:
+            stream.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+def alert_matches(alert, min_level=None, agent=None, rule_id=None):
+    """
+    Check a processed alert against the /alerts filters
+    """
+    level = alert.get('rule_level')
+    if min_level and not (isinstance(level, int) and level >= min_level):
+        return False
+    name = alert.get('agent_name')
+    if agent and not (isinstance(name, str) and agent.lower() in name.lower()):
+        return False
+    if rule_id and alert.get('rule_id') != rule_id:
+        return False
+    return True
+
 @app.route('/alerts/stats', methods=['GET'])
 def get_alert_stats():
     """
     Get basic statistics about alerts
+    
+    Optional ``since`` (ISO timestamp or epoch seconds) restricts the
+    counts to alerts received after that time.
     """
-    if not alerts_storage:
+    since = request.args.get('since')
+    if since:
+        since = parse_since(since)
+        if since is None:
+            return jsonify({"error": "Invalid 'since' value"}), 400
+    
+    if not shard_local_request():
+        responses = shard_client.gather('/alerts/stats', [dict(request.args)] * SHARD_COUNT)
+        stats = merge_stats(response for response in responses if response)
+        if not stats["total_alerts"] and since is None:
+            return jsonify({"message": "No alerts available"})
+        stats["missing_shards"] = [shard for shard, response in enumerate(responses) if response is None]
+        return jsonify(stats)
+    
+    stats = alert_stats.snapshot(since=since)
+    if not stats["total_alerts"] and since is None:
         return jsonify({"message": "No alerts available"})
     
-    # Calculate stats
-    total_alerts = len(alerts_storage)
+    # Stringify keys so mixed int/"N/A" levels serialize cleanly
+    for key in ("alerts_by_level", "alerts_by_agent", "alerts_by_rule"):
+        stats[key] = {str(k): v for k, v in stats[key].items()}
     
-    # Count by rule level
-    level_counts = {}
-    agent_counts = {}
+    latest = alert_store.latest()
+    stats["stored_alerts"] = len(alert_store)
+    stats["latest_alert"] = json.loads(encode_alert(latest.to_dict())) if latest else None
     
-    for alert in alerts_storage:
-        level = alert['rule_level']
-        agent = alert['agent_name']
-        
-        level_counts[level] = level_counts.get(level, 0) + 1
-        agent_counts[agent] = agent_counts.get(agent, 0) + 1
+    return jsonify(stats)
+
+@app.route('/alerts/aggregate', methods=['GET'])
+def aggregate_alerts():
+    """
+    Alert counts over long time ranges from the columnar archive
     
-    return jsonify({
-        "total_alerts": total_alerts,
-        "alerts_by_level": level_counts,
-        "alerts_by_agent": agent_counts,
-        "latest_alert": alerts_storage[-1] if alerts_storage else None
-    })
+    Optional ``since``/``until`` (ISO timestamp or epoch seconds) bound
+    the range; ``group_by`` picks breakdowns (level, agent, rule);
+    ``interval`` sets the timeline bucket in seconds (0: no timeline);
+    ``level``, ``agent`` and ``rule_id`` filter as for /alerts; ``top``
+    keeps only the largest groups of each breakdown.
+    """
+    if alert_archive is None:
+        return jsonify({"error": "The alert archive is disabled"}), 404
+    
+    since = until = None
+    for name in ('since', 'until'):
+        value = request.args.get(name)
+        if value:
+            parsed = parse_since(value)
+            if parsed is None:
+                return jsonify({"error": f"Invalid '{name}' value"}), 400
+            if name == 'since':
+                since = parsed
+            else:
+                until = parsed
+    group_by = [group for group in request.args.get('group_by', ",".join(GROUPS)).split(",") if group]
+    unknown = set(group_by).difference(GROUPS)
+    if unknown:
+        return jsonify({"error": f"Unknown group_by: {', '.join(sorted(unknown))}"}), 400
+    interval = request.args.get('interval', 3600, type=int)
+    if interval < 0:
+        return jsonify({"error": "interval must not be negative"}), 400
+    top = request.args.get('top', type=int)
+    
+    if not shard_local_request():
+        params = {key: value for key, value in request.args.items() if key != 'top'}
+        responses = shard_client.gather('/alerts/aggregate', [params] * SHARD_COUNT)
+        merged = merge_stats(response for response in responses if response)
+        result = {"total_alerts": merged["total_alerts"]}
+        result.update((f"alerts_by_{group}", merged[f"alerts_by_{group}"]) for group in group_by)
+        if interval:
+            result["bucket_seconds"] = interval
+            result["timeline"] = merged.get("timeline", [])
+        result["missing_shards"] = [shard for shard, response in enumerate(responses) if response is None]
+    else:
+        result = alert_archive.aggregate(
+            since=since,
+            until=until,
+            group_by=group_by,
+            interval=interval or None,
+            min_level=request.args.get('level', type=int),
+            agent=request.args.get('agent'),
+            rule_id=request.args.get('rule_id')
+        )
+    
+    if top is not None:
+        for group in group_by:
+            counts = result[f"alerts_by_{group}"]
+            result[f"alerts_by_{group}"] = dict(sorted(counts.items(), key=lambda item: -item[1])[:top])
+    return jsonify(result)
+
+def parse_since(value):
+    """
+    Parse a ``since`` query value into epoch seconds
+    
+    Returns None if the value is neither a number nor an ISO timestamp.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint
+    
+    With sharding, counts are summed over all shards and the status is
+    ``degraded`` while any shard does not answer (see ``missing_shards``).
     """
+    if not shard_local_request():
+        responses = shard_client.gather('/health', [{}] * SHARD_COUNT)
+        totals = {}
+        for response in responses:
+            for key, value in (response or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key not in ("shard", "shards"):
+                    totals[key] = totals.get(key, 0) + value
+        missing = [shard for shard, response in enumerate(responses) if response is None]
+        return jsonify(dict(
+            totals,
+            status="degraded" if missing else "healthy",
+            timestamp=datetime.now().isoformat(),
+            shard=SHARD_ID,
+            shards=SHARD_COUNT,
+            missing_shards=missing
+        ))
+    
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "total_alerts_received": len(alerts_storage)
+        "total_alerts_received": len(alert_store),
+        "store_bytes": alert_store.total_bytes,
+        "ingest_queue_depth": len(ingest_pipeline),
+        "db_pending": alert_db.pending if alert_db is not None else None,
+        "db_dropped": alert_db.dropped + alert_db.failed if alert_db is not None else None,
+        "stream_subscribers": len(alert_broker),
+        "shard": SHARD_ID,
+        "shards": SHARD_COUNT
     })
 
+@app.route('/ingest/stats', methods=['GET'])
+def get_ingest_stats():
+    """
+    Ingest queue depth, throughput counters and worker lag
+    
+    With sharding, counters are summed (lags: maximum) over all shards,
+    whose own stats are listed under ``shards``.
+    """
+    if not shard_local_request():
+        responses = shard_client.gather('/ingest/stats', [{}] * SHARD_COUNT)
+        totals = {}
+        for response in responses:
+            for key, value in (response or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = max(totals.get(key, 0), value) if key.endswith("seconds") else totals.get(key, 0) + value
+        return jsonify(dict(totals, shards=responses))
+    
+    return jsonify(dict(
+        ingest_pipeline.stats(),
+        stream=alert_broker.stats(),
+        dedup=alert_dedup.stats() if alert_dedup is not None else None,
+        forward=shard_forwarder.stats() if shard_forwarder is not None else None,
+        archive=alert_archive.stats() if alert_archive is not None else None,
+        db=alert_db.stats() if alert_db is not None else None,
+        log_dropped=log_queue_handler.dropped if log_queue_handler is not None else 0
+    ))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus text exposition of ingest counters, stage latencies and gauges
+    
+    Rates (alerts/s) are derived by the scraper from the _total counters.
+    With sharding, every shard's samples are included with a ``shard``
+    label. Disabled with METRICS_ENABLED=false.
+    """
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    
+    if not shard_local_request():
+        texts = shard_client.gather('/metrics', [{}] * SHARD_COUNT, text=True)
+        return Response(merge_metrics(texts), mimetype="text/plain; version=0.0.4")
+    
+    ingest = ingest_pipeline.stats()
+    stream = alert_broker.stats()
+    dedup = alert_dedup.stats() if alert_dedup is not None else {}
+    deface = deface_correlator.stats()
+    
+    lines = []
+    lines += metric("wazuh_listener_alerts_received_total", "counter",
+                    "Alerts accepted onto the ingest queue", ingest["enqueued"])
+    lines += metric("wazuh_listener_alerts_processed_total", "counter",
+                    "Alerts handled by the ingest workers", ingest["processed"])
+    lines += metric("wazuh_listener_alerts_failed_total", "counter",
+                    "Alerts whose processing raised an error", ingest["failed"])
+    lines += metric("wazuh_listener_alerts_rejected_total", "counter",
+                    "Alerts refused because the ingest queue was full", ingest["rejected"])
+    lines += metric("wazuh_listener_alerts_stored_total", "counter",
+                    "Alerts stored since startup", alert_stats.total)
+    lines += metric("wazuh_listener_alerts_folded_total", "counter",
+                    "Alerts not stored: repeats (dedup) or part of a deface incident (deface)",
+                    {"dedup": dedup.get("repeats", 0), "deface": deface["suppressed"]}, label="reason")
+    lines += stage_metrics.render("wazuh_listener_stage_duration_seconds",
+                                  "Time spent per alert in each ingest stage")
+    lines += metric("wazuh_listener_ingest_queue_depth", "gauge",
+                    "Alerts waiting for an ingest worker", ingest["queue_depth"])
+    lines += metric("wazuh_listener_ingest_queue_size", "gauge",
+                    "Capacity of the ingest queue", ingest["queue_size"])
+    lines += metric("wazuh_listener_ingest_oldest_queued_seconds", "gauge",
+                    "Age of the oldest queued alert", ingest["oldest_queued_seconds"])
+    lines += metric("wazuh_listener_store_alerts", "gauge",
+                    "Alerts held in memory", len(alert_store))
+    lines += metric("wazuh_listener_store_bytes", "gauge",
+                    "Accounted bytes of the alerts held in memory", alert_store.total_bytes)
+    lines += metric("wazuh_listener_store_max_bytes", "gauge",
+                    "Byte budget of the in-memory store", alert_store.max_bytes)
+    if SEARCH_ENABLED:
+        lines += metric("wazuh_listener_search_words", "gauge",
+                        "Distinct words in the full-text search index", alert_store.search_words)
+    lines += metric("wazuh_listener_db_pending", "gauge",
+                    "Alerts waiting for the next database batch",
+                    alert_db.pending if alert_db is not None else 0)
+    lines += metric("wazuh_listener_db_dropped_total", "counter",
+                    "Alerts not written to the database: write queue full (queue_full) or batch failed (error)",
+                    {"queue_full": alert_db.dropped if alert_db is not None else 0,
+                     "error": alert_db.failed if alert_db is not None else 0}, label="reason")
+    lines += metric("wazuh_listener_stream_subscribers", "gauge",
+                    "Connected /alerts/stream clients", stream["subscribers"])
+    lines += metric("wazuh_listener_stream_overflows_total", "counter",
+                    "Stream clients cut off for falling behind", stream["overflows"])
+    lines += metric("wazuh_listener_log_dropped_total", "counter",
+                    "Log records dropped because the log queue was full",
+                    log_queue_handler.dropped if log_queue_handler is not None else 0)
+    
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route('/deface/incidents', methods=['GET'])
+def get_deface_incidents():
+    """
+    Open and recently closed defacement incidents with correlator counters
+    """
+    return jsonify(dict(deface_correlator.stats(), incidents=deface_correlator.incidents()))
+
+def replay_alerts(source, name, next_seq):
+    """
+    Rebuild the in-memory store and statistics from the newest persisted alerts
+    
+    Args:
+        source: AlertLog or AlertDatabase to replay from
+        name: Log directory or database path, for the log message
+        next_seq: Sequence number new alerts continue at; at least the
+            next_seq of every persistence backend, so none reuses a number
+    """
+    replayed = 0
+    for seq, alert, size in source.replay(alert_store.max_alerts):
+        if seq != alert_store.next_seq:
+            # The first alert, or a gap left while this backend was off
+            alert_store.advance_to(seq)
+        with persist_lock:
+            alert_store.add(decode_alert(alert), size=size)
+        
+        try:
+            ts = datetime.fromisoformat(alert['timestamp']).timestamp()
+        except (TypeError, ValueError):
+            ts = None
+        alert_stats.add(alert['rule_level'], alert['agent_name'], alert['rule_id'], ts=ts)
+        # Alerts in partitions loaded from ARCHIVE_DIR are already archived
+        if alert_archive is not None and seq >= alert_archive.next_seq:
+            alert_archive.add(seq, alert['rule_level'], alert['agent_name'], alert['rule_id'], ts=ts)
+        replayed += 1
+    
+    # New alerts continue the persisted numbering
+    alert_store.advance_to(next_seq)
+    logging.info(f"Replayed {replayed} alerts from {name}")
+
+# Replay from the backend holding the newest alerts (the log on a tie); a
+# log enabled next to an existing database must not restart numbering at 0
+persisted = [(source, name) for source, name in ((alert_log, alert_log_dir), (alert_db, alert_db_path))
+             if source is not None]
+if persisted:
+    newest, newest_name = max(persisted, key=lambda entry: entry[0].next_seq)
+    replay_alerts(newest, newest_name, max(source.next_seq for source, _ in persisted))
+
 if __name__ == '__main__':
     # Create log directory if it doesn't exist
     os.makedirs('./log', exist_ok=True)
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+class IngestPipeline:
+    """
+    Bounded in-process queue drained by a pool of worker threads
+
+    The webhook only validates and enqueues alerts; normalization, rule
+    handlers and persistence run on the workers. When the queue is full
+    ``submit`` refuses the item so the caller can apply backpressure.
+    """
+
+    def __init__(self, handler, maxsize=10000, workers=4, name="ingest"):
+        """
+        Args:
+            handler: Callable invoked by a worker for every queued item
+            maxsize: Maximum number of queued items
+            workers: Number of worker threads
+            name: Prefix for worker thread names
+        """
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.name = name
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._unfinished = 0
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+
+    def __len__(self):
+        return len(self._items)
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        """Drain the queue and stop the workers"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, item):
+        """
+        Queue one item for processing
+
+        Returns:
+            bool: False if the queue is full
+        """
+        return self.submit_many((item,))
+
+    def submit_many(self, items):
+        """
+        Queue several items, all or nothing
+
+        Returns:
+            bool: False if the queue cannot take every item
+        """
+        now = time.monotonic()
+        with self._cond:
+            if len(self._items) + len(items) > self.maxsize:
+                self.rejected += len(items)
+                return False
+            for item in items:
+                self._items.append((now, item))
+            self.enqueued += len(items)
+            self._unfinished += len(items)
+            self._cond.notify(len(items))
+        return True
+
+    def join(self, timeout=None):
+        """
+        Wait until every queued item has been processed
+
+        Returns:
+            bool: False on timeout
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def stats(self):
+        """Return queue depth, throughput counters and worker lag"""
+        with self._cond:
+            oldest_age = time.monotonic() - self._items[0][0] if self._items else 0.0
+            return {
+                "queue_depth": len(self._items),
+                "queue_size": self.maxsize,
+                "workers": self.workers,
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "oldest_queued_seconds": round(oldest_age, 6),
+                "last_lag_seconds": round(self.last_lag, 6),
+                "avg_lag_seconds": round(self.avg_lag, 6),
+                "max_lag_seconds": round(self.max_lag, 6),
+            }
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._items:
+                    if not self._running:
+                        return
+                    self._cond.wait()
+                enqueued_at, item = self._items.popleft()
+
+                # Time the item spent waiting for a worker
+                lag = time.monotonic() - enqueued_at
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self.avg_lag += (lag - self.avg_lag) * 0.05
+
+            failed = False
+            try:
+                self.handler(item)
+            except Exception as e:
+                failed = True
+                logging.error(f"Error processing queued alert: {str(e)}")
+
+            with self._cond:
+                if failed:
+                    self.failed += 1
+                else:
+                    self.processed += 1
+                self._unfinished -= 1
+                if not self._unfinished:
+                    self._cond.notify_all()
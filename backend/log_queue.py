@@ -0,0 +1,151 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# wazuh/utils/log_queue.py carries a copy of the formatter, filter and
+# queue handler for the wazuh app; keep the two in step
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and exception"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name
+
+    Each logger may emit ``rate`` records per second with bursts of up
+    to ``burst``. Records over the limit are dropped; the next record
+    that passes notes how many were suppressed. One instance can be
+    shared by several handlers: a record is only counted once, however
+    many of them it passes through.
+    """
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.suppressed = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        passed = getattr(record, "rate_limit_passed", None)
+        if passed is not None:
+            return passed
+        record.rate_limit_passed = passed = self._take(record)
+        return passed
+
+    def _take(self, record):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, dropped = self._buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, dropped + 1)
+                self.suppressed += 1
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} messages suppressed)"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread
+
+    Records are put on a bounded queue without waiting; when the queue
+    is full (the writer is stalled) the record is dropped and counted.
+    Formatting is left to the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener = None
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Merge the arguments now, while they still hold their current values
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+def setup_logging(log_file, level=logging.INFO, asynchronous=True, json_format=False, console=True,
+                  rate_limit=0, rate_burst=None, queue_size=10000):
+    """
+    Configure the root logger for the listener
+
+    Args:
+        log_file: Path of the log file
+        level: Root log level
+        asynchronous: Write through a queue and a listener thread, so
+            callers never wait on disk or console I/O
+        json_format: Emit one JSON object per line instead of text
+        console: Also log to stderr
+        rate_limit: Records per second allowed per logger (0: unlimited)
+        rate_burst: Burst size for rate_limit
+        queue_size: Records buffered before new ones are dropped
+
+    Returns:
+        DroppingQueueHandler: The queue handler, or None in synchronous mode
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.FileHandler(log_file)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.handlers = []
+    root.setLevel(level)
+
+    front = handlers
+    queue_handler = None
+    if asynchronous:
+        queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        queue_handler.listener = listener
+        front = [queue_handler]
+
+    # One filter for all handlers, so file and console share the buckets.
+    # It sits on the handlers rather than the root logger, whose own
+    # filters never see records propagated from named loggers
+    rate_filter = RateLimitFilter(rate_limit, rate_burst) if rate_limit else None
+    for handler in front:
+        if rate_filter is not None:
+            handler.addFilter(rate_filter)
+        root.addHandler(handler)
+
+    return queue_handler
@@ -0,0 +1,93 @@
+import bisect
+import threading
+
+# Upper bounds in seconds of the stage latency buckets, 10 us to 1 s
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+# wazuh/services/metrics.py carries a copy for the Wazuh API client metrics,
+# since the wazuh app cannot import this module; keep the two in step
+class Histogram:
+    """
+    Latency histogram with buckets allocated up front
+
+    ``observe`` only bumps an existing counter under a lock; nothing is
+    allocated per observation.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        """Prometheus _bucket, _sum and _count lines"""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, bucket in zip(self.buckets + (None,), counts):
+            cumulative += bucket
+            le = "+Inf" if bound is None else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms for the ingest path
+
+    Stages are fixed at construction. With ``enabled=False`` observations
+    are ignored, so instrumented code only pays for reading the clock.
+    """
+
+    def __init__(self, stages, enabled=True, buckets=STAGE_BUCKETS):
+        self.enabled = enabled
+        self.histograms = {stage: Histogram(buckets) for stage in stages}
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histograms[stage].observe(seconds)
+
+    def render(self, name, help_text):
+        """Prometheus text for all stages as one histogram family"""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for stage, histogram in self.histograms.items():
+            lines.extend(histogram.samples(name, f'stage="{stage}"'))
+        return lines
+
+
+def metric(name, kind, help_text, value, label=None):
+    """
+    Prometheus text lines for a counter or gauge
+
+    Args:
+        name: Metric name
+        kind: "counter" or "gauge"
+        help_text: HELP description
+        value: Sample value, or a dict of label value -> sample
+        label: Label name when value is a dict
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    if label is None:
+        lines.append(f"{name} {value}")
+    else:
+        lines.extend(f'{name}{{{label}="{key}"}} {sample}' for key, sample in value.items())
+    return lines
@@ -0,0 +1,79 @@
+import json
+from collections.abc import Mapping
+
+
+class RawAlert(Mapping):
+    """
+    Original Wazuh alert kept as the JSON bytes it arrived in
+
+    Responses, the alert log and the database splice ``raw`` into their
+    output instead of re-encoding a parsed dict. The alert still reads as
+    a mapping for handlers that need nested fields: the parsed dict
+    handed over at ingest is used until ``release`` drops it, after which
+    the bytes are parsed again on first access.
+    """
+
+    __slots__ = ("raw", "_parsed")
+
+    def __init__(self, raw, parsed=None):
+        # Spliced bytes must be a single-line JSON object (SSE data lines)
+        if raw[:1] != b"{" or raw[-1:] != b"}" or b"\n" in raw or b"\r" in raw:
+            if parsed is None:
+                parsed = json.loads(raw)
+            raw = _dumps(parsed).encode()
+        self.raw = raw
+        self._parsed = parsed
+
+    @property
+    def parsed(self):
+        """The alert as a dict, parsed from the bytes if it was released"""
+        parsed = self._parsed
+        if parsed is None:
+            parsed = self._parsed = json.loads(self.raw)
+        return parsed
+
+    def release(self):
+        """Drop the parsed dict; only the bytes stay in memory"""
+        self._parsed = None
+
+    def __getitem__(self, key):
+        return self.parsed[key]
+
+    def __iter__(self):
+        return iter(self.parsed)
+
+    def __len__(self):
+        return len(self.parsed)
+
+    def __repr__(self):
+        return f"RawAlert({len(self.raw)} bytes)"
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def encode_alert(alert):
+    """
+    Compact JSON for a processed (or projected) alert dict
+
+    A RawAlert under ``raw_alert`` is spliced in as is, as the last key;
+    everything else is encoded normally.
+
+    Returns:
+        bytes: The encoded alert
+    """
+    raw = alert.get("raw_alert")
+    if not isinstance(raw, RawAlert):
+        return _dumps(alert).encode()
+    head = _dumps({key: value for key, value in alert.items() if key != "raw_alert"})
+    separator = ',"raw_alert":' if len(head) > 2 else '"raw_alert":'
+    return b"".join((head[:-1].encode(), separator.encode(), raw.raw, b"}"))
+
+
+def decode_alert(alert):
+    """Turn a plain ``raw_alert`` dict read back from storage into a RawAlert"""
+    raw = alert.get("raw_alert")
+    if isinstance(raw, dict):
+        alert["raw_alert"] = RawAlert(_dumps(raw).encode())
+    return alert
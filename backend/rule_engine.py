@@ -0,0 +1,316 @@
+import json
+import logging
+from collections import deque
+
+# Highest Wazuh rule level; larger values are treated as this level
+MAX_LEVEL = 16
+
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL
+}
+
+# The handlers that used to be hard-coded in handle_specific_alerts
+DEFAULT_RULES = [
+    {
+        "name": "high_severity",
+        "min_level": 12,
+        "log_level": "warning",
+        "message": "HIGH SEVERITY ALERT: {rule_description}"
+    },
+    {
+        "name": "ssh_brute_force",
+        "rule_ids": ["5710", "5712"],
+        "log_level": "warning",
+        "message": "SSH BRUTE FORCE DETECTED from {agent_ip}"
+    },
+    {
+        "name": "file_change",
+        "locations": ["syscheck"],
+        "log_level": "info",
+        "message": "FILE CHANGE DETECTED: {rule_description}"
+    },
+    {
+        "name": "auth_failure",
+        "keywords": ["authentication_failed"],
+        "log_level": "warning",
+        "message": "AUTH FAILURE: {rule_description} on {agent_name}"
+    }
+]
+
+
+class _AlertFields(dict):
+    """Format mapping that renders missing alert fields as N/A"""
+
+    def __missing__(self, key):
+        return "N/A"
+
+
+class Rule:
+    """
+    One alert handler and the conditions that trigger it
+
+    Conditions are ANDed; the values inside one condition are ORed
+    (any of ``rule_ids``, any location prefix, any description keyword).
+    """
+
+    __slots__ = ("name", "min_level", "rule_ids", "locations", "keywords", "action", "conditions")
+
+    def __init__(self, name, action, min_level=None, rule_ids=None, locations=None, keywords=None):
+        """
+        Args:
+            name: Rule name, used in logs
+            action: Callable invoked as action(alert, rule) when the rule matches
+            min_level: Match alerts with rule_level >= min_level (an integer or
+                numeric string)
+            rule_ids: Match any of these Wazuh rule IDs
+            locations: Match alerts whose location starts with any of these
+            keywords: Match descriptions containing any of these (case-insensitive)
+        """
+        if min_level is not None:
+            try:
+                min_level = int(min_level)
+            except (TypeError, ValueError):
+                raise ValueError(f"Rule {name!r} has an invalid min_level {min_level!r}") from None
+        self.name = name
+        self.action = action
+        self.min_level = min_level
+        self.rule_ids = frozenset(str(rule_id) for rule_id in rule_ids or ())
+        self.locations = tuple(dict.fromkeys(locations or ()))
+        self.keywords = frozenset(keyword.lower() for keyword in keywords or ())
+        self.conditions = (
+            (min_level is not None) + bool(self.rule_ids) + bool(self.locations) + bool(self.keywords)
+        )
+        if not self.conditions:
+            raise ValueError(f"Rule {name!r} has no conditions")
+
+    def check(self, level, rule_id, location, description):
+        """
+        Evaluate every condition against normalized alert fields
+
+        Args:
+            level: Integer rule level, or None
+            rule_id: Rule ID as a string
+            location: Alert location ("" if missing)
+            description: Lowercased rule description ("" if missing)
+        """
+        if self.min_level is not None and (level is None or level < self.min_level):
+            return False
+        if self.rule_ids and rule_id not in self.rule_ids:
+            return False
+        if self.locations and not location.startswith(self.locations):
+            return False
+        if self.keywords and not any(keyword in description for keyword in self.keywords):
+            return False
+        return True
+
+    @classmethod
+    def from_dict(cls, spec):
+        """
+        Build a rule from its declarative form
+
+        Besides the conditions, a spec has a ``message`` template formatted
+        with the processed alert fields and logged at ``log_level``.
+        """
+        name = spec.get("name", "unnamed")
+        level = LOG_LEVELS.get(str(spec.get("log_level", "info")).lower())
+        if level is None:
+            raise ValueError(f"Rule {name!r} has an unknown log_level {spec['log_level']!r}")
+        message = spec.get("message", f"RULE {name} MATCHED: {{rule_description}}")
+
+        def log_action(alert, rule):
+            logging.log(level, message.format_map(_AlertFields(alert)))
+
+        return cls(
+            name,
+            log_action,
+            min_level=spec.get("min_level"),
+            rule_ids=spec.get("rule_ids"),
+            locations=spec.get("locations"),
+            keywords=spec.get("keywords")
+        )
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a set of keywords
+
+    Finds every keyword in one pass over the text, so the cost depends
+    on the text length rather than the number of keywords.
+    """
+
+    def __init__(self, keywords):
+        """
+        Args:
+            keywords: Mapping of keyword to the values reported when it matches
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for keyword, values in keywords.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._out[state] += tuple(values)
+
+        # Breadth-first pass to link each state to its longest proper suffix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def search(self, text):
+        """
+        Returns:
+            set: Values of every keyword found in text
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class RuleEngine:
+    """
+    Dispatches alerts to the rules they match
+
+    The rule table is compiled once. Each rule is indexed under its most
+    selective condition only (rule IDs, then keywords, then location
+    prefixes, then level): a rule-ID dict, a keyword automaton for
+    descriptions, a location prefix dict probed once per distinct prefix
+    length and a per-level table. Those lookups yield a few candidates
+    whose remaining conditions are then checked, so dispatch cost follows
+    the number of candidate rules, not the size of the table.
+    """
+
+    def __init__(self, rules=()):
+        """
+        Args:
+            rules: Iterable of Rule objects or declarative rule dicts
+        """
+        self.rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+
+        by_level = [[] for _ in range(MAX_LEVEL + 1)]
+        by_rule_id = {}
+        by_location = {}
+        by_keyword = {}
+
+        for index, rule in enumerate(self.rules):
+            if rule.rule_ids:
+                for rule_id in rule.rule_ids:
+                    by_rule_id.setdefault(rule_id, []).append(index)
+            elif rule.keywords:
+                for keyword in rule.keywords:
+                    by_keyword.setdefault(keyword, []).append(index)
+            elif rule.locations:
+                for prefix in rule.locations:
+                    by_location.setdefault(prefix, []).append(index)
+            else:
+                for level in range(max(rule.min_level, 0), MAX_LEVEL + 1):
+                    by_level[level].append(index)
+
+        self._by_level = [tuple(indexes) for indexes in by_level]
+        self._by_rule_id = {key: tuple(indexes) for key, indexes in by_rule_id.items()}
+        self._by_location = {key: tuple(indexes) for key, indexes in by_location.items()}
+        self._location_lengths = sorted({len(prefix) for prefix in by_location})
+        self._keywords = KeywordMatcher(by_keyword) if by_keyword else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, alert):
+        """
+        Find the rules a processed alert satisfies
+
+        Returns:
+            list: Matching rules in table order
+        """
+        level = alert.get("rule_level")
+        if isinstance(level, int):
+            level = min(level, MAX_LEVEL)
+        else:
+            level = None
+        rule_id = str(alert.get("rule_id"))
+        location = alert.get("location")
+        if not isinstance(location, str):
+            location = ""
+        description = alert.get("rule_description")
+        description = str(description).lower() if description else ""
+
+        candidates = set()
+
+        if level is not None and level >= 0:
+            candidates.update(self._by_level[level])
+
+        indexes = self._by_rule_id.get(rule_id)
+        if indexes:
+            candidates.update(indexes)
+
+        for length in self._location_lengths:
+            if length > len(location):
+                break
+            indexes = self._by_location.get(location[:length])
+            if indexes:
+                candidates.update(indexes)
+
+        if self._keywords is not None and description:
+            candidates.update(self._keywords.search(description))
+
+        rules = self.rules
+        return [
+            rules[index] for index in sorted(candidates)
+            if rules[index].conditions == 1 or rules[index].check(level, rule_id, location, description)
+        ]
+
+    def dispatch(self, alert):
+        """
+        Run the action of every rule the alert matches
+
+        A failing action is logged and does not stop the others.
+
+        Returns:
+            list: Names of the rules that matched
+        """
+        matched = self.match(alert)
+        for rule in matched:
+            try:
+                rule.action(alert, rule)
+            except Exception as e:
+                logging.error(f"Error in alert rule {rule.name}: {str(e)}")
+        return [rule.name for rule in matched]
+
+
+def load_rules(path):
+    """
+    Load a declarative rule table from a JSON file (a list of rule specs)
+    """
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a JSON list of rules")
+    return specs
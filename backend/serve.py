@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Run the listener as several sharded worker processes
+
+Every worker is a full listener (store, log, database, correlator) that
+owns the alerts of the agents hashing to its shard. All workers accept
+on the same public port; alerts for another shard's agents are forwarded
+to that shard in batches, and queries (/alerts, the stats, /health,
+/metrics, /alerts/stream) are answered by querying every shard and
+merging the results. Workers also serve a private port on 127.0.0.1 for
+each other.
+
+ALERT_LOG_DIR, ARCHIVE_DIR and ALERT_DB_PATH are split per shard
+(shard-<n> subdirectory, -shard<n> file suffix). A worker that exits is restarted.
+
+Workers run werkzeug's threaded development server (a thread per
+connection, no request timeouts); run it behind a reverse proxy in
+production.
+
+Usage:
+    python3 serve.py --workers 4 --port 5001
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+
+
+def listen(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+def shard_environment(shard, workers, peers):
+    """Environment of one worker: its shard and its own storage paths"""
+    env = {
+        "SHARD_COUNT": str(workers),
+        "SHARD_ID": str(shard),
+        "SHARD_PEERS": ",".join(peers),
+    }
+    if os.environ.get("ALERT_LOG_DIR"):
+        env["ALERT_LOG_DIR"] = os.path.join(os.environ["ALERT_LOG_DIR"], f"shard-{shard}")
+    if os.environ.get("ARCHIVE_DIR"):
+        env["ARCHIVE_DIR"] = os.path.join(os.environ["ARCHIVE_DIR"], f"shard-{shard}")
+    if os.environ.get("ALERT_DB_PATH"):
+        root, ext = os.path.splitext(os.environ["ALERT_DB_PATH"])
+        env["ALERT_DB_PATH"] = f"{root}-shard{shard}{ext}"
+    return env
+
+
+def run_worker(env, host, public_fd, internal_fd):
+    """Worker process: serve the public and the internal socket"""
+    os.environ.update(env)
+    # atexit handlers (log, database, forwarder flushes) only run on a normal exit
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    from werkzeug.serving import make_server
+    import flask_server
+
+    app = flask_server.app
+
+    def internal_app(environ, start_response):
+        # Requests from other shards are answered from this shard only
+        environ["wazuh.shard_local"] = True
+        return app(environ, start_response)
+
+    internal = make_server("127.0.0.1", 0, internal_app, threaded=True, fd=internal_fd)
+    threading.Thread(target=internal.serve_forever, name="shard-internal", daemon=True).start()
+
+    public = make_server(host, 0, app, threaded=True, fd=public_fd)
+    try:
+        public.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(workers, host="0.0.0.0", port=5001, internal_port=0, ports=None):
+    """
+    Start the workers and restart any that exit, until SIGTERM or SIGINT
+
+    Args:
+        workers: Number of worker processes (shards)
+        host: Public interface
+        port: Public port; 0 picks a free one
+        internal_port: First internal port, one per worker; 0 picks free ones
+        ports: Optional queue that receives the bound public port
+    """
+    os.makedirs("log", exist_ok=True)
+    public = listen(host, port)
+    internal = [listen("127.0.0.1", internal_port + shard if internal_port else 0) for shard in range(workers)]
+    peers = [f"http://127.0.0.1:{sock.getsockname()[1]}" for sock in internal]
+    environments = [shard_environment(shard, workers, peers) for shard in range(workers)]
+
+    # Fork before anything starts threads; the workers inherit the sockets
+    context = multiprocessing.get_context("fork")
+    stopping = threading.Event()
+
+    def start(shard):
+        process = context.Process(
+            target=run_worker,
+            args=(environments[shard], host, public.fileno(), internal[shard].fileno()),
+            name=f"shard-{shard}"
+        )
+        process.start()
+        return process
+
+    def stop(*_):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    processes = [start(shard) for shard in range(workers)]
+    logging.info(f"Serving {workers} shards on {host}:{public.getsockname()[1]}")
+    if ports is not None:
+        ports.put(public.getsockname()[1])
+
+    while not stopping.wait(1):
+        for shard, process in enumerate(processes):
+            if not process.is_alive():
+                logging.error(f"Shard {shard} exited with {process.exitcode}, restarting")
+                processes[shard] = start(shard)
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(30)
+        if process.is_alive():
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (shards)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--internal-port", type=int, default=5101,
+                        help="First port of the workers' private listeners on 127.0.0.1")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - serve - %(levelname)s - %(message)s")
+    serve(args.workers, args.host, args.port, args.internal_port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+import base64
+import heapq
+import logging
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+CURSOR_PREFIX = "m:"
+
+
+def shard_for(agent, count):
+    """
+    Shard owning an agent's alerts
+
+    Uses CRC32 of the agent name rather than hash(), which differs between
+    processes, so every worker routes an agent to the same shard.
+    """
+    if count <= 1:
+        return 0
+    name = agent if isinstance(agent, str) else "N/A"
+    return zlib.crc32(name.encode("utf-8", "replace")) % count
+
+
+def agent_of(alert_data):
+    """Agent name of a raw Wazuh alert, as process_wazuh_alert extracts it"""
+    agent = alert_data.get("agent")
+    return agent.get("name", "N/A") if isinstance(agent, dict) else "N/A"
+
+
+class ShardForwarder:
+    """
+    Batches alerts received for other shards and posts them to their owners
+
+    Each peer has a bounded buffer drained by one thread, which sends
+    NDJSON bodies of up to ``batch_size`` alerts to the peer's batch
+    endpoint, at the latest ``batch_interval`` seconds after the first
+    alert arrived. Failed batches are retried with backoff; when a
+    peer's buffer is full, ``submit_many`` refuses the alerts so the
+    receiving endpoint can answer 429.
+    """
+
+    def __init__(self, peers, shard_id, batch_size=500, batch_interval=0.02, max_pending=20000,
+                 timeout=10, max_backoff=5):
+        """
+        Args:
+            peers: Internal base URL of every shard, indexed by shard ID
+            shard_id: This process's shard; it gets no forwarding thread
+            batch_size: Maximum alerts per forwarded request
+            batch_interval: Seconds to wait for a batch to fill
+            max_pending: Maximum buffered alerts per peer
+            timeout: Request timeout in seconds
+            max_backoff: Longest delay between retries in seconds
+        """
+        self.peers = list(peers)
+        self.shard_id = shard_id
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self._buffers = [deque() for _ in self.peers]
+        self._cond = threading.Condition()
+        self._running = True
+        self._threads = []
+
+        self.forwarded = 0
+        self.rejected = 0
+        self.retries = 0
+
+        for shard in range(len(self.peers)):
+            if shard == shard_id:
+                continue
+            thread = threading.Thread(target=self._drain, args=(shard,), name=f"shard-forward-{shard}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit_many(self, groups):
+        """
+        Buffer alerts for their owning shards, all or nothing
+
+        Args:
+            groups: Dict of shard ID -> list of single-line JSON alert bytes
+
+        Returns:
+            bool: False if a peer's buffer cannot take its alerts
+        """
+        with self._cond:
+            for shard, bodies in groups.items():
+                if len(self._buffers[shard]) + len(bodies) > self.max_pending:
+                    self.rejected += sum(len(bodies) for bodies in groups.values())
+                    return False
+            now = time.monotonic()
+            for shard, bodies in groups.items():
+                buffer = self._buffers[shard]
+                buffer.extend((now, body) for body in bodies)
+            self._cond.notify_all()
+        return True
+
+    def close(self, timeout=10):
+        """Send what is buffered and stop the forwarding threads"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": {shard: len(buffer) for shard, buffer in enumerate(self._buffers) if shard != self.shard_id},
+                "forwarded": self.forwarded,
+                "rejected": self.rejected,
+                "retries": self.retries,
+            }
+
+    def _drain(self, shard):
+        session = requests.Session()
+        url = f"{self.peers[shard]}/webhook/wazuh/batch"
+        buffer = self._buffers[shard]
+        backoff = 0.1
+        while True:
+            with self._cond:
+                while not buffer and self._running:
+                    self._cond.wait()
+                if not buffer:
+                    return
+                # Let the batch fill unless it is already full or we are stopping
+                wait = buffer[0][0] + self.batch_interval - time.monotonic()
+                while self._running and len(buffer) < self.batch_size and wait > 0:
+                    self._cond.wait(wait)
+                    wait = buffer[0][0] + self.batch_interval - time.monotonic()
+                batch = [buffer[i][1] for i in range(min(self.batch_size, len(buffer)))]
+
+            try:
+                response = session.post(url, data=b"\n".join(batch), timeout=self.timeout)
+                sent = response.status_code == 200
+                if not sent:
+                    logging.warning(f"Forwarding {len(batch)} alerts to shard {shard} failed: {response.status_code}")
+            except requests.RequestException as e:
+                sent = False
+                logging.warning(f"Forwarding {len(batch)} alerts to shard {shard} failed: {str(e)}")
+
+            with self._cond:
+                if sent:
+                    for _ in batch:
+                        buffer.popleft()
+                    self.forwarded += len(batch)
+                    backoff = 0.1
+                    continue
+                self.retries += 1
+                if not self._running:
+                    logging.error(f"Dropping {len(buffer)} alerts for shard {shard} on shutdown")
+                    buffer.clear()
+                    return
+                self._cond.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+class ShardClient:
+    """Sends one request to every shard in parallel"""
+
+    def __init__(self, peers, timeout=10):
+        self.peers = list(peers)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.peers), thread_name_prefix="shard-gather")
+
+    def gather(self, path, params_per_shard, text=False):
+        """
+        GET path on every shard
+
+        Args:
+            path: Request path, e.g. "/alerts"
+            params_per_shard: One query parameter dict per shard
+            text: Return response bodies as text instead of decoded JSON
+
+        Returns:
+            list: Decoded JSON response (or text) per shard, None for shards that failed
+        """
+        futures = [
+            self._pool.submit(self._get, peer + path, params, text)
+            for peer, params in zip(self.peers, params_per_shard)
+        ]
+        return [future.result() for future in futures]
+
+    def _get(self, url, params, text=False):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        try:
+            response = session.get(url, params=params, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.text if text else response.json()
+            logging.warning(f"Shard request {url} failed: {response.status_code}")
+        except (requests.RequestException, ValueError) as e:
+            logging.warning(f"Shard request {url} failed: {str(e)}")
+        return None
+
+
+class ShardStream:
+    """
+    The /alerts/stream of every shard, merged into one event sequence
+
+    One thread per shard reads that shard's Server-Sent Events into a
+    shared bounded queue, so a slow client costs one buffer rather than
+    one per shard. ``positions`` holds the last alert sequence number
+    seen from each shard, which is what a resume cursor must carry.
+    """
+
+    def __init__(self, peers, params_per_shard, positions, maxsize=1000, timeout=10, read_timeout=60):
+        """
+        Args:
+            peers: Internal base URL of every shard
+            params_per_shard: Query parameters of each shard's stream request
+            positions: Last sequence number already delivered per shard (None: none)
+            maxsize: Events buffered before the merged stream overflows
+            timeout: Connect timeout in seconds
+            read_timeout: Seconds without data (not even a keep-alive) after
+                which a shard counts as gone
+        """
+        self.positions = list(positions)
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._responses = []
+        self._lock = threading.Lock()
+        for shard, (peer, params) in enumerate(zip(peers, params_per_shard)):
+            thread = threading.Thread(
+                target=self._read,
+                args=(shard, peer + "/alerts/stream", params, (timeout, read_timeout)),
+                name=f"shard-stream-{shard}",
+                daemon=True
+            )
+            thread.start()
+
+    def get(self, timeout=None):
+        """
+        Next event from any shard
+
+        Returns:
+            tuple: (shard, event type, event ID, data), or None on timeout.
+            A shard whose stream ended yields an ``end`` event.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Disconnect from every shard"""
+        with self._lock:
+            self._closed = True
+            responses = list(self._responses)
+        for response in responses:
+            response.close()
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def _read(self, shard, url, params, timeout):
+        error = "stream ended"
+        try:
+            response = requests.get(url, params=params, stream=True, timeout=timeout)
+            with self._lock:
+                if self._closed:
+                    response.close()
+                    return
+                self._responses.append(response)
+            if response.status_code != 200:
+                error = f"status {response.status_code}"
+            else:
+                event = {}
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        if not line.startswith(":"):
+                            field, _, value = line.partition(":")
+                            event[field] = value[1:] if value.startswith(" ") else value
+                        continue
+                    if "event" in event:
+                        self._put((shard, event["event"], event.get("id"), event.get("data")))
+                    event = {}
+        except Exception as e:
+            # Includes errors from the response being closed by close()
+            error = str(e)
+        if not self._closed:
+            logging.warning(f"Stream from shard {shard} ended: {error}")
+            self._put((shard, "end", None, error))
+
+
+def merge_metrics(texts):
+    """
+    Combine the /metrics exposition of every shard into one
+
+    Every sample gets a ``shard`` label and every metric family keeps a
+    single HELP and TYPE header. ``wazuh_listener_shard_up`` reports
+    which shards answered; texts of shards that failed are None.
+    """
+    families = {}
+    for shard, text in enumerate(texts):
+        family = None
+        for line in (text or "").splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = families.setdefault(line.split()[2], ([], []))
+                if line not in family[0]:
+                    family[0].append(line)
+            elif line and not line.startswith("#") and family is not None:
+                family[1].append(_with_label(line, f'shard="{shard}"'))
+
+    lines = []
+    for headers, samples in families.values():
+        lines += headers + samples
+    lines += [
+        "# HELP wazuh_listener_shard_up Whether the shard answered this scrape",
+        "# TYPE wazuh_listener_shard_up gauge",
+    ]
+    lines += [f'wazuh_listener_shard_up{{shard="{shard}"}} {int(text is not None)}' for shard, text in enumerate(texts)]
+    return "\n".join(lines) + "\n"
+
+
+def _with_label(sample, label):
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f"{name}{{{label},{rest}"
+    name, _, value = sample.partition(" ")
+    return f"{name}{{{label}}} {value}"
+
+
+def encode_shard_cursor(seqs):
+    """Opaque cursor holding one sequence number (or None) per shard"""
+    text = CURSOR_PREFIX + ".".join("" if seq is None else str(seq) for seq in seqs)
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decode_shard_cursor(token, count):
+    """
+    Per-shard sequence numbers behind a cursor from encode_shard_cursor
+
+    Raises:
+        ValueError: If the token is not a cursor for ``count`` shards
+    """
+    try:
+        text = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    if not text.startswith(CURSOR_PREFIX):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    parts = text[len(CURSOR_PREFIX):].split(".")
+    if len(parts) != count:
+        raise ValueError(f"Cursor is for {len(parts)} shards, not {count}")
+    try:
+        return [int(part) if part else None for part in parts]
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {token!r}")
+
+
+def scatter_page(gather, count, params, limit, before=None, after=None):
+    """
+    One /alerts (or /alerts/search) page merged from every shard
+
+    Each shard is asked for a full page past its own cursor position;
+    the pages are merged by timestamp and the cursors for the next older
+    and newer pages are computed from what was taken.
+
+    Args:
+        gather: Callable taking one query parameter dict per shard and
+            returning the decoded responses, None for shards that did
+            not answer (ShardClient.gather bound to a path)
+        count: Number of shards
+        params: Query parameters sent to every shard
+        limit: Maximum number of alerts
+        before: Cursor of the page to go back from
+        after: Cursor of the page to go forward from; the page is then
+            the oldest alerts after it
+
+    Returns:
+        tuple: ((shard, alert) pairs oldest first, before cursor, after
+        cursor, indexes of the shards that did not answer)
+
+    Raises:
+        ValueError: If a cursor is not valid for ``count`` shards
+    """
+    before_seqs = decode_shard_cursor(before, count) if before else [None] * count
+    after_seqs = decode_shard_cursor(after, count) if after else [None] * count
+    oldest_first = after is not None
+
+    params_per_shard = []
+    for shard in range(count):
+        shard_params = dict(params, limit=limit)
+        if oldest_first:
+            shard_params["after_seq"] = after_seqs[shard] if after_seqs[shard] is not None else -1
+        elif before_seqs[shard] is not None:
+            shard_params["before_seq"] = before_seqs[shard]
+        params_per_shard.append(shard_params)
+
+    responses = gather(params_per_shard)
+    pages = [response["alerts"] if response else [] for response in responses]
+    taken = merge_pages(pages, limit, oldest_first)
+    next_before, next_after = next_cursors(pages, taken, before_seqs, after_seqs, oldest_first)
+    missing = [shard for shard, response in enumerate(responses) if response is None]
+    return taken, encode_shard_cursor(next_before), encode_shard_cursor(next_after), missing
+
+
+def merge_pages(pages, limit, oldest_first=False):
+    """
+    K-way merge of per-shard alert pages by timestamp
+
+    Args:
+        pages: Per shard, a list of alert dicts (with ``seq`` and
+            ``timestamp``), oldest first
+        limit: Maximum number of alerts to return
+        oldest_first: Take the oldest alerts (``after`` paging) instead
+            of the newest
+
+    Returns:
+        list: (shard, alert) pairs, oldest first
+    """
+    def keyed(shard, page):
+        return ((alert.get("timestamp") or "", shard, alert["seq"], alert) for alert in page)
+
+    if oldest_first:
+        merged = heapq.merge(*(keyed(shard, page) for shard, page in enumerate(pages)))
+    else:
+        merged = heapq.merge(*(keyed(shard, reversed(page)) for shard, page in enumerate(pages)), reverse=True)
+
+    taken = []
+    for _, shard, _, alert in merged:
+        taken.append((shard, alert))
+        if len(taken) >= limit:
+            break
+    if not oldest_first:
+        taken.reverse()
+    return taken
+
+
+def next_cursors(pages, taken, before, after, oldest_first):
+    """
+    Per-shard cursor positions around a merged page
+
+    Args:
+        pages: Per-shard pages passed to merge_pages
+        taken: Result of merge_pages
+        before: Incoming per-shard ``before`` positions (None: unbounded)
+        after: Incoming per-shard ``after`` positions (-1: from the start)
+        oldest_first: Direction the page was taken in
+
+    Returns:
+        tuple: (before, after) lists for the older and newer pages
+    """
+    taken_seqs = [[] for _ in pages]
+    for shard, alert in taken:
+        taken_seqs[shard].append(alert["seq"])
+
+    next_before = []
+    next_after = []
+    for shard, page in enumerate(pages):
+        seqs = taken_seqs[shard]
+        returned = [alert["seq"] for alert in page]
+        if seqs:
+            next_before.append(min(seqs))
+            next_after.append(max(seqs))
+        elif not returned:
+            # Nothing on this shard in range: keep its position
+            if before[shard] is not None or not oldest_first:
+                next_before.append(before[shard])
+            else:
+                # Everything it holds is older than the page
+                next_before.append((after[shard] if after[shard] is not None else -1) + 1)
+            if after[shard] is not None:
+                next_after.append(after[shard])
+            else:
+                next_after.append(before[shard] - 1 if before[shard] is not None else -1)
+        elif oldest_first:
+            # Its alerts are all newer than the page
+            next_before.append(min(returned))
+            next_after.append(min(returned) - 1)
+        else:
+            # Its alerts are all older than the page
+            next_before.append(max(returned) + 1)
+            next_after.append(max(returned))
+    return next_before, next_after
+
+
+def merge_stats(snapshots):
+    """Sum /alerts/stats (or /alerts/aggregate) responses of several shards into one"""
+    merged = {
+        "total_alerts": 0,
+        "alerts_by_level": {},
+        "alerts_by_agent": {},
+        "alerts_by_rule": {},
+        "stored_alerts": 0,
+        "latest_alert": None,
+    }
+    timeline = {}
+    for snapshot in snapshots:
+        if "total_alerts" not in snapshot:
+            # "No alerts available" from an empty shard
+            continue
+        merged["total_alerts"] += snapshot["total_alerts"]
+        merged["stored_alerts"] += snapshot.get("stored_alerts", 0)
+        for key in ("alerts_by_level", "alerts_by_agent", "alerts_by_rule"):
+            counts = merged[key]
+            for name, count in snapshot.get(key, {}).items():
+                counts[name] = counts.get(name, 0) + count
+        for bucket in snapshot.get("timeline", ()):
+            timeline[bucket["start"]] = timeline.get(bucket["start"], 0) + bucket["count"]
+        if "bucket_seconds" in snapshot:
+            merged["bucket_seconds"] = snapshot["bucket_seconds"]
+        if snapshot.get("window_truncated"):
+            merged["window_truncated"] = True
+        latest = snapshot.get("latest_alert")
+        if latest and (merged["latest_alert"] is None
+                       or (latest.get("timestamp") or "") > (merged["latest_alert"].get("timestamp") or "")):
+            merged["latest_alert"] = latest
+    if "bucket_seconds" in merged:
+        merged["timeline"] = [{"start": start, "count": count} for start, count in sorted(timeline.items())]
+        merged.setdefault("window_truncated", False)
+    return merged
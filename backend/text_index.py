@@ -0,0 +1,175 @@
+import bisect
+import re
+from collections import deque
+
+# Alert fields searched by /alerts/search
+INDEXED_FIELDS = ("full_log", "rule_description", "location")
+
+# Longer words (hashes, base64 blobs) are not indexed; terms containing
+# one are still matched, by scanning
+MAX_TOKEN_LENGTH = 64
+
+MIN_PREFIX_LENGTH = 2
+
+# Postings up to this length are lists, longer ones deques
+SMALL_POSTING = 64
+
+_WORD = re.compile(r"\w+")
+_QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def indexed_text(record):
+    """Lowercased searchable text of a stored alert"""
+    values = (getattr(record, field) for field in INDEXED_FIELDS)
+    return "\n".join(value for value in values if isinstance(value, str)).lower()
+
+
+def tokenize(text):
+    """Distinct indexable words of lowercased text"""
+    return {word for word in _WORD.findall(text) if len(word) <= MAX_TOKEN_LENGTH}
+
+
+class SearchTerm:
+    """
+    One query term: a word, a phrase or a prefix (trailing ``*``)
+
+    Punctuated terms such as ``203.0.113.5`` or ``/wp-login.php`` are
+    looked up by their words and then checked against the alert text, so
+    they match the exact character sequence on word boundaries.
+    """
+
+    __slots__ = ("text", "words", "prefix", "prefix_word", "pattern")
+
+    def __init__(self, text, phrase=False):
+        text = text.lower()
+        self.prefix = not phrase and text.endswith("*")
+        if self.prefix:
+            text = text.rstrip("*")
+        self.text = text
+        self.words = _WORD.findall(text)
+        if not self.words:
+            raise ValueError(f"Search term {text!r} has no words")
+        ends_in_word = re.search(r"\w$", text) is not None
+        # "10.0.*" only extends the text; "adm*" also expands the word "adm"
+        self.prefix_word = self.prefix and ends_in_word
+        if self.prefix_word and len(self.words[-1]) < MIN_PREFIX_LENGTH:
+            raise ValueError(f"Prefix term {text!r}* needs at least {MIN_PREFIX_LENGTH} characters")
+
+        body = r"\s+".join(re.escape(part) for part in text.split()) if phrase else re.escape(text)
+        start = r"(?<!\w)" if _WORD.match(text) else ""
+        end = r"(?!\w)" if not self.prefix and ends_in_word else ""
+        self.pattern = re.compile(start + body + end)
+
+    def matches(self, text):
+        return self.pattern.search(text) is not None
+
+    def __repr__(self):
+        return f"SearchTerm({self.text!r}{', prefix' if self.prefix else ''})"
+
+
+def parse_query(query):
+    """
+    Parse a search query into OR-ed groups of AND-ed terms
+
+    Terms are separated by whitespace and must all match; ``OR`` between
+    terms starts an alternative group (``a b OR c`` is ``(a AND b) OR c``).
+    ``"double quotes"`` make a phrase, a trailing ``*`` a prefix term.
+    Matching is case-insensitive.
+
+    Raises:
+        ValueError: If the query or one of its terms is empty
+    """
+    groups = [[]]
+    for phrase, word in _QUERY_TERM.findall(query or ""):
+        if word == "OR":
+            groups.append([])
+        elif word == "AND":
+            continue
+        elif word:
+            groups[-1].append(SearchTerm(word))
+        else:
+            groups[-1].append(SearchTerm(phrase, phrase=True))
+    groups = [group for group in groups if group]
+    if not groups:
+        raise ValueError("Empty search query")
+    return groups
+
+
+class TextIndex:
+    """
+    Inverted index from words to alert sequence numbers
+
+    Postings hold sequence numbers in insertion order, like the AlertStore
+    indexes, so removing the oldest alert only pops from their left end.
+    Most words of a log (PIDs, ports, IDs) are rare, and a deque costs over
+    600 bytes even when nearly empty, so postings start as lists and only
+    become deques past SMALL_POSTING entries. The words of a removed alert
+    are found by tokenizing it again rather than keeping a per-alert word
+    list. Not thread-safe; the store calls it under its lock.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        # Sorted snapshot of the vocabulary for prefix lookups, plus the
+        # words added since; rebuilt once the backlog grows large
+        self._vocabulary = []
+        self._new_words = set()
+
+    def __len__(self):
+        return len(self._postings)
+
+    def add(self, seq, record):
+        postings = self._postings
+        for word in tokenize(indexed_text(record)):
+            seqs = postings.get(word)
+            if seqs is None:
+                postings[word] = [seq]
+                self._new_words.add(word)
+            else:
+                seqs.append(seq)
+                if len(seqs) > SMALL_POSTING and type(seqs) is list:
+                    postings[word] = deque(seqs)
+
+    def remove(self, seq, record):
+        postings = self._postings
+        for word in tokenize(indexed_text(record)):
+            seqs = postings.get(word)
+            if seqs and seqs[0] == seq:
+                if type(seqs) is list:
+                    del seqs[0]
+                else:
+                    seqs.popleft()
+                if not seqs:
+                    del postings[word]
+                    self._new_words.discard(word)
+
+    def postings(self, term):
+        """
+        Posting sequences to walk for a term's candidates
+
+        Uses the rarest of the term's words; a prefix word contributes the
+        postings of every word it starts. Returns None when no word of the
+        term is indexed, in which case every alert is a candidate.
+        """
+        best = None
+        for index, word in enumerate(term.words):
+            if len(word) > MAX_TOKEN_LENGTH:
+                continue
+            if term.prefix_word and index == len(term.words) - 1:
+                lists = [self._postings[match] for match in self._prefixed(word)]
+            else:
+                seqs = self._postings.get(word)
+                lists = [seqs] if seqs else []
+            if best is None or sum(map(len, lists)) < sum(map(len, best)):
+                best = lists
+        return best
+
+    def _prefixed(self, prefix):
+        if len(self._new_words) > max(4096, len(self._vocabulary) // 4):
+            self._vocabulary = sorted(self._postings)
+            self._new_words = set()
+        low = bisect.bisect_left(self._vocabulary, prefix)
+        high = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        words = set(self._vocabulary[low:high])
+        words.update(word for word in self._new_words if word.startswith(prefix))
+        return sorted(word for word in words if word in self._postings)
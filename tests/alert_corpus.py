@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Reproducible Wazuh alert corpora for load tests
+
+Corpora:
+    syscheck  defacement bursts: one agent rewrites dozens of files under
+              its web root within seconds, over background FIM noise
+    sshd      brute force: bursts of failed logins from a few source IPs,
+              with Wazuh's 5712/5763 correlation alerts on top
+    mixed     a spread of rules, levels 3-15 and agents, weighted like a
+              typical manager (mostly low-level PAM/syslog noise)
+
+The same --seed always yields the same alerts. Used by bench_pipeline.py;
+run directly to write a corpus as NDJSON (the format of the hook spool and
+of /webhook/wazuh/batch).
+
+Usage:
+    python3 alert_corpus.py --corpus mixed --alerts 10000 --out mixed.ndjson
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+CORPORA = ("syscheck", "sshd", "mixed")
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# (rule id, level, description, groups, weight) for the mixed corpus
+MIXED_RULES = (
+    ("5501", 3, "PAM: Login session opened.", ["pam", "syslog", "authentication_success"], 30),
+    ("5502", 3, "PAM: Login session closed.", ["pam", "syslog"], 30),
+    ("530", 3, "Ossec agent started.", ["ossec"], 2),
+    ("531", 7, "Partition usage reached 90% (disk space monitor).", ["ossec", "low_diskspace"], 3),
+    ("550", 7, "Integrity checksum changed.", ["ossec", "syscheck", "syscheck_entry_modified", "syscheck_file"], 8),
+    ("554", 5, "File added to the system.", ["ossec", "syscheck", "syscheck_entry_added", "syscheck_file"], 4),
+    ("5710", 5, "sshd: Attempt to login using a non-existent user", ["syslog", "sshd", "authentication_failed"], 8),
+    ("5715", 3, "sshd: authentication success.", ["syslog", "sshd", "authentication_success"], 6),
+    ("31101", 5, "Web server 400 error code.", ["web", "accesslog", "attack"], 5),
+    ("31151", 10, "Multiple web server 400 error codes from same source ip.", ["web", "accesslog", "web_scan"], 1),
+    ("40111", 10, "Multiple authentication failures.", ["syslog", "attacks", "authentication_failures"], 1),
+    ("100200", 12, "Web shell uploaded to document root.", ["local", "webshell"], 0.5),
+    ("100201", 15, "Defacement signature matched in served page.", ["local", "deface"], 0.2),
+)
+
+WEB_DIRS = ("/var/www/html", "/var/www/html/assets", "/var/www/html/blog", "/srv/www/shop")
+FILE_NAMES = ("index", "about", "contact", "login", "cart", "news", "style", "app", "footer", "header")
+USERS = ("root", "admin", "ubuntu", "test", "oracle", "postgres", "git", "deploy", "guest", "user")
+
+
+def _agent(n):
+    return {"id": f"{n:03d}", "name": f"web-{n:03d}", "ip": f"10.0.{n // 250}.{n % 250 + 1}"}
+
+
+def _alert(i, ts, agent, rule_id, level, description, groups, location, full_log, **extra):
+    alert = {
+        "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+0000",
+        "rule": {"level": level, "description": description, "id": rule_id, "groups": groups},
+        "agent": agent,
+        "manager": {"name": "wazuh-manager"},
+        "id": f"{int(ts.timestamp())}.{i}",
+        "full_log": full_log,
+        "location": location,
+    }
+    alert.update(extra)
+    return alert
+
+
+def _syscheck(i, ts, agent, path, event, rng, diff_lines=0):
+    rule_id, level, description, group = {
+        "modified": ("550", 7, "Integrity checksum changed.", "syscheck_entry_modified"),
+        "added": ("554", 5, "File added to the system.", "syscheck_entry_added"),
+    }[event]
+    syscheck = {
+        "path": path,
+        "mode": "realtime",
+        "size_after": str(rng.randrange(200, 200000)),
+        "perm_after": "rw-r--r--",
+        "uname_after": "www-data",
+        "md5_after": f"{rng.getrandbits(128):032x}",
+        "sha1_after": f"{rng.getrandbits(160):040x}",
+        "sha256_after": f"{rng.getrandbits(256):064x}",
+        "event": event,
+    }
+    if event == "modified":
+        syscheck["changed_attributes"] = ["size", "mtime", "md5", "sha1", "sha256"]
+    if diff_lines:
+        syscheck["diff"] = "\n".join(
+            f"< <p>{rng.choice(FILE_NAMES)} block {n}</p>\n> <h1>Hacked by crew{rng.randrange(99)}</h1>"
+            for n in range(diff_lines)
+        )
+    return _alert(
+        i, ts, agent, rule_id, level, description, ["ossec", "syscheck", group, "syscheck_file"],
+        "syscheck", f"File '{path}' {event}\nMode: realtime\n", syscheck=syscheck,
+        decoder={"name": "syscheck_integrity_changed"},
+    )
+
+
+def syscheck_corpus(count, rng, agents=200):
+    """Defacement bursts of 30-80 files on one agent, over background FIM changes"""
+    alerts = []
+    ts = BASE_TIME
+    while len(alerts) < count:
+        if rng.random() < 0.1:
+            agent = _agent(rng.randrange(agents))
+            root = rng.choice(WEB_DIRS)
+            for n in range(rng.randrange(30, 80)):
+                ts += timedelta(milliseconds=rng.randrange(5, 80))
+                path = f"{root}/{rng.choice(FILE_NAMES)}{n}.html"
+                alerts.append(_syscheck(len(alerts), ts, agent, path, "modified", rng, diff_lines=rng.randrange(1, 6)))
+        else:
+            ts += timedelta(milliseconds=rng.randrange(50, 2000))
+            path = f"{rng.choice(WEB_DIRS)}/{rng.choice(FILE_NAMES)}{rng.randrange(1000)}.{rng.choice(('html', 'php', 'css'))}"
+            alerts.append(_syscheck(len(alerts), ts, _agent(rng.randrange(agents)), path,
+                                    rng.choice(("modified", "added")), rng))
+    return alerts[:count]
+
+
+def sshd_corpus(count, rng, agents=50):
+    """Brute-force bursts from a few attacker IPs, with correlation alerts"""
+    alerts = []
+    ts = BASE_TIME
+    attackers = [f"203.0.113.{n}" for n in range(1, 21)] + [f"198.51.100.{n}" for n in range(1, 11)]
+    while len(alerts) < count:
+        agent = _agent(rng.randrange(agents))
+        srcip = rng.choice(attackers)
+        host = agent["name"]
+        for n in range(rng.randrange(8, 60)):
+            ts += timedelta(milliseconds=rng.randrange(100, 900))
+            user = rng.choice(USERS)
+            port = rng.randrange(30000, 65000)
+            pid = rng.randrange(1000, 60000)
+            stamp = ts.strftime("%b %d %H:%M:%S")
+            invalid = user not in ("root", "ubuntu")
+            if invalid:
+                rule = ("5710", 5, "sshd: Attempt to login using a non-existent user", ["syslog", "sshd", "invalid_login", "authentication_failed"])
+                line = f"{stamp} {host} sshd[{pid}]: Failed password for invalid user {user} from {srcip} port {port} ssh2"
+            else:
+                rule = ("5760", 5, "sshd: authentication failed.", ["syslog", "sshd", "authentication_failed"])
+                line = f"{stamp} {host} sshd[{pid}]: Failed password for {user} from {srcip} port {port} ssh2"
+            data = {"srcip": srcip, "srcport": str(port), "srcuser": user}
+            alerts.append(_alert(len(alerts), ts, agent, *rule, "/var/log/auth.log", line,
+                                 predecoder={"program_name": "sshd", "timestamp": stamp, "hostname": host},
+                                 decoder={"parent": "sshd", "name": "sshd"}, data=data))
+            # Wazuh fires its frequency rules every 8 failures from one source
+            if n and n % 8 == 0:
+                alerts.append(_alert(len(alerts), ts, agent, "5712", 10,
+                                     "sshd: brute force trying to get access to the system. Non existent user.",
+                                     ["syslog", "sshd", "authentication_failures"], "/var/log/auth.log", line,
+                                     decoder={"parent": "sshd", "name": "sshd"}, data=data,
+                                     previous_output="\n".join([line] * 7)))
+        ts += timedelta(seconds=rng.randrange(1, 30))
+    return alerts[:count]
+
+
+def mixed_corpus(count, rng, agents=500):
+    """Weighted mix of rules and levels across many agents"""
+    weights = [rule[4] for rule in MIXED_RULES]
+    alerts = []
+    ts = BASE_TIME
+    for i in range(count):
+        ts += timedelta(milliseconds=rng.randrange(1, 200))
+        rule_id, level, description, groups, _ = rng.choices(MIXED_RULES, weights)[0]
+        agent = _agent(rng.randrange(agents))
+        if "syscheck" in groups:
+            path = f"{rng.choice(WEB_DIRS)}/{rng.choice(FILE_NAMES)}{rng.randrange(5000)}.html"
+            event = "modified" if rule_id == "550" else "added"
+            alerts.append(_syscheck(i, ts, agent, path, event, rng))
+            continue
+        stamp = ts.strftime("%b %d %H:%M:%S")
+        if "web" in groups:
+            location = "/var/log/nginx/access.log"
+            full_log = (f'198.51.100.{rng.randrange(255)} - - [{stamp}] "GET /{rng.choice(FILE_NAMES)}.php?id={i} '
+                        f'HTTP/1.1" 404 {rng.randrange(100, 900)} "-" "Mozilla/5.0"')
+        elif "ossec" in groups:
+            location = "wazuh-agent"
+            full_log = f"ossec: {description}"
+        else:
+            location = "/var/log/auth.log"
+            full_log = f"{stamp} {agent['name']} sshd[{rng.randrange(1000, 60000)}]: {description} for {rng.choice(USERS)}"
+        alerts.append(_alert(i, ts, agent, rule_id, level, description, groups, location, full_log))
+    return alerts
+
+
+def build_corpus(name, count, seed=1):
+    """
+    Generate a corpus
+
+    Args:
+        name: One of CORPORA
+        count: Number of alerts
+        seed: Random seed; equal seeds give identical corpora
+
+    Returns:
+        list: Wazuh alert dicts in event-time order
+    """
+    rng = random.Random(f"{name}:{seed}")
+    if name == "syscheck":
+        return syscheck_corpus(count, rng)
+    if name == "sshd":
+        return sshd_corpus(count, rng)
+    if name == "mixed":
+        return mixed_corpus(count, rng)
+    raise ValueError(f"Unknown corpus {name!r}, expected one of {', '.join(CORPORA)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=CORPORA, default="mixed")
+    parser.add_argument("--alerts", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    alerts = build_corpus(args.corpus, args.alerts, args.seed)
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for alert in alerts:
+            out.write(json.dumps(alert, separators=(",", ":")) + "\n")
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Footprint and query speed of the columnar alert archive
+
+Feeds --days of alerts at --per-day alerts a day (levels, agents and
+rules drawn from the mixed corpus) into an AlertArchive writing to a
+temporary directory, then times /alerts/aggregate style queries over the
+whole range and over slices of it. The footprint is compared with the
+NDJSON the same alerts take in the alert log, and query times with
+parsing and counting that NDJSON (measured on a sample, extrapolated).
+
+Usage:
+    python3 bench_alert_archive.py --days 90 --per-day 50000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_archive import AlertArchive
+from alert_corpus import build_corpus
+
+START = 1735689600  # 2025-01-01T00:00:00Z
+
+
+def timed(call, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=50000)
+    parser.add_argument("--sample", type=int, default=20000, help="Alerts in the NDJSON scan sample")
+    args = parser.parse_args()
+
+    corpus = build_corpus("mixed", args.sample, seed=1)
+    lines = [json.dumps(alert, separators=(",", ":")) for alert in corpus]
+    json_bytes = sum(len(line) + 1 for line in lines) / len(lines)
+    fields = [(alert["rule"]["level"], alert["agent"]["name"], alert["rule"]["id"]) for alert in corpus]
+
+    directory = tempfile.mkdtemp(prefix="bench_archive_")
+    try:
+        archive = AlertArchive(directory, retention_seconds=None)
+        total = args.days * args.per_day
+        step = 86400 / args.per_day
+        start = time.perf_counter()
+        for seq in range(total):
+            level, agent, rule = fields[seq % len(fields)]
+            archive.add(seq, level, agent, rule, ts=START + seq * step)
+        archive.close()
+        add_seconds = time.perf_counter() - start
+
+        disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        memory = sum(
+            column.itemsize * len(column)
+            for partition in archive._sealed
+            for column in (partition.offsets, partition.levels, partition.agents, partition.rules)
+        )
+        print(f"alerts         : {total} over {args.days} days ({archive.stats()['partitions']} partitions)")
+        print(f"add            : {add_seconds / total * 1e6:.2f} us/alert (incl. sealing and writing)")
+        print(f"disk           : {disk / 2 ** 20:8.1f} MB  {disk / total:6.2f} B/alert")
+        print(f"memory         : {memory / 2 ** 20:8.1f} MB  {memory / total:6.2f} B/alert (column arrays)")
+        print(f"NDJSON         : {json_bytes * total / 2 ** 20:8.1f} MB  {json_bytes:6.0f} B/alert")
+
+        def scan():
+            counts = Counter()
+            for line in lines:
+                alert = json.loads(line)
+                counts[alert["rule"]["level"]] += 1
+            return counts
+
+        scan_seconds, _ = timed(scan, 1)
+        per_alert_scan = scan_seconds / len(lines)
+
+        end = START + args.days * 86400
+        queries = (
+            ("all, by level/agent/rule", dict()),
+            ("all, daily timeline", dict(group_by=(), interval=86400)),
+            ("last 30 days, level >= 10", dict(since=end - 30 * 86400, min_level=10)),
+            ("agent web-01*, by rule", dict(agent="web-01", group_by=("rule",))),
+            ("rule 5710, hourly", dict(rule_id="5710", group_by=(), interval=3600)),
+            ("one day, per minute", dict(since=end - 86400, group_by=("level",), interval=60)),
+        )
+        print(f"\n{'query':<28} {'alerts':>10} {'archive ms':>11} {'NDJSON scan ms (est.)':>22}")
+        for name, kwargs in queries:
+            seconds, result = timed(lambda: archive.aggregate(**kwargs))
+            since = kwargs.get("since", START)
+            scanned = total * (end - since) / (end - START)
+            print(f"{name:<28} {result['total_alerts']:>10} {seconds * 1000:11.1f} {scanned * per_alert_scan * 1000:22.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Write throughput and query latency of the SQLite alert database
+
+Writes --alerts processed alerts through AlertDatabase (one transaction
+per --batch-size alerts) and, for comparison, with one commit per alert.
+Then times /alerts-style queries against the database and against a
+list-comprehension scan over the same alerts, as get_alerts used to do:
+
+    latest      newest 50, no filters
+    level       rule_level >= 12
+    agent       agent substring match
+    deep page   level filter, keyset page from the middle of the table
+
+Usage:
+    python3 bench_alert_db.py --alerts 200000 --batch-size 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_db import AlertDatabase
+
+
+def make_alert(i, rng):
+    agent = f"web-{rng.randint(0, 199)}"
+    return {
+        "timestamp": f"2026-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "alert_id": f"1700000000.{i}",
+        "rule_id": str(rng.choice([550, 553, 554, 5710, 5712, 31101])),
+        "rule_level": rng.randint(0, 15),
+        "rule_description": "Integrity checksum changed.",
+        "agent_name": agent,
+        "agent_ip": "10.0.0.1",
+        "location": "syscheck",
+        "full_log": f"File '/var/www/html/page{i}.html' modified",
+        "raw_alert": {"id": f"1700000000.{i}", "agent": {"name": agent}},
+    }
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def bench_unbatched(path, alerts):
+    # Same schema, indexes and encoding, but one transaction per alert
+    db = AlertDatabase(path)
+    start = time.perf_counter()
+    for seq, alert in enumerate(alerts):
+        db._write([(seq, alert, 0)])
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--unbatched", type=int, default=5000, help="Alerts for the commit-per-alert run")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    alerts = [make_alert(i, rng) for i in range(args.alerts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        elapsed = bench_unbatched(os.path.join(tmp, "unbatched.db"), alerts[:args.unbatched])
+        print(f"commit per alert   {args.unbatched / elapsed:10.0f} alerts/s")
+
+        db = AlertDatabase(os.path.join(tmp, "alerts.db"), batch_size=args.batch_size)
+        start = time.perf_counter()
+        for seq, alert in enumerate(alerts):
+            db.add(seq, alert)
+        db.flush()
+        elapsed = time.perf_counter() - start
+        print(f"batched ({args.batch_size:>5})    {args.alerts / elapsed:10.0f} alerts/s  ({db.batches} transactions)")
+        print()
+
+        middle = args.alerts // 2
+        queries = [
+            ("latest", dict(limit=50),
+             lambda: alerts[-50:]),
+            ("level", dict(min_level=12, limit=50),
+             lambda: [a for a in alerts if a["rule_level"] >= 12][-50:]),
+            ("agent", dict(agent="WEB-17", limit=50),
+             lambda: [a for a in alerts if "web-17" in a["agent_name"].lower()][-50:]),
+            ("deep page", dict(min_level=12, before_seq=middle, limit=50),
+             lambda: [a for a in alerts[:middle] if a["rule_level"] >= 12][-50:]),
+        ]
+
+        print(f"{'query':<12}{'sqlite ms':>12}{'list scan ms':>15}")
+        for name, kwargs, scan in queries:
+            db_ms, _ = timed(lambda: db.query(**kwargs))
+            scan_ms, _ = timed(scan, repeat=5)
+            print(f"{name:<12}{db_ms:12.3f}{scan_ms:15.3f}")
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compare ingest throughput of single-alert POSTs against batch POSTs
+
+Starts the Flask listener in-process on a free local port and sends the
+same alerts once through /webhook/wazuh (one request per alert) and once
+through /webhook/wazuh/batch (NDJSON bodies of --batch-size alerts).
+Timings include draining the ingest queue, and 429 responses are
+retried after their Retry-After delay.
+
+Usage:
+    python3 bench_batch_ingest.py --alerts 5000 --batch-size 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def make_alert(i):
+    return {
+        "id": f"{int(time.time())}.{i}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+        "rule": {
+            "id": "550",
+            "level": 7,
+            "description": "Integrity checksum changed.",
+            "groups": ["ossec", "syscheck", "syscheck_entry_modified", "syscheck_file"],
+        },
+        "agent": {"id": f"{i % 20:03d}", "name": f"web-{i % 20}", "ip": f"10.0.0.{i % 20}"},
+        "location": "syscheck",
+        "full_log": f"File '/var/www/html/page{i}.html' modified",
+        "syscheck": {
+            "path": f"/var/www/html/page{i}.html",
+            "event": "modified",
+            "md5_after": "d41d8cd98f00b204e9800998ecf8427e",
+            "sha256_after": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+        },
+    }
+
+
+def start_server():
+    # The listener logs to ./log relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="bench_batch_")
+    os.makedirs(os.path.join(workdir, "log"), exist_ok=True)
+    os.chdir(workdir)
+
+    # Keep the file log (it is part of the per-alert cost) but not the console
+    os.environ["LOG_CONSOLE"] = "false"
+
+    import flask_server
+
+    server = make_server("127.0.0.1", 0, flask_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}", flask_server.ingest_pipeline
+
+
+def post(session, url, **kwargs):
+    while True:
+        response = session.post(url, **kwargs)
+        if response.status_code != 429:
+            response.raise_for_status()
+            return response
+        time.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+def bench_single(session, base_url, pipeline, alerts):
+    start = time.perf_counter()
+    for alert in alerts:
+        post(session, f"{base_url}/webhook/wazuh", json=alert, timeout=30)
+    pipeline.join()
+    return time.perf_counter() - start
+
+
+def bench_batch(session, base_url, pipeline, alerts, batch_size):
+    start = time.perf_counter()
+    for offset in range(0, len(alerts), batch_size):
+        body = "\n".join(json.dumps(alert) for alert in alerts[offset:offset + batch_size])
+        response = post(
+            session,
+            f"{base_url}/webhook/wazuh/batch",
+            data=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+            timeout=60,
+        )
+        if response.json()["rejected"]:
+            raise RuntimeError(f"Batch rejected items: {response.json()}")
+    pipeline.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=5000, help="Number of alerts per run")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Alerts per batch request")
+    args = parser.parse_args()
+
+    alerts = [make_alert(i) for i in range(args.alerts)]
+    server, base_url, pipeline = start_server()
+
+    try:
+        with requests.Session() as session:
+            single = bench_single(session, base_url, pipeline, alerts)
+            batch = bench_batch(session, base_url, pipeline, alerts, args.batch_size)
+    finally:
+        server.shutdown()
+
+    print(f"alerts: {args.alerts}, batch size: {args.batch_size}")
+    print(f"single POST : {single:8.3f}s  {args.alerts / single:10.0f} alerts/s")
+    print(f"batch POST  : {batch:8.3f}s  {args.alerts / batch:10.0f} alerts/s")
+    print(f"speedup     : {single / batch:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
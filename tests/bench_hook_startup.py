@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Measure wall time per invocation of the Wazuh integration script
+
+Each run starts a fresh interpreter exactly like wazuh-integratord does:
+    python3 custom-flask.py <alert_file> <api_key> <hook_url>
+
+Scenarios:
+    spool   WZ_HOOK_MODE=spool, alert appended to a temporary spool
+    direct  alert POSTed to a local stub listener
+
+Pass --script to benchmark another copy of the hook (e.g. an older
+revision) under the same conditions.
+
+Usage:
+    python3 bench_hook_startup.py --runs 50 --log-level info
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "wz_hook", "custom-flask.py")
+
+SAMPLE_ALERT = {
+    "timestamp": "2025-01-01T00:00:00.000+0000",
+    "rule": {
+        "level": 7,
+        "description": "Integrity checksum changed.",
+        "id": "550",
+        "groups": ["ossec", "syscheck", "syscheck_entry_modified", "syscheck_file"],
+    },
+    "agent": {"id": "001", "name": "web-01", "ip": "10.0.0.1"},
+    "manager": {"name": "wazuh-manager"},
+    "id": "1735689600.123456",
+    "full_log": "File '/var/www/html/index.html' modified\nMode: realtime\n",
+    "syscheck": {
+        "path": "/var/www/html/index.html",
+        "size_after": "5120",
+        "md5_after": "d41d8cd98f00b204e9800998ecf8427e",
+        "sha256_after": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+        "event": "modified",
+    },
+    "decoder": {"name": "syscheck_integrity_changed"},
+    "location": "syscheck",
+}
+
+
+class StubListener(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"status": "success"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_scenario(script, alert_file, hook_url, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, script, alert_file, "", hook_url],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{name:8s} mean {statistics.mean(timings) * 1000:7.1f} ms"
+        f"  p50 {statistics.median(timings) * 1000:7.1f} ms"
+        f"  p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="Integration script to run")
+    parser.add_argument("--runs", type=int, default=30, help="Invocations per scenario")
+    parser.add_argument("--log-level", default="info", help="WZ_HOOK_LOG_LEVEL for the runs")
+    parser.add_argument("--scenarios", default="spool,direct", help="Comma-separated scenarios")
+    args = parser.parse_args()
+
+    # Run a copy laid out like /var/ossec so the integrations log lands in
+    # the temporary directory
+    workdir = tempfile.mkdtemp(prefix="bench_hook_")
+    os.makedirs(os.path.join(workdir, "integrations"))
+    script = os.path.join(workdir, "integrations", "custom-flask.py")
+    shutil.copy(args.script, script)
+
+    alert_file = os.path.join(workdir, "alert.json")
+    with open(alert_file, "w") as f:
+        json.dump(SAMPLE_ALERT, f)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubListener)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    hook_url = f"http://127.0.0.1:{server.server_port}/webhook/wazuh"
+
+    print(f"script: {os.path.realpath(args.script)}")
+    print(f"runs: {args.runs}, log level: {args.log_level}")
+
+    try:
+        for scenario in args.scenarios.split(","):
+            env = dict(os.environ)
+            env["WZ_HOOK_LOG_LEVEL"] = args.log_level
+            env["WZ_HOOK_SPOOL_DIR"] = os.path.join(workdir, "spool")
+            env["WZ_HOOK_MODE"] = "spool" if scenario == "spool" else "direct"
+
+            # Warm the page cache before timing
+            run_scenario(script, alert_file, hook_url, env, 2)
+            report(scenario, run_scenario(script, alert_file, hook_url, env, args.runs))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
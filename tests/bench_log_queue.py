@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Caller-side latency of listener logging, synchronous vs queued
+
+Logs --records records from one thread through setup_logging (file
+handler only) and reports p50/p99/max time per logging call. Every
+--stall-every records the file write stalls for --stall-ms, like a
+busy disk or a blocked stdout pipe; in synchronous mode the caller
+pays for it, in queued mode only the listener thread does.
+
+Usage:
+    python3 bench_log_queue.py --records 20000 --stall-every 1000 --stall-ms 50
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from log_queue import setup_logging
+
+
+def stall_file_writes(handlers, every, seconds):
+    handler = next(h for h in handlers if isinstance(h, logging.FileHandler))
+    emit = handler.emit
+    count = [0]
+
+    def slow_emit(record):
+        count[0] += 1
+        if count[0] % every == 0:
+            time.sleep(seconds)
+        emit(record)
+
+    handler.emit = slow_emit
+
+
+def run(asynchronous, records, every, stall, directory):
+    handler = setup_logging(os.path.join(directory, f"{asynchronous}.log"), asynchronous=asynchronous,
+                            console=False, queue_size=records)
+    # In queued mode the real handlers sit behind the listener thread
+    stall_file_writes(handler.listener.handlers if handler else logging.getLogger().handlers, every, stall)
+    logger = logging.getLogger("bench")
+
+    timings = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.info("Wazuh Alert Received: %s on %s", "Integrity checksum changed.", f"web-{i % 20}")
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings, handler.dropped if handler is not None else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--stall-every", type=int, default=1000)
+    parser.add_argument("--stall-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for asynchronous in (False, True):
+            timings, dropped = run(asynchronous, args.records, args.stall_every, args.stall_ms / 1000, directory)
+            p50 = timings[len(timings) // 2] * 1e6
+            p99 = timings[int(len(timings) * 0.99)] * 1e6
+            total = sum(timings)
+            print(f"{'queued' if asynchronous else 'synchronous':<12} total {total * 1000:8.1f} ms  "
+                  f"p50 {p50:7.1f} us  p99 {p99:7.1f} us  max {timings[-1] * 1000:7.1f} ms  dropped {dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Cost of the ingest stage instrumentation
+
+Times --observations clock reads plus StageMetrics.observe calls, with
+metrics enabled and disabled, from --threads threads at once (ingest
+workers share the histograms), and the time to render /metrics text.
+
+Usage:
+    python3 bench_metrics.py --observations 1000000 --threads 4
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from metrics import StageMetrics
+
+STAGES = ("parse", "process", "store", "handlers")
+
+
+def observe_loop(metrics, count):
+    for i in range(count):
+        start = time.perf_counter()
+        metrics.observe(STAGES[i & 3], time.perf_counter() - start)
+
+
+def run(enabled, observations, threads):
+    metrics = StageMetrics(STAGES, enabled=enabled)
+    per_thread = observations // threads
+    workers = [threading.Thread(target=observe_loop, args=(metrics, per_thread)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    for enabled in (False, True):
+        elapsed, metrics = run(enabled, args.observations, args.threads)
+        print(f"{'enabled' if enabled else 'disabled':<9} {elapsed / args.observations * 1e9:7.0f} ns/observation")
+
+    start = time.perf_counter()
+    text = "\n".join(metrics.render("wazuh_listener_stage_duration_seconds", "Stage latency"))
+    print(f"render    {(time.perf_counter() - start) * 1e6:7.0f} us ({len(text)} bytes)")
+    print(f"counted   {sum(h.count for h in metrics.histograms.values())} observations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Load-generation suite for the alert pipeline
+
+Replays alert corpora (see alert_corpus.py) against a fresh listener
+process per scenario and reports throughput, request latency and the
+listener's memory. Every corpus is run against every target:
+
+    webhook     one POST /webhook/wazuh per alert
+    batch       NDJSON POSTs of --batch-size alerts to /webhook/wazuh/batch
+    hook        one wz_hook/custom-flask.py run per alert, direct mode
+    hook-spool  one custom-flask.py run per alert in spool mode, drained
+                by a custom-flask.py --forward process
+
+--rate schedules sends open loop at a fixed alerts/s; latency is counted
+from the scheduled send time, so a stalled listener shows up as latency
+instead of silently lowering the offered load. --rate 0 sends as fast as
+--concurrency senders allow. Throughput is alerts processed by the
+listener per second until its ingest queue is drained. RSS is the
+listener's resident set at the end of the run, with its peak.
+
+--workers N runs the listener sharded over N processes (backend/serve.py);
+RSS is then summed over the workers.
+
+Results are written as JSON with --out. --baseline compares against an
+earlier results file and exits 1 if throughput or p99 latency regressed
+by more than --tolerance.
+
+Usage:
+    python3 bench_pipeline.py --corpus syscheck,sshd,mixed --target webhook,batch --alerts 5000 --rate 0
+    python3 bench_pipeline.py --target hook,hook-spool --alerts 300 --rate 100 --out hook.json
+    python3 bench_pipeline.py --alerts 5000 --out new.json --baseline old.json
+    python3 bench_pipeline.py --target batch --alerts 50000 --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from alert_corpus import CORPORA, build_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HOOK_SCRIPT = os.path.join(ROOT, "wz_hook", "custom-flask.py")
+TARGETS = ("webhook", "batch", "hook", "hook-spool")
+
+
+def serve_listener(workdir, env, ports, workers=1):
+    """Child process: run the Flask listener on a free port"""
+    # The listener logs to ./log relative to the working directory
+    os.chdir(workdir)
+    os.makedirs("log", exist_ok=True)
+    os.environ.update(env)
+    sys.path.append(os.path.join(ROOT, "backend"))
+
+    if workers > 1:
+        import serve
+        serve.serve(workers, "127.0.0.1", 0, ports=ports)
+        return
+
+    from werkzeug.serving import make_server
+    import flask_server
+
+    server = make_server("127.0.0.1", 0, flask_server.app, threaded=True)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+class Listener:
+    """Listener in its own process, so the load generator does not share its GIL"""
+
+    def __init__(self, workdir, env, workers=1):
+        context = multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        # Not a daemon: a sharded listener starts worker processes of its own
+        self.process = context.Process(target=serve_listener, args=(workdir, env, ports, workers),
+                                       daemon=workers == 1)
+        self.process.start()
+        self.url = f"http://127.0.0.1:{ports.get(timeout=60)}"
+
+    def stats(self):
+        return requests.get(f"{self.url}/ingest/stats", timeout=10).json()
+
+    def wait_drained(self, expected, timeout):
+        """Wait until the workers have handled ``expected`` alerts"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stats = self.stats()
+            if stats["processed"] + stats["failed"] >= expected and not stats["queue_depth"]:
+                return stats
+            time.sleep(0.02)
+        raise RuntimeError(f"Listener did not process {expected} alerts within {timeout}s: {self.stats()}")
+
+    def memory(self):
+        """
+        (rss, peak rss) in bytes from /proc, or (None, None) elsewhere
+
+        Summed over the worker processes of a sharded listener.
+        """
+        pid = self.process.pid
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                pids = [int(child) for child in f.read().split()] or [pid]
+        except OSError:
+            pids = [pid]
+        values = {}
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        key, _, value = line.partition(":")
+                        if key in ("VmRSS", "VmHWM"):
+                            values[key] = values.get(key, 0) + int(value.split()[0]) * 1024
+            except OSError:
+                pass
+        return values.get("VmRSS"), values.get("VmHWM")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(10)
+
+
+def drive(items, rate, concurrency, send):
+    """
+    Send work items from ``concurrency`` threads, open loop
+
+    Args:
+        items: List of (alert count, payload)
+        rate: Alerts per second, or 0 to send as fast as possible
+        send: Callable(payload) -> "ok", "rejected" or "error"
+
+    Returns:
+        tuple: (latencies in seconds, outcome counts, start, end)
+    """
+    schedule = []
+    offset = 0
+    for count, _ in items:
+        schedule.append(offset / rate if rate else 0.0)
+        offset += count
+
+    latencies = []
+    outcomes = {"ok": 0, "rejected": 0, "error": 0}
+    lock = threading.Lock()
+    next_index = iter(range(len(items)))
+    start = time.perf_counter()
+
+    def sender():
+        local = []
+        counts = dict.fromkeys(outcomes, 0)
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                break
+            due = start + schedule[index]
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            began = time.perf_counter()
+            try:
+                counts[send(items[index][1])] += items[index][0]
+            except Exception:
+                counts["error"] += items[index][0]
+            local.append(time.perf_counter() - (due if rate else began))
+        with lock:
+            latencies.extend(local)
+            for key, value in counts.items():
+                outcomes[key] += value
+
+    threads = [threading.Thread(target=sender) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, outcomes, start, time.perf_counter()
+
+
+def http_sender(url):
+    local = threading.local()
+
+    def send(body):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(url, data=body, headers={"Content-Type": "application/json"}, timeout=60)
+        if response.status_code == 200:
+            return "ok"
+        return "rejected" if response.status_code == 429 else "error"
+
+    return send
+
+
+def hook_sender(script, hook_url, env):
+    def send(alert_file):
+        result = subprocess.run(
+            [sys.executable, script, alert_file, "", hook_url],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return "ok" if result.returncode == 0 else "error"
+
+    return send
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_scenario(corpus_name, alerts, target, args, listener_env):
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    listener = Listener(workdir, listener_env, args.workers)
+    forwarder = None
+    try:
+        hook_url = f"{listener.url}/webhook/wazuh"
+        if target == "webhook":
+            items = [(1, json.dumps(alert).encode()) for alert in alerts]
+            send = http_sender(hook_url)
+        elif target == "batch":
+            items = []
+            for low in range(0, len(alerts), args.batch_size):
+                chunk = alerts[low:low + args.batch_size]
+                items.append((len(chunk), "\n".join(json.dumps(alert) for alert in chunk).encode()))
+            send = http_sender(f"{hook_url}/batch")
+        else:
+            # Lay the hook out like /var/ossec so its logs and spool stay in workdir
+            os.makedirs(os.path.join(workdir, "integrations"))
+            os.makedirs(os.path.join(workdir, "alerts"))
+            script = os.path.join(workdir, "integrations", "custom-flask.py")
+            shutil.copy(HOOK_SCRIPT, script)
+            items = []
+            for i, alert in enumerate(alerts):
+                path = os.path.join(workdir, "alerts", f"{i}.json")
+                with open(path, "w") as f:
+                    json.dump(alert, f)
+                items.append((1, path))
+
+            env = dict(os.environ, WZ_HOOK_LOG_LEVEL="error", WZ_HOOK_SPOOL_DIR=os.path.join(workdir, "spool"),
+                       WZ_HOOK_MODE="spool" if target == "hook-spool" else "direct", WZ_HOOK_POLL_INTERVAL="0.05")
+            if target == "hook-spool":
+                forwarder = subprocess.Popen([sys.executable, script, "--forward", "", hook_url], env=env,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            send = hook_sender(script, hook_url, env)
+
+        before = listener.stats()
+        latencies, outcomes, start, sent_at = drive(items, args.rate, args.concurrency, send)
+        expected = before["processed"] + before["failed"] + (
+            outcomes["ok"] if target != "hook-spool" else len(alerts))
+        stats = listener.wait_drained(expected, args.timeout)
+        drained_at = time.perf_counter()
+        rss, peak_rss = listener.memory()
+    finally:
+        if forwarder is not None:
+            forwarder.terminate()
+            forwarder.wait(10)
+        listener.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies.sort()
+    processed = stats["processed"] - before["processed"]
+    return {
+        "corpus": corpus_name,
+        "target": target,
+        "alerts": len(alerts),
+        "rate": args.rate,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size if target == "batch" else None,
+        "workers": args.workers,
+        "requests": len(latencies),
+        "accepted": outcomes["ok"],
+        "rejected": outcomes["rejected"],
+        "errors": outcomes["error"],
+        "processed": processed,
+        "send_seconds": round(sent_at - start, 4),
+        "total_seconds": round(drained_at - start, 4),
+        "throughput": round(processed / (drained_at - start), 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+        "rss_mb": round(rss / 2 ** 20, 1) if rss else None,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+    }
+
+
+def scenario_key(result):
+    return (result["corpus"], result["target"], result["alerts"], result["rate"],
+            result["concurrency"], result["batch_size"], result.get("workers", 1))
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against a baseline run; returns the regressed scenarios"""
+    previous = {scenario_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    print(f"\nagainst {baseline.get('commit') or 'baseline'} ({baseline.get('created')}):")
+    for result in results:
+        old = previous.get(scenario_key(result))
+        if old is None:
+            print(f"{result['corpus']:<9} {result['target']:<11} no baseline")
+            continue
+        throughput = result["throughput"] / old["throughput"] - 1 if old["throughput"] else 0.0
+        p99, old_p99 = result["latency_ms"]["p99"], old["latency_ms"]["p99"]
+        latency = p99 / old_p99 - 1 if p99 is not None and old_p99 else 0.0
+        regressed = throughput < -tolerance or latency > tolerance
+        if regressed:
+            regressions.append(result)
+        print(f"{result['corpus']:<9} {result['target']:<11} throughput {throughput:+7.1%}  "
+              f"p99 {latency:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=",".join(CORPORA), help="Comma-separated corpora")
+    parser.add_argument("--target", default="webhook,batch", help=f"Comma-separated targets: {', '.join(TARGETS)}")
+    parser.add_argument("--alerts", type=int, default=5000, help="Alerts per scenario")
+    parser.add_argument("--rate", type=float, default=0, help="Offered alerts/s (0: as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent senders")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="Sharded listener processes (serve.py)")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the listener to drain")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra listener environment, e.g. --env DEDUP_WINDOW=10")
+    parser.add_argument("--out", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Earlier --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    targets = args.target.split(",")
+    unknown = set(targets).difference(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    listener_env = {"LOG_CONSOLE": "false"}
+    listener_env.update(item.split("=", 1) for item in args.env)
+
+    results = []
+    for corpus_name in args.corpus.split(","):
+        alerts = build_corpus(corpus_name, args.alerts, args.seed)
+        for target in targets:
+            result = run_scenario(corpus_name, alerts, target, args, listener_env)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(f"{corpus_name:<9} {target:<11} {result['throughput']:9.1f} alerts/s  "
+                  f"p50 {latency['p50']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+                  f"rss {result['rss_mb']} MB (peak {result['peak_rss_mb']})  "
+                  f"rejected {result['rejected']}  errors {result['errors']}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "listener_env": listener_env,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Memory and /alerts encoding cost of parsed vs raw-bytes alerts
+
+Stores --alerts large syscheck alerts (with a --diff-bytes diff) in an
+AlertStore, once with raw_alert as the parsed dict and once as a
+RawAlert holding the request body, and reports the memory held by the
+store and the time to encode every page of --page alerts with
+iter_page_json.
+
+Usage:
+    python3 bench_raw_alert.py --alerts 5000 --diff-bytes 8192 --page 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_page import iter_page_json
+from alert_store import AlertStore
+from raw_alert import RawAlert
+
+
+def make_body(i, diff_bytes):
+    lines = "\n".join(f"-<p>line {n} of page {i}</p>" for n in range(diff_bytes // 24))
+    return json.dumps({
+        "id": f"1700000000.{i}",
+        "rule": {"id": "550", "level": 7, "description": "Integrity checksum changed."},
+        "agent": {"id": "001", "name": f"web-{i % 20}", "ip": "10.0.0.1"},
+        "location": "syscheck",
+        "full_log": f"File '/var/www/html/page{i}.html' modified",
+        "syscheck": {
+            "path": f"/var/www/html/page{i}.html",
+            "sha256_after": f"{i:064x}",
+            "diff": lines,
+            "changed_attributes": ["size", "mtime", "md5", "sha1", "sha256"],
+        },
+    }).encode()
+
+
+def processed(alert_data):
+    return {
+        "timestamp": "2026-01-01T00:00:00",
+        "alert_id": alert_data.get("id"),
+        "rule_id": alert_data.get("rule", {}).get("id"),
+        "rule_level": alert_data.get("rule", {}).get("level"),
+        "rule_description": alert_data.get("rule", {}).get("description"),
+        "agent_name": alert_data.get("agent", {}).get("name"),
+        "agent_ip": alert_data.get("agent", {}).get("ip"),
+        "location": alert_data.get("location"),
+        "full_log": alert_data.get("full_log"),
+        "raw_alert": alert_data,
+    }
+
+
+def run(count, diff_bytes, raw, page):
+    store = AlertStore(max_alerts=count, max_bytes=1 << 40)
+    tracemalloc.start()
+    for i in range(count):
+        # The request body is allocated either way; only RawAlert keeps it
+        body = make_body(i, diff_bytes)
+        alert_data = json.loads(body)
+        if raw:
+            alert_data = RawAlert(body, alert_data)
+        store.add(processed(alert_data), size=len(body))
+        if raw:
+            alert_data.release()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    encoded = 0
+    for low in range(0, count, page):
+        records = store.query(limit=page, after_seq=low - 1)
+        encoded += sum(len(chunk) for chunk in iter_page_json((r.seq, r) for r in records))
+    return held, time.perf_counter() - start, encoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--diff-bytes", type=int, default=8192)
+    parser.add_argument("--page", type=int, default=500)
+    args = parser.parse_args()
+
+    payload = sum(len(make_body(i, args.diff_bytes)) for i in range(args.alerts))
+    print(f"alerts: {args.alerts}  payload: {payload / 1e6:.1f} MB")
+
+    for raw in (False, True):
+        held, elapsed, encoded = run(args.alerts, args.diff_bytes, raw, args.page)
+        print(f"{'raw bytes' if raw else 'parsed dict':<12} held {held / 1e6:8.1f} MB  "
+              f"encode {elapsed * 1000:8.1f} ms  ({encoded / elapsed / 1e6:7.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
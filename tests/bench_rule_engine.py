@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Per-alert dispatch cost of the compiled RuleEngine vs a linear if-chain
+
+Generates rule tables of 10, 100 and 1000 rules (level thresholds,
+rule-ID sets, location prefixes, description keywords and combinations)
+and dispatches the same alerts through:
+
+    linear      every rule checked in turn, as handle_specific_alerts did
+    compiled    RuleEngine lookups plus the keyword automaton
+
+Usage:
+    python3 bench_rule_engine.py --alerts 20000 --rules 10 100 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from rule_engine import Rule, RuleEngine
+
+WORDS = [
+    "sshd", "authentication", "failed", "success", "integrity", "checksum", "changed",
+    "login", "session", "opened", "closed", "sudo", "root", "firewall", "drop", "web",
+    "attack", "sql", "injection", "scan", "port", "rootcheck", "anomaly", "trojan",
+]
+LOCATIONS = ["syscheck", "/var/log/auth.log", "/var/log/secure", "/var/log/nginx/access.log",
+             "rootcheck", "journald", "EventChannel", "/var/ossec/logs/active-responses.log"]
+
+
+def noop(alert, rule):
+    pass
+
+
+def make_rules(count, rng):
+    # Like real handler tables: most rules key on rule IDs or specific
+    # keywords, optionally narrowed by level, plus a few broad catch-alls
+    rules = [
+        Rule("high_severity", noop, min_level=12),
+        Rule("file_change", noop, locations=["syscheck"]),
+    ]
+    for i in range(count - len(rules)):
+        conditions = {}
+        kind = rng.random()
+        if kind < 0.6:
+            conditions["rule_ids"] = [str(rng.randint(500, 100500)) for _ in range(rng.randint(1, 5))]
+        elif kind < 0.9:
+            conditions["keywords"] = [f"{rng.choice(WORDS)}_{i}"]
+        else:
+            conditions["locations"] = [f"/var/log/app{i}"]
+        if rng.random() < 0.5:
+            conditions["min_level"] = rng.randint(3, 15)
+        rules.append(Rule(f"rule_{i}", noop, **conditions))
+    return rules
+
+
+def make_alerts(count, rng):
+    alerts = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 8))]
+        if rng.random() < 0.05:
+            words.append(f"{rng.choice(WORDS)}_{rng.randint(0, 1000)}")
+        alerts.append({
+            "rule_level": rng.randint(0, 15),
+            "rule_id": str(rng.randint(500, 100500)),
+            "location": rng.choice(LOCATIONS) if rng.random() < 0.9 else f"/var/log/app{rng.randint(0, 1000)}.log",
+            "rule_description": " ".join(words),
+        })
+    return alerts
+
+
+def linear_dispatch(rules, alert):
+    matched = []
+    for rule in rules:
+        level = alert["rule_level"]
+        if rule.min_level is not None and not (isinstance(level, int) and level >= rule.min_level):
+            continue
+        if rule.rule_ids and alert["rule_id"] not in rule.rule_ids:
+            continue
+        if rule.locations and not any(alert["location"].startswith(prefix) for prefix in rule.locations):
+            continue
+        if rule.keywords:
+            description = alert["rule_description"].lower()
+            if not any(keyword in description for keyword in rule.keywords):
+                continue
+        rule.action(alert, rule)
+        matched.append(rule.name)
+    return matched
+
+
+def measure(dispatch, alerts):
+    start = time.perf_counter()
+    matched = 0
+    for alert in alerts:
+        matched += len(dispatch(alert))
+    return (time.perf_counter() - start) / len(alerts), matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=20000, help="Alerts dispatched per run")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000], help="Rule table sizes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    alerts = make_alerts(args.alerts, rng)
+
+    print(f"alerts: {args.alerts}")
+    for count in args.rules:
+        rules = make_rules(count, rng)
+        engine = RuleEngine(rules)
+
+        linear, linear_matched = measure(lambda alert: linear_dispatch(rules, alert), alerts)
+        compiled, compiled_matched = measure(engine.dispatch, alerts)
+        if linear_matched != compiled_matched:
+            raise RuntimeError(f"Match mismatch: linear {linear_matched}, compiled {compiled_matched}")
+
+        print(
+            f"rules {count:5d}  linear {linear * 1e6:8.2f} us/alert"
+            f"  compiled {compiled * 1e6:7.2f} us/alert"
+            f"  ({compiled_matched / len(alerts):.2f} matches/alert)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Load test for the /alerts/stream Server-Sent Events endpoint
+
+Starts the Flask listener in-process on a free local port, connects
+--subscribers stream clients (plus --slow clients that sleep on every
+event), then posts --alerts alerts to /webhook/wazuh at --rate alerts/s.
+Reports per-event delivery latency (POST sent -> event parsed by the
+client), how many events every fast subscriber received, and how many
+slow subscribers were cut off with an overflow event instead of holding
+back the others.
+
+Usage:
+    python3 bench_sse_stream.py --subscribers 300 --slow 10 --alerts 2000 --rate 500
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def make_alert(i):
+    # Wazuh-style "<epoch>.<n>" ID; subscribers read the send time from it
+    return {
+        "id": f"{time.time():.6f}.{i}",
+        "rule": {"id": "550", "level": 7, "description": "Integrity checksum changed."},
+        "agent": {"id": f"{i % 20:03d}", "name": f"web-{i % 20}", "ip": f"10.0.0.{i % 20}"},
+        "location": "syscheck",
+        "full_log": f"File '/var/www/html/page{i}.html' modified\n" + "x" * 2000,
+    }
+
+
+def start_server(buffer_size):
+    # The listener logs to ./log relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="bench_sse_")
+    os.makedirs(os.path.join(workdir, "log"), exist_ok=True)
+    os.chdir(workdir)
+    os.environ["SSE_CLIENT_BUFFER"] = str(buffer_size)
+    os.environ["SSE_HEARTBEAT"] = "1"
+    os.environ["LOG_CONSOLE"] = "false"
+
+    import flask_server
+
+    server = make_server("127.0.0.1", 0, flask_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}", flask_server
+
+
+class Subscriber(threading.Thread):
+    def __init__(self, url, delay=0.0):
+        super().__init__(daemon=True)
+        self.url = url
+        self.delay = delay
+        self.latencies = []
+        self.overflowed = False
+        self.error = None
+
+    def run(self):
+        try:
+            with requests.get(self.url, stream=True, timeout=60) as response:
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: ") and event == "overflow":
+                        self.overflowed = True
+                        return
+                    elif line.startswith("data: ") and event == "alert":
+                        sent = float(json.loads(line[6:])["alert_id"].rsplit(".", 1)[0])
+                        self.latencies.append(time.time() - sent)
+                        if self.delay:
+                            time.sleep(self.delay)
+        except requests.RequestException as e:
+            self.error = repr(e)
+
+
+def run_subscribers(url, count, delay, expected, results):
+    """Subscriber process: count client threads, reporting back once done"""
+    subscribers = [Subscriber(url, delay) for _ in range(count)]
+    for subscriber in subscribers:
+        subscriber.start()
+    results.put(None)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline and any(
+        len(s.latencies) < expected and not s.overflowed and s.error is None for s in subscribers
+    ):
+        time.sleep(0.05)
+    results.put((delay, [(s.latencies, s.overflowed, s.error) for s in subscribers]))
+
+
+def split(total, parts):
+    parts = max(1, min(parts, total))
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=300, help="Fast stream clients")
+    parser.add_argument("--slow", type=int, default=10, help="Clients that sleep 50 ms per event")
+    parser.add_argument("--processes", type=int, default=4, help="Client processes for the fast subscribers")
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500, help="Alerts per second posted")
+    parser.add_argument("--buffer", type=int, default=1000, help="SSE_CLIENT_BUFFER")
+    args = parser.parse_args()
+
+    server, base_url, flask_server = start_server(args.buffer)
+
+    # Clients run in their own processes so they do not share the server's GIL
+    results = multiprocessing.Queue()
+    groups = [(f"{base_url}/alerts/stream?fields=alert_id", count, 0.0)
+              for count in split(args.subscribers, args.processes)]
+    if args.slow:
+        groups.append((f"{base_url}/alerts/stream", args.slow, 0.05))
+    processes = [
+        multiprocessing.Process(target=run_subscribers, args=(url, count, delay, args.alerts, results), daemon=True)
+        for url, count, delay in groups
+    ]
+
+    try:
+        for process in processes:
+            process.start()
+        for _ in processes:
+            results.get(timeout=60)
+        deadline = time.monotonic() + 30
+        while len(flask_server.alert_broker) < args.subscribers + args.slow and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print(f"connected: {len(flask_server.alert_broker)} subscribers")
+
+        start = time.perf_counter()
+        with requests.Session() as session:
+            for i in range(args.alerts):
+                wait = start + i / args.rate - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                session.post(f"{base_url}/webhook/wazuh", json=make_alert(i), timeout=30).raise_for_status()
+        flask_server.ingest_pipeline.join()
+        post_elapsed = time.perf_counter() - start
+
+        reports = [results.get(timeout=150) for _ in processes]
+        elapsed = time.perf_counter() - start
+        stats = flask_server.alert_broker.stats()
+    finally:
+        server.shutdown()
+        for process in processes:
+            process.terminate()
+
+    fast = [client for delay, clients in reports if not delay for client in clients]
+    slow = [client for delay, clients in reports if delay for client in clients]
+    latencies = [latency for client in fast for latency in client[0]]
+    complete = sum(1 for latencies_, _, _ in fast if len(latencies_) == args.alerts)
+    errors = [error for _, _, error in fast + slow if error is not None]
+
+    print(f"alerts: {args.alerts} at {args.rate:.0f}/s, posted in {post_elapsed:.2f}s, drained in {elapsed:.2f}s")
+    print(f"fast subscribers complete: {complete}/{args.subscribers}")
+    print(f"events delivered         : {len(latencies)} ({len(latencies) / elapsed:.0f}/s)")
+    print(f"latency p50 / p99 / max  : {percentile(latencies, 50) * 1000:.1f} / "
+          f"{percentile(latencies, 99) * 1000:.1f} / {max(latencies, default=0) * 1000:.1f} ms")
+    print(f"slow subscribers cut off : {sum(1 for _, overflowed, _ in slow if overflowed)}/{args.slow}")
+    print(f"client errors            : {len(errors)}{f' ({errors[0]})' if errors else ''}")
+    print(f"broker                   : {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cost and speed of the /alerts/search full-text index
+
+Fills an AlertStore of --alerts capacity with twice as many alerts from
+the mixed, sshd and syscheck corpora (so half are evicted again), with
+and without the search index, and reports the ingest cost per alert and
+the memory the index adds. Then times a set of queries through the index
+against scanning every stored alert's text, which is what a search cost
+before.
+
+Usage:
+    python3 bench_text_index.py --alerts 200000
+    python3 bench_text_index.py --alerts 1000000 --no-memory
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_corpus import build_corpus
+from alert_store import AlertStore
+from text_index import indexed_text, parse_query
+
+QUERIES = (
+    "203.0.113.7",
+    "sshd root",
+    "invalid OR closed",
+    '"login session opened"',
+    "/var/www/html/blog*",
+    "brut*",
+    "nginx 404 cart.php",
+    "198.51.100.* mozilla",
+)
+
+
+def processed_alerts(count):
+    """Corpus alerts shaped like process_wazuh_alert output"""
+    alerts = []
+    per_corpus = count // 3 + 1
+    for name in ("mixed", "sshd", "syscheck"):
+        for alert in build_corpus(name, per_corpus, seed=1):
+            alerts.append({
+                "timestamp": alert["timestamp"],
+                "alert_id": alert["id"],
+                "rule_id": alert["rule"]["id"],
+                "rule_level": alert["rule"]["level"],
+                "rule_description": alert["rule"]["description"],
+                "agent_name": alert["agent"]["name"],
+                "agent_ip": alert["agent"]["ip"],
+                "location": alert["location"],
+                "full_log": alert["full_log"],
+                "raw_alert": None,
+            })
+    # Interleave the corpora so every query has matches across the store
+    return [alerts[i] for j in range(per_corpus) for i in (j, j + per_corpus, j + 2 * per_corpus)][:count]
+
+
+def fill(alerts, capacity, search_index, trace):
+    store = AlertStore(max_alerts=capacity, max_bytes=1 << 40, search_index=search_index)
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for alert in alerts:
+        store.add(alert, size=len(alert["full_log"]))
+    elapsed = time.perf_counter() - start
+    held = None
+    if trace:
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return store, elapsed, held
+
+
+def timed(call, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=200000, help="Store capacity")
+    parser.add_argument("--limit", type=int, default=50, help="Page size of the queries")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) tracemalloc runs")
+    args = parser.parse_args()
+
+    alerts = processed_alerts(args.alerts * 2)
+    trace = not args.no_memory
+
+    _, plain_seconds, plain_bytes = fill(alerts, args.alerts, False, trace)
+    store, indexed_seconds, indexed_bytes = fill(alerts, args.alerts, True, trace)
+    per_alert = (indexed_seconds - plain_seconds) / len(alerts) * 1e6
+
+    print(f"alerts stored  : {len(store)} (of {len(alerts)} added)")
+    print(f"add, no index  : {plain_seconds / len(alerts) * 1e6:7.2f} us/alert")
+    print(f"add, indexed   : {indexed_seconds / len(alerts) * 1e6:7.2f} us/alert  (+{per_alert:.2f} us incl. eviction)")
+    if trace:
+        extra = indexed_bytes - plain_bytes
+        print(f"index memory   : {extra / 2 ** 20:7.1f} MB  ({extra / len(store):.0f} B/alert, "
+              f"{store.search_words} words)")
+
+    records = [store.get(seq) for seq in range(store._head_seq, store._next_seq)]
+    print(f"\n{'query':<26} {'hits':>6} {'index ms':>9} {'scan ms':>9}")
+    for query in QUERIES:
+        groups = parse_query(query)
+        index_seconds, hits = timed(lambda: store.search(groups, limit=args.limit), args.repeats)
+
+        def scan():
+            matches = []
+            for record in reversed(records):
+                text = indexed_text(record)
+                if any(all(term.matches(text) for term in group) for group in groups):
+                    matches.append(record)
+                    if len(matches) >= args.limit:
+                        break
+            return matches
+
+        scan_seconds, expected = timed(scan, 1)
+        assert [r.seq for r in hits] == [r.seq for r in reversed(expected)], query
+        print(f"{query:<26} {len(hits):>6} {index_seconds * 1000:9.2f} {scan_seconds * 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
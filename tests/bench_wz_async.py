@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Fan-out of per-agent queries: sync WazuhService vs AsyncWazuhService
+
+Fetches /agents/<id>/stats/agent for every agent of a local stub Wazuh
+API (see wazuh_stub.py, run in its own process), which adds --latency
+seconds per request to emulate a real manager:
+
+    sync        one WazuhService call after another
+    sync-pool   WazuhService shared by a thread pool of --concurrency
+    async       AsyncWazuhService.gather_agent_info with --concurrency
+
+Usage:
+    python3 bench_wz_async.py --agents 500 --latency 0.02 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wazuh.services import AsyncWazuhService, WazuhService
+from wazuh_stub import start_stub_process
+
+
+def check(results):
+    errors = [r for r in results if "data" not in r]
+    if errors:
+        raise RuntimeError(f"{len(errors)} failed calls, first: {errors[0]}")
+
+
+def bench_sync(base_url, agent_ids, concurrency):
+    service = WazuhService(pool_size=concurrency, cache_ttls={"agent_info": 0})
+    service.connect(base_url, username="wazuh", password="wazuh")
+    try:
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(service.get_agent_info, agent_ids))
+        else:
+            results = [service.get_agent_info(agent_id) for agent_id in agent_ids]
+        elapsed = time.perf_counter() - start
+    finally:
+        service.close()
+    check(results)
+    return elapsed
+
+
+async def bench_async(base_url, agent_ids, concurrency):
+    async with AsyncWazuhService(pool_size=concurrency, max_concurrency=concurrency) as service:
+        result = await service.connect(base_url, username="wazuh", password="wazuh")
+        if not result.get("connected"):
+            raise RuntimeError(result)
+        start = time.perf_counter()
+        results = await service.gather_agent_info(agent_ids)
+        elapsed = time.perf_counter() - start
+    check(list(results.values()))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=500, help="Agents to query")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request (seconds)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Thread pool size / async concurrency limit")
+    args = parser.parse_args()
+
+    stub, base_url = start_stub_process(agents=args.agents, latency=args.latency)
+    agent_ids = [f"{i:03d}" for i in range(args.agents)]
+
+    print(f"agents: {args.agents}, stub latency: {args.latency * 1000:.0f} ms, concurrency: {args.concurrency}")
+    try:
+        for name, elapsed in (
+            ("sync", bench_sync(base_url, agent_ids, 1)),
+            ("sync-pool", bench_sync(base_url, agent_ids, args.concurrency)),
+            ("async", asyncio.run(bench_async(base_url, agent_ids, args.concurrency))),
+        ):
+            print(f"{name:10s} {elapsed:7.3f}s  {args.agents / elapsed:8.0f} calls/s")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
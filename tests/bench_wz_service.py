@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of WazuhService against a local stub Wazuh API
+
+Compares the pooled WazuhService session with one-shot module-level
+requests calls (a new TCP/TLS connection per call, as _request used to
+do). Use --tls to include the TLS handshake, which dominates real Wazuh
+deployments, and --threads to share one service across worker threads.
+
+Usage:
+    python3 bench_wz_service.py --calls 500 --tls --threads 8
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wazuh.services import WazuhService
+from wazuh_stub import start_stub
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def unpooled_call(base_url, agent_id):
+    response = requests.request(
+        "GET",
+        f"{base_url}/agents/{agent_id}/stats/agent",
+        headers={"Authorization": "Bearer stub-token", "Content-Type": "application/json"},
+        verify=False,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def pooled_call(service, agent_id):
+    result = service.get_agent_info(agent_id)
+    if "error" in result and result["error"]:
+        raise RuntimeError(result["error"])
+    return result
+
+
+def measure(call, calls, threads):
+    latencies = []
+
+    def timed(i):
+        start = time.perf_counter()
+        call(f"{i % 100:03d}")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(timed, range(calls)))
+    else:
+        for i in range(calls):
+            timed(i)
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name, elapsed, latencies):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:10s} {len(latencies) / elapsed:8.0f} calls/s"
+        f"  mean {statistics.mean(latencies) * 1000:6.2f} ms"
+        f"  p50 {statistics.median(latencies) * 1000:6.2f} ms"
+        f"  p99 {p99 * 1000:6.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="API calls per client")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent caller threads")
+    parser.add_argument("--tls", action="store_true", help="Serve the stub over HTTPS")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(tls=args.tls)
+
+    # Disable the response cache so every call reaches the stub
+    service = WazuhService(pool_size=max(args.threads, 1), cache_ttls={"agent_info": 0})
+    result = service.connect(base_url, username="wazuh", password="wazuh", verify_certs=False)
+    if not result.get("connected"):
+        raise SystemExit(f"Could not connect to stub: {result}")
+
+    print(f"stub: {base_url}, calls: {args.calls}, threads: {args.threads}")
+    try:
+        report("unpooled", *measure(lambda agent_id: unpooled_call(base_url, agent_id), args.calls, args.threads))
+        report("pooled", *measure(lambda agent_id: pooled_call(service, agent_id), args.calls, args.threads))
+    finally:
+        service.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
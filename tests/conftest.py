@@ -0,0 +1,3 @@
+# Manual scripts that talk to a live Wazuh manager or serve a webhook;
+# run them directly, not under pytest
+collect_ignore = ["test_wz_service.py", "test_wz_webhook.py"]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for archive aggregations (backend/alert_archive.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_archive.py
+"""
+
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_archive import PARTITION_SECONDS, AlertArchive
+
+# An hour boundary
+BASE = 1_700_000_000 // PARTITION_SECONDS * PARTITION_SECONDS
+
+AGENTS = ("web-01", "WEB-02", "db-01", "mail")
+RULES = ("31101", "31151", "554", "100201")
+
+
+def make_alerts(count, hours=5, seed=3):
+    rng = random.Random(seed)
+    times = sorted(BASE + rng.uniform(0, hours * PARTITION_SECONDS) for _ in range(count))
+    alerts = []
+    for seq, ts in enumerate(times):
+        level = rng.choice((3, 5, 7, 10, 12, None))
+        alerts.append((seq, level, rng.choice(AGENTS), rng.choice(RULES), ts))
+    return alerts
+
+
+def reference(alerts, since=None, until=None, min_level=None, agent=None, rule_id=None):
+    """Brute-force counts of the alerts aggregate() should see"""
+    low = None if since is None else math.floor(since)
+    high = None if until is None else math.floor(until)
+    levels, agents, rules = Counter(), Counter(), Counter()
+    for _, level, name, rule, ts in alerts:
+        second = math.floor(ts)
+        if low is not None and second < low or high is not None and second >= high:
+            continue
+        if min_level and (level is None or level < min_level):
+            continue
+        if agent and agent.lower() not in name.lower():
+            continue
+        if rule_id and rule != str(rule_id):
+            continue
+        levels["N/A" if level is None else str(level)] += 1
+        agents[name] += 1
+        rules[rule] += 1
+    return {"total_alerts": sum(levels.values()), "alerts_by_level": dict(levels),
+            "alerts_by_agent": dict(agents), "alerts_by_rule": dict(rules)}
+
+
+class AggregateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="wz-archive-")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def fill(self, archive, alerts):
+        for seq, level, agent, rule, ts in alerts:
+            archive.add(seq, level, agent, rule, ts=ts)
+
+    def check(self, archive, alerts, **kwargs):
+        result = archive.aggregate(interval=None, **kwargs)
+        self.assertEqual(result, reference(alerts, **kwargs), kwargs)
+
+    def test_fractional_bounds_are_floored(self):
+        archive = AlertArchive(retention_seconds=None)
+        alerts = [(0, 5, "web-01", "31101", BASE + 10.0), (1, 5, "web-01", "31101", BASE + 10.5),
+                  (2, 5, "web-01", "31101", BASE + 11.9), (3, 5, "web-01", "31101", BASE + 12.0)]
+        self.fill(archive, alerts)
+        self.assertEqual(archive.aggregate(since=BASE + 10.7)["total_alerts"], 4)
+        self.assertEqual(archive.aggregate(since=BASE + 11.0)["total_alerts"], 2)
+        self.assertEqual(archive.aggregate(until=BASE + 11.9)["total_alerts"], 2)
+        self.assertEqual(archive.aggregate(until=BASE + 12.0)["total_alerts"], 3)
+        self.assertEqual(archive.aggregate(since=BASE + 11.5, until=BASE + 11.99)["total_alerts"], 0)
+        self.assertEqual(archive.aggregate(since=BASE + 11.5, until=BASE + 12.5)["total_alerts"], 1)
+
+    def test_partition_boundaries(self):
+        alerts = [(0, 3, "web-01", "554", BASE + PARTITION_SECONDS - 1),
+                  (1, 7, "web-01", "554", BASE + PARTITION_SECONDS),
+                  (2, 7, "web-01", "554", BASE + 2 * PARTITION_SECONDS - 0.5)]
+        for sealed in (False, True):
+            with self.subTest(sealed=sealed):
+                archive = AlertArchive(retention_seconds=None)
+                self.fill(archive, alerts)
+                if sealed:
+                    archive.close()
+                    self.assertEqual(archive.stats()["open_partitions"], 0)
+                edge = BASE + PARTITION_SECONDS
+                self.assertEqual(archive.aggregate(until=edge)["alerts_by_level"], {"3": 1})
+                self.assertEqual(archive.aggregate(since=edge)["alerts_by_level"], {"7": 2})
+                self.assertEqual(archive.aggregate(since=edge - 1, until=edge + 1)["total_alerts"], 2)
+                self.assertEqual(archive.aggregate(since=edge, until=edge)["total_alerts"], 0)
+                self.assertEqual(archive.aggregate(since=edge + PARTITION_SECONDS)["total_alerts"], 0)
+                self.assertEqual(archive.aggregate(until=BASE)["total_alerts"], 0)
+
+    def test_matches_brute_force(self):
+        alerts = make_alerts(3000)
+        archive = AlertArchive(self.dir, retention_seconds=None)
+        self.fill(archive, alerts)
+        # The newest partitions are still open; the older ones sealed
+        stats = archive.stats()
+        self.assertGreater(stats["partitions"], 0)
+        self.assertGreater(stats["open_partitions"], 0)
+
+        rng = random.Random(11)
+        bounds = [None, BASE, BASE + PARTITION_SECONDS, BASE + 2.5 * PARTITION_SECONDS]
+        bounds += [BASE + rng.uniform(0, 5 * PARTITION_SECONDS) for _ in range(6)]
+        filters = [{}, {"min_level": 7}, {"agent": "web"}, {"agent": "nobody"}, {"rule_id": 554},
+                   {"min_level": 10, "agent": "WEB-0", "rule_id": "31101"}]
+        for since in bounds:
+            for until in bounds:
+                for extra in filters:
+                    self.check(archive, alerts, since=since, until=until, **extra)
+
+        archive.close()
+        reloaded = AlertArchive(self.dir, retention_seconds=None)
+        self.assertEqual(reloaded.next_seq, len(alerts))
+        for extra in filters:
+            self.check(reloaded, alerts, since=bounds[3], until=bounds[-1], **extra)
+            self.check(reloaded, alerts, **extra)
+
+    def test_timeline(self):
+        alerts = make_alerts(500, hours=3)
+        archive = AlertArchive(retention_seconds=None)
+        self.fill(archive, alerts)
+        for interval in (60, 900, PARTITION_SECONDS, 2 * PARTITION_SECONDS):
+            with self.subTest(interval=interval):
+                since = BASE + 1234.5
+                result = archive.aggregate(since=since, interval=interval, group_by=())
+                expected = Counter(int(ts) // interval * interval for _, _, _, _, ts in alerts
+                                   if int(ts) >= int(since))
+                self.assertEqual(result["bucket_seconds"], interval)
+                self.assertEqual({bucket["start"]: bucket["count"] for bucket in result["timeline"]}, expected)
+                self.assertEqual(result["total_alerts"], sum(expected.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
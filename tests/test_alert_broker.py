@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the live-stream fan-out (backend/alert_broker.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_broker.py
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import alert_broker
+from alert_broker import AlertBroker
+
+
+def processed(seq, level=5, agent="web-01", rule_id="554"):
+    return {"alert_id": str(seq), "rule_level": level, "agent_name": agent, "rule_id": rule_id}
+
+
+def seqs(events):
+    return [seq for seq, _ in events]
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FilterTest(unittest.TestCase):
+
+    def test_filters_and_projection(self):
+        broker = AlertBroker()
+        everything = broker.subscribe()
+        high = broker.subscribe(min_level=10, fields=("seq", "rule_level"))
+        web = broker.subscribe(agent="WEB", rule_id="554", fields=("seq", "rule_level"))
+
+        broker.publish(0, processed(0, level=12, agent="db-01"))
+        broker.publish(1, processed(1, level=3, agent="Web-02"))
+        broker.publish(2, processed(2, level="high", agent=None, rule_id="1"))
+
+        self.assertEqual(seqs(everything.get(0)), [0, 1, 2])
+        self.assertEqual([json.loads(payload) for _, payload in high.get(0)], [{"seq": 0, "rule_level": 12}])
+        self.assertEqual(seqs(web.get(0)), [1])
+
+    def test_alert_is_encoded_once_per_projection(self):
+        broker = AlertBroker()
+        subscriptions = [broker.subscribe(fields=("seq",)) for _ in range(3)] + [broker.subscribe()]
+        with mock.patch.object(alert_broker, "encode_alert", wraps=alert_broker.encode_alert) as encode:
+            broker.publish(0, processed(0))
+        self.assertEqual(encode.call_count, 2)
+        payloads = [subscription.get(0)[0][1] for subscription in subscriptions]
+        self.assertIs(payloads[0], payloads[1])
+        self.assertEqual(json.loads(payloads[3])["alert_id"], "0")
+
+    def test_no_subscribers(self):
+        broker = AlertBroker()
+        broker.publish(0, processed(0))
+        self.assertEqual(broker.stats()["published"], 0)
+
+    def test_max_subscribers(self):
+        broker = AlertBroker(max_subscribers=2)
+        first = broker.subscribe()
+        broker.subscribe()
+        self.assertIsNone(broker.subscribe())
+        broker.unsubscribe(first)
+        self.assertIsNotNone(broker.subscribe())
+
+
+class OrderingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(alert_broker.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broker = AlertBroker(buffer_size=100)
+        self.subscription = self.broker.subscribe()
+
+    def test_out_of_order_publishes_are_delivered_in_order(self):
+        self.broker.publish(10, processed(10))
+        for seq in (12, 13, 11, 15, 14):
+            self.broker.publish(seq, processed(seq))
+        self.assertEqual(seqs(self.subscription.get(0)), [10, 11, 12, 13, 14, 15])
+
+    def test_gap_is_held_then_given_up(self):
+        self.broker.publish(0, processed(0))
+        self.broker.publish(2, processed(2))
+        self.broker.publish(3, processed(3))
+        self.assertEqual(seqs(self.subscription.get(0)), [0])
+
+        self.clock.now += AlertBroker.MAX_HOLD_SECONDS + 0.1
+        self.broker.publish(4, processed(4))
+        self.assertEqual(seqs(self.subscription.get(0)), [2, 3, 4])
+
+        # The missing alert is still delivered when it finally arrives
+        self.broker.publish(1, processed(1))
+        self.assertEqual(seqs(self.subscription.get(0)), [1])
+
+    def test_concurrent_publishers(self):
+        order = list(range(2000))
+        random.Random(2).shuffle(order)
+        # Shuffled within small windows, as concurrent ingest workers would
+        order = sorted(order, key=lambda seq: seq // 8)
+        chunks = [order[i::4] for i in range(4)]
+        broker = AlertBroker(buffer_size=5000)
+        subscription = broker.subscribe()
+        threads = [threading.Thread(target=lambda chunk=chunk: [broker.publish(seq, processed(seq)) for seq in chunk])
+                   for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        delivered = seqs(subscription.get(0))
+        self.assertEqual(sorted(delivered), list(range(2000)))
+
+
+class OverflowTest(unittest.TestCase):
+
+    def test_slow_subscriber_overflows(self):
+        broker = AlertBroker(buffer_size=3)
+        slow = broker.subscribe()
+        fast = broker.subscribe()
+        for seq in range(3):
+            broker.publish(seq, processed(seq))
+            self.assertEqual(seqs(fast.get(0)), [seq])
+        broker.publish(3, processed(3))
+
+        self.assertTrue(slow.overflowed)
+        self.assertEqual(slow.get(0), [])
+        self.assertEqual(seqs(fast.get(0)), [3])
+        broker.publish(4, processed(4))
+        self.assertEqual(slow.get(0), [])
+        self.assertEqual(broker.stats()["overflows"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the SQLite alert database (backend/alert_db.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_db.py
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_db import AlertDatabase
+
+AGENTS = ["web-01", "web-02", "db-01", "WEB-03"]
+RULES = ["550", "554", "5710"]
+T0 = datetime(2026, 1, 1).timestamp()
+
+
+def processed(i, rng):
+    return {
+        "timestamp": datetime.fromtimestamp(T0 + i).isoformat(),
+        "alert_id": str(i),
+        "rule_id": rng.choice(RULES),
+        "rule_level": rng.randrange(16),
+        "agent_name": rng.choice(AGENTS),
+        "full_log": f"log line {i}",
+    }
+
+
+class AlertDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="wz-db-")
+        self.path = os.path.join(self.dir, "alerts.db")
+        self.db = AlertDatabase(self.path, batch_size=64, batch_interval=60)
+        rng = random.Random(4)
+        self.alerts = [processed(i, rng) for i in range(300)]
+        for seq, alert in enumerate(self.alerts):
+            self.assertTrue(self.db.add(seq, alert, size=100))
+        self.db.flush()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def expected(self, min_level=None, agent=None, rule_id=None, since=None):
+        return [
+            seq for seq, alert in enumerate(self.alerts)
+            if (not min_level or alert["rule_level"] >= min_level)
+            and (not agent or agent.lower() in alert["agent_name"].lower())
+            and (not rule_id or alert["rule_id"] == rule_id)
+            and (since is None or alert["timestamp"] >= datetime.fromtimestamp(since).isoformat())
+        ]
+
+    def walk(self, direction, limit, **filters):
+        """Every page of a keyset walk, following the cursor of the previous page"""
+        pages = []
+        cursor = -1 if direction == "after_seq" else None
+        while True:
+            page = self.db.query(limit=limit, **filters, **{direction: cursor})
+            if not page:
+                return pages
+            self.assertLessEqual(len(page), limit)
+            pages.append([seq for seq, _, _ in page])
+            cursor = page[-1][0] if direction == "after_seq" else page[0][0]
+
+    def test_keyset_walks_visit_every_match_once(self):
+        for filters in ({}, {"min_level": 10}, {"agent": "web"}, {"rule_id": "554", "agent": "01"},
+                        {"since": T0 + 200}):
+            for limit in (1, 7, 50):
+                with self.subTest(limit=limit, **filters):
+                    expected = self.expected(**filters)
+                    backward = self.walk("before_seq", limit, **filters)
+                    self.assertEqual([seq for page in reversed(backward) for seq in page], expected)
+                    forward = self.walk("after_seq", limit, **filters)
+                    self.assertEqual([seq for page in forward for seq in page], expected)
+
+    def test_pages_are_oldest_first(self):
+        page = self.db.query(limit=3)
+        self.assertEqual([seq for seq, _, _ in page], [297, 298, 299])
+        self.assertEqual(page[0][1], self.alerts[297])
+        self.assertEqual(page[0][2], 100)
+        self.assertEqual([seq for seq, _, _ in self.db.query(limit=3, after_seq=10)], [11, 12, 13])
+
+    def test_no_matching_agent(self):
+        self.assertEqual(self.db.query(agent="mail"), [])
+        self.assertEqual(sorted(self.db.matching_agents("WEB")), ["WEB-03", "web-01", "web-02"])
+
+    def test_occurrence_updates(self):
+        self.db.touch(5, 3, "later")
+        self.db.add(300, {"agent_name": "web-01", "rule_level": "high"})
+        self.db.touch(300, 2, "later")
+        self.db.flush()
+        rows = {seq: alert for seq, alert, _ in self.db.query(limit=500)}
+        self.assertEqual((rows[5]["occurrences"], rows[5]["last_seen"]), (3, "later"))
+        self.assertEqual(rows[300]["occurrences"], 2)
+        # A malformed level stays in the JSON but is not matched by level filters
+        self.assertNotIn(300, [seq for seq, _, _ in self.db.query(min_level=1, limit=500)])
+
+    def test_reopen_and_replay(self):
+        self.db.close()
+        self.db = AlertDatabase(self.path)
+        self.assertEqual((len(self.db), self.db.next_seq), (300, 300))
+        self.assertEqual([seq for seq, _, _ in self.db.replay(3)], [297, 298, 299])
+        self.assertEqual(self.db.matching_agents("db"), ["db-01"])
+
+    def test_full_queue_drops(self):
+        db = AlertDatabase(os.path.join(self.dir, "small.db"), batch_size=100, batch_interval=60, max_pending=2)
+        try:
+            self.assertEqual([db.add(seq, {"rule_level": 1}) for seq in range(3)], [True, True, False])
+            self.assertEqual(db.stats()["dropped"], 1)
+        finally:
+            db.close()
+        self.assertEqual(db.written, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for ingest de-duplication (backend/alert_dedup.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_dedup.py
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_dedup import AlertDeduplicator
+
+
+def processed(**fields):
+    alert = {"rule_id": "554", "agent_name": "web-01", "location": "syscheck", "full_log": "changed",
+             "raw_alert": {"syscheck": {"path": "/var/www/index.html", "sha256_after": "ab"}}}
+    alert.update(fields)
+    return alert
+
+
+def record():
+    return SimpleNamespace(occurrences=1, last_seen=None)
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_configured_fields_only(self):
+        dedup = AlertDeduplicator()
+        key = dedup.fingerprint(processed())
+        self.assertEqual(len(key), 16)
+        self.assertEqual(dedup.fingerprint(processed(timestamp="later", id="2")), key)
+        self.assertNotEqual(dedup.fingerprint(processed(agent_name="web-02")), key)
+        changed = processed()
+        changed["raw_alert"]["syscheck"]["sha256_after"] = "cd"
+        self.assertNotEqual(dedup.fingerprint(changed), key)
+
+    def test_missing_and_non_mapping_paths(self):
+        dedup = AlertDeduplicator(fields=("rule_id", "raw_alert.syscheck.path"))
+        self.assertEqual(dedup.fingerprint({"rule_id": "1"}), dedup.fingerprint({"rule_id": "1", "raw_alert": "x"}))
+
+
+class CheckTest(unittest.TestCase):
+
+    def test_repeats_fold_into_the_stored_record(self):
+        dedup = AlertDeduplicator(window=10)
+        self.assertEqual(dedup.check(b"k", now=100), (False, None))
+        stored = record()
+        dedup.attach(b"k", stored)
+
+        repeat, original = dedup.check(b"k", now=105)
+        self.assertTrue(repeat)
+        self.assertIs(original, stored)
+        self.assertEqual(stored.occurrences, 2)
+        self.assertIsNotNone(stored.last_seen)
+        self.assertEqual(dedup.stats()["unique"], 1)
+        self.assertEqual(dedup.stats()["repeats"], 1)
+
+    def test_repeats_while_first_copy_is_stored(self):
+        dedup = AlertDeduplicator(window=10)
+        dedup.check(b"k", now=100)
+        self.assertEqual(dedup.check(b"k", now=101), (True, None))
+        self.assertEqual(dedup.check(b"k", now=102), (True, None))
+        stored = record()
+        dedup.attach(b"k", stored)
+        self.assertEqual(stored.occurrences, 3)
+
+    def test_window_counts_from_first_copy(self):
+        dedup = AlertDeduplicator(window=10)
+        dedup.check(b"k", now=100)
+        self.assertTrue(dedup.check(b"k", now=109)[0])
+        self.assertFalse(dedup.check(b"k", now=110.5)[0])
+        self.assertEqual(len(dedup), 1)
+
+    def test_max_entries(self):
+        dedup = AlertDeduplicator(window=60, max_entries=3)
+        for key in (b"a", b"b", b"c", b"d"):
+            dedup.check(key, now=100)
+        self.assertEqual(len(dedup), 3)
+        self.assertFalse(dedup.check(b"a", now=101)[0])
+        self.assertTrue(dedup.check(b"d", now=101)[0])
+
+    def test_discard_after_failed_store(self):
+        dedup = AlertDeduplicator(window=10)
+        dedup.check(b"k", now=100)
+        dedup.discard(b"k")
+        self.assertEqual(dedup.stats()["unique"], 0)
+        # The next copy is stored instead of being folded into nothing
+        self.assertEqual(dedup.check(b"k", now=101), (False, None))
+        dedup.discard(b"missing")
+        self.assertEqual(len(dedup), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
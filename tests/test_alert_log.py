@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the segmented alert log (backend/alert_log.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_log.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import alert_log
+from alert_log import HEADER, SEGMENT_SUFFIX, AlertLog
+
+
+def alert(seq):
+    return {"seq": seq, "rule_level": seq % 16, "full_log": f"alert {seq} " + "x" * 40}
+
+
+class AlertLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="wz-alert-log-")
+        self.logs = []
+
+    def tearDown(self):
+        for log in self.logs:
+            log.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def open_log(self, **kwargs):
+        kwargs.setdefault("sync_interval", 60)
+        log = AlertLog(self.dir, **kwargs)
+        self.logs.append(log)
+        return log
+
+    def reopen(self, log, **kwargs):
+        log.close()
+        self.logs.remove(log)
+        return self.open_log(**kwargs)
+
+    def fill(self, log, start, stop):
+        for seq in range(start, stop):
+            log.append(seq, alert(seq), size=100 + seq)
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.dir) if name.endswith(SEGMENT_SUFFIX))
+
+    def test_read_and_replay(self):
+        log = self.open_log(index_interval=4)
+        self.fill(log, 0, 50)
+        self.assertEqual(log.next_seq, 50)
+        self.assertEqual([seq for seq, _, _ in log.read(10, limit=5)], [10, 11, 12, 13, 14])
+        self.assertEqual(log.read(10, limit=1)[0], (10, alert(10), 110))
+        self.assertEqual([seq for seq, _, _ in log.replay(3)], [47, 48, 49])
+        self.assertEqual([seq for seq, _, _ in log.read(0, limit=3, predicate=lambda a: a["rule_level"] == 15)],
+                         [15, 31, 47])
+        self.assertEqual(log.read(0, limit=0), [])
+
+    def test_replay_after_reopen(self):
+        log = self.open_log(segment_bytes=1024, index_interval=2)
+        self.fill(log, 0, 40)
+        log = self.reopen(log, segment_bytes=1024, index_interval=2)
+        self.assertGreater(len(self.segments()), 1)
+        self.assertEqual((log.first_seq, log.next_seq), (0, 40))
+        self.assertEqual([seq for seq, _, _ in log.iter_records()], list(range(40)))
+        self.assertEqual([seq for seq, _, _ in log.replay(5)], list(range(35, 40)))
+
+        # Appends continue in the reopened active segment
+        self.fill(log, 40, 45)
+        self.assertEqual([seq for seq, _, _ in log.replay(6)], list(range(39, 45)))
+
+    def test_sequence_gaps_are_kept(self):
+        log = self.open_log()
+        for seq in (0, 1, 5, 9):
+            log.append(seq, alert(seq))
+        with self.assertRaises(ValueError):
+            log.append(9, alert(9))
+        log = self.reopen(log)
+        self.assertEqual(log.next_seq, 10)
+        self.assertEqual([seq for seq, _, _ in log.read(2)], [5, 9])
+
+    def test_crc_mismatch_stops_recovery(self):
+        log = self.open_log()
+        self.fill(log, 0, 10)
+        log = self.reopen(log)
+        record = HEADER.size + len(alert_log.encode_alert(alert(0)))
+        path = os.path.join(self.dir, self.segments()[0])
+
+        # Flip one payload byte of the record with seq 6
+        with open(path, "r+b") as f:
+            f.seek(6 * record + HEADER.size + 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        log = self.reopen(log)
+        self.assertEqual(log.next_seq, 6)
+        self.assertEqual(os.path.getsize(path), 6 * record)
+        self.assertEqual([seq for seq, _, _ in log.iter_records()], list(range(6)))
+
+        # The sequence numbers lost to the corruption can be written again
+        self.fill(log, 6, 8)
+        self.assertEqual([seq for seq, _, _ in log.iter_records()], list(range(8)))
+
+    def test_torn_tail_is_truncated(self):
+        log = self.open_log()
+        self.fill(log, 0, 5)
+        log = self.reopen(log)
+        path = os.path.join(self.dir, self.segments()[0])
+        size = os.path.getsize(path)
+        with open(path, "ab") as f:
+            f.write(HEADER.pack(500, 5, 0, 0) + b'{"half')
+
+        log = self.reopen(log)
+        self.assertEqual(log.next_seq, 5)
+        self.assertEqual(os.path.getsize(path), size)
+
+    def test_short_write_leaves_log_readable(self):
+        log = self.open_log()
+        self.fill(log, 0, 3)
+        real_write = os.write
+
+        def short_write(fd, data):
+            return real_write(fd, data[:len(data) // 2])
+
+        with mock.patch.object(alert_log.os, "write", short_write):
+            with self.assertRaises(OSError):
+                log.append(3, alert(3))
+        self.assertEqual(log.next_seq, 3)
+
+        self.fill(log, 3, 5)
+        self.assertEqual([seq for seq, _, _ in log.iter_records()], list(range(5)))
+        log = self.reopen(log)
+        self.assertEqual([seq for seq, _, _ in log.iter_records()], list(range(5)))
+
+    def test_retention_by_bytes(self):
+        log = self.open_log(segment_bytes=1024, retention_bytes=3 * 1024)
+        self.fill(log, 0, 200)
+        self.assertLessEqual(log.total_bytes, 3 * 1024 + 1024)
+        self.assertLessEqual(len(self.segments()), 4)
+        self.assertGreater(log.first_seq, 0)
+        self.assertEqual(log.next_seq, 200)
+
+        seqs = [seq for seq, _, _ in log.iter_records()]
+        self.assertEqual(seqs, list(range(log.first_seq, 200)))
+        self.assertEqual(log.read(0, limit=1)[0][0], log.first_seq)
+
+    def test_retention_by_age(self):
+        log = self.open_log(segment_bytes=1024, retention_bytes=None, retention_seconds=3600)
+        self.fill(log, 0, 30)
+        sealed = self.segments()[:-1]
+        self.assertTrue(sealed)
+        stale = time.time() - 7200
+        for name in sealed:
+            os.utime(os.path.join(self.dir, name), (stale, stale))
+
+        # The next roll deletes every stale sealed segment
+        while len(self.segments()) > 1 and self.segments()[0] in sealed:
+            self.fill(log, log.next_seq, log.next_seq + 1)
+        self.assertTrue(set(sealed).isdisjoint(self.segments()))
+        self.assertEqual([seq for seq, _, _ in log.iter_records()][0], log.first_seq)
+
+
+if __name__ == "__main__":
+    unittest.main()
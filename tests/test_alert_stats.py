@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for incremental alert statistics (backend/alert_stats.py)
+
+Usage:
+    python3 -m pytest tests/test_alert_stats.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_stats import AlertStats, TimeBuckets
+
+# A whole hour, so minute and hour buckets start at the same time
+T0 = 1767225600
+
+
+class TimeBucketsTest(unittest.TestCase):
+
+    def test_slots_roll_over(self):
+        buckets = TimeBuckets(width=10, count=3)
+        buckets.add(T0, 3, "a", "1")
+        buckets.add(T0 + 15, 5, "a", "2")
+        self.assertEqual(buckets.collect(T0, T0 + 20)[0], 2)
+
+        # T0 + 30 reuses T0's slot and drops its counts
+        buckets.add(T0 + 30, 7, "b", "1")
+        total, levels, agents, rules, timeline = buckets.collect(T0 - 100, T0 + 30)
+        self.assertEqual(total, 2)
+        self.assertEqual(levels, {5: 1, 7: 1})
+        self.assertEqual(agents, {"a": 1, "b": 1})
+        self.assertEqual(timeline, [(T0 + 10, 1), (T0 + 30, 1)])
+
+    def test_expired_slots_are_skipped(self):
+        buckets = TimeBuckets(width=10, count=3)
+        buckets.add(T0, 3, "a", "1")
+        # Nothing overwrites the slot; it expires once it falls out of the ring span
+        self.assertEqual(buckets.collect(T0 - 100, T0 + 35)[0], 1)
+        self.assertEqual(buckets.collect(T0 - 100, T0 + 45)[0], 0)
+
+
+class AlertStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = AlertStats(interval=60, minute_buckets=60, hour_buckets=24)
+        for minute in range(180):
+            self.stats.add(minute % 16, f"agent-{minute % 3}", "554", ts=T0 + minute * 60)
+        self.now = T0 + 180 * 60 - 1
+
+    def test_lifetime(self):
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot["total_alerts"], 180)
+        self.assertEqual(snapshot["alerts_by_agent"], {"agent-0": 60, "agent-1": 60, "agent-2": 60})
+        self.assertEqual(snapshot["alerts_by_rule"], {"554": 180})
+        self.assertNotIn("timeline", snapshot)
+        self.assertEqual((self.stats.first_seen, self.stats.last_seen), (T0, T0 + 179 * 60))
+
+    def test_recent_window_uses_minute_buckets(self):
+        snapshot = self.stats.snapshot(since=self.now - 10 * 60 + 1, now=self.now)
+        self.assertEqual(snapshot["bucket_seconds"], 60)
+        self.assertEqual(snapshot["total_alerts"], 10)
+        self.assertEqual(len(snapshot["timeline"]), 10)
+        self.assertFalse(snapshot["window_truncated"])
+
+    def test_long_window_uses_hour_buckets(self):
+        snapshot = self.stats.snapshot(since=self.now - 2 * 3600 + 1, now=self.now)
+        self.assertEqual(snapshot["bucket_seconds"], 3600)
+        self.assertEqual(snapshot["total_alerts"], 120)
+        self.assertEqual(snapshot["timeline"], [{"start": T0 + 3600, "count": 60}, {"start": T0 + 7200, "count": 60}])
+
+    def test_window_beyond_retention(self):
+        snapshot = self.stats.snapshot(since=self.now - 48 * 3600, now=self.now)
+        self.assertTrue(snapshot["window_truncated"])
+        self.assertEqual(snapshot["total_alerts"], 180)
+
+    def test_unhashable_values_count_as_unknown(self):
+        stats = AlertStats()
+        stats.add(["x"], {"name": "y"}, "1", ts=T0)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["alerts_by_level"], {"N/A": 1})
+        self.assertEqual(snapshot["alerts_by_agent"], {"N/A": 1})
+        self.assertEqual(stats.snapshot(since=T0, now=T0 + 1)["alerts_by_level"], {"N/A": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the in-memory alert ring buffer (backend/alert_store.py)
+
+AlertStore.query is checked against a linear scan of the stored records,
+so the index walks have to agree with the plain filters.
+
+Usage:
+    python3 -m pytest tests/test_alert_store.py
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alert_store import RECORD_OVERHEAD, AlertStore
+
+AGENTS = ["web-01", "web-02", "db-01", "WEB-03", None]
+RULES = ["550", "554", "5710", "5712", "31101"]
+
+
+def processed(i, level=None, agent=None, rule_id=None):
+    return {
+        "timestamp": f"2026-01-01T00:00:{i:06d}",
+        "alert_id": str(i),
+        "rule_id": rule_id,
+        "rule_level": level,
+        "rule_description": f"alert {i}",
+        "agent_name": agent,
+        "agent_ip": "10.0.0.1",
+        "location": "syscheck",
+        "full_log": f"log line {i}",
+        "raw_alert": {},
+    }
+
+
+def fill(store, count, seed=5):
+    rng = random.Random(seed)
+    for i in range(count):
+        store.add(processed(i, rng.choice([None, "7"] + list(range(16))), rng.choice(AGENTS), rng.choice(RULES)))
+
+
+def linear_query(store, min_level=None, agent=None, rule_id=None, limit=50, before_seq=None, after_seq=None):
+    records = [store.get(seq) for seq in range(store.next_seq - len(store), store.next_seq)]
+    matches = [
+        record for record in records
+        if (before_seq is None or record.seq < before_seq)
+        and (after_seq is None or record.seq > after_seq)
+        and (not min_level or isinstance(record.rule_level, int) and record.rule_level >= min_level)
+        and (not agent or isinstance(record.agent_name, str) and agent.lower() in record.agent_name.lower())
+        and (not rule_id or record.rule_id == rule_id)
+    ]
+    return matches[:limit] if after_seq is not None else matches[-limit:]
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_matches_linear_scan(self):
+        store = AlertStore(max_alerts=300)
+        fill(store, 1000)
+        rng = random.Random(9)
+        for _ in range(500):
+            filters = {
+                "min_level": rng.choice([None, 0, 5, 12, 16]),
+                "agent": rng.choice([None, "web", "01", "nope"]),
+                "rule_id": rng.choice([None, "554", "5712", "0"]),
+                "limit": rng.choice([1, 7, 50, 1000]),
+            }
+            cursor = rng.choice([None, "before_seq", "after_seq"])
+            if cursor:
+                filters[cursor] = rng.randrange(600, 1100)
+            with self.subTest(**filters):
+                self.assertEqual([record.seq for record in store.query(**filters)],
+                                 [record.seq for record in linear_query(store, **filters)])
+
+    def test_pages_without_filters(self):
+        store = AlertStore(max_alerts=10)
+        fill(store, 25)
+        self.assertEqual([record.seq for record in store.query(limit=3)], [22, 23, 24])
+        self.assertEqual([record.seq for record in store.query(limit=3, before_seq=22)], [19, 20, 21])
+        self.assertEqual([record.seq for record in store.query(limit=3, after_seq=0)], [15, 16, 17])
+        self.assertEqual(store.query(limit=0), [])
+        self.assertEqual(store.query(before_seq=15), [])
+
+    def test_unhashable_fields_are_stored_but_not_indexed(self):
+        store = AlertStore()
+        store.add(processed(0, level=3, agent=["not", "a", "name"], rule_id={"id": 1}))
+        store.add(processed(1, level=3, agent="web-01", rule_id="1"))
+        self.assertEqual(len(store.query()), 2)
+        self.assertEqual([record.seq for record in store.query(agent="web")], [1])
+
+
+class EvictionTest(unittest.TestCase):
+
+    def test_count_limit(self):
+        store = AlertStore(max_alerts=5)
+        fill(store, 12)
+        self.assertEqual(len(store), 5)
+        self.assertIsNone(store.get(6))
+        self.assertEqual(store.get(7).alert_id, "7")
+        self.assertEqual(store.latest().seq, 11)
+        # Indexes only hold stored alerts
+        for agent in AGENTS[:-1]:
+            for record in store.query(agent=agent):
+                self.assertGreaterEqual(record.seq, 7)
+
+    def test_byte_budget(self):
+        store = AlertStore(max_alerts=100, max_bytes=3 * (RECORD_OVERHEAD + 1000))
+        for i in range(5):
+            store.add(processed(i, level=3), size=1000)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.total_bytes, 3 * (RECORD_OVERHEAD + 1000))
+
+        # One large alert pushes out as many as it needs, but is always kept
+        store.add(processed(5, level=3), size=10 ** 6)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.latest().seq, 5)
+        store.add(processed(6, level=3), size=10)
+        self.assertEqual([record.seq for record in store.query()], [6])
+        self.assertEqual(store.total_bytes, RECORD_OVERHEAD + 10)
+
+    def test_advance_to(self):
+        store = AlertStore(max_alerts=5)
+        fill(store, 3)
+        store.advance_to(100)
+        self.assertEqual((len(store), store.next_seq), (0, 100))
+        self.assertEqual(store.add(processed(0, level=1)).seq, 100)
+        with self.assertRaises(ValueError):
+            store.advance_to(50)
+
+    def test_rejects_empty_capacity(self):
+        with self.assertRaises(ValueError):
+            AlertStore(max_alerts=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the incremental batch parser (backend/batch_parser.py)
+
+Usage:
+    python3 -m pytest tests/test_batch_parser.py
+"""
+
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from batch_parser import iter_alerts
+
+
+def parse(body, chunk_size=7):
+    if isinstance(body, str):
+        body = body.encode()
+    return list(iter_alerts(io.BytesIO(body), chunk_size=chunk_size))
+
+
+class ArrayTest(unittest.TestCase):
+
+    def test_items_and_source_text(self):
+        alerts = [{"id": i, "rule": {"level": i % 16}, "full_log": "x" * i} for i in range(50)]
+        body = json.dumps(alerts)
+        for chunk_size in (1, 3, 7, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                results = parse(body, chunk_size)
+                self.assertEqual([item for item, _, _ in results], alerts)
+                self.assertTrue(all(error is None for _, _, error in results))
+                self.assertEqual([json.loads(text) for _, text, _ in results], alerts)
+
+    def test_empty_bodies(self):
+        self.assertEqual(parse(""), [])
+        self.assertEqual(parse("  \n\t "), [])
+        self.assertEqual(parse("[]"), [])
+        self.assertEqual(parse(" [ \n ] "), [])
+
+    def test_multibyte_characters_split_across_chunks(self):
+        alerts = [{"full_log": "défacé ☠ página"}, {"full_log": "日本語"}]
+        for chunk_size in (1, 2, 5):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual([item for item, _, _ in parse(json.dumps(alerts, ensure_ascii=False), chunk_size)],
+                                 alerts)
+
+    def test_value_spanning_many_chunks(self):
+        alerts = [{"full_log": "a" * 100000}, {"full_log": "b\\u00e9" * 1000}, 12345678901234567890]
+        results = parse(json.dumps(alerts), chunk_size=64)
+        self.assertEqual([item for item, _, _ in results], alerts)
+
+    def test_scalar_at_chunk_boundary_is_not_cut(self):
+        # "123" ends exactly on the first chunk boundary but continues in the next
+        results = parse("[12345]", chunk_size=4)
+        self.assertEqual(results, [(12345, "12345", None)])
+        # "1." decodes as 1 when the chunk ends after the dot
+        self.assertEqual(parse('[1.5, {"a":1}]', chunk_size=3), [(1.5, "1.5", None), ({"a": 1}, '{"a":1}', None)])
+
+    def test_scalars_at_every_chunk_size(self):
+        body = '[1.5, {"a":1}, -2e-3, 12345678901234567890, true, null, false, 7, 0.25E+2]'
+        expected = json.loads(body)
+        for chunk_size in range(1, len(body) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                results = parse(body, chunk_size)
+                self.assertEqual([item for item, _, _ in results], expected)
+                self.assertTrue(all(error is None for _, _, error in results))
+                self.assertEqual([json.loads(text) for _, text, _ in results], expected)
+
+    def test_data_after_array(self):
+        self.assertEqual(parse('[{"a": 1}] \n'), [({"a": 1}, '{"a": 1}', None)])
+        for body in ('[{"a": 1}] x', '[{"a": 1}][{"b": 2}]', '[] {"c": 3}'):
+            with self.subTest(body=body):
+                results = parse(body)
+                self.assertIsNone(results[-1][0])
+                self.assertIn("after JSON array", results[-1][2])
+
+    def test_malformed_item_reported_after_valid_ones(self):
+        results = parse('[{"a": 1}, {"b": tru}, {"c": 3}]')
+        self.assertEqual([item for item, _, _ in results[:1]], [{"a": 1}])
+        self.assertEqual(len(results), 2)
+        item, text, error = results[1]
+        self.assertIsNone(item)
+        self.assertTrue(error.startswith("Invalid JSON"), error)
+
+    def test_malformed_item_does_not_read_rest_of_body(self):
+        class CountingStream(io.BytesIO):
+            reads = 0
+
+            def read(self, size=-1):
+                CountingStream.reads += 1
+                return super().read(size)
+
+        body = b'[{"a": 1}, {"b": nope}, ' + b'{"pad": "' + b"x" * 1000000 + b'"}]'
+        results = list(iter_alerts(CountingStream(body), chunk_size=1024))
+        self.assertIsNotNone(results[-1][2])
+        self.assertLess(CountingStream.reads, 10)
+
+    def test_truncated_array(self):
+        for body in ('[{"a": 1}', '[{"a": 1},', '[{"a": 1}, {"b": ', '[{"a": "unterminated'):
+            with self.subTest(body=body):
+                results = parse(body)
+                self.assertIsNotNone(results[-1][2])
+                self.assertIsNone(results[-1][0])
+
+    def test_missing_separator(self):
+        results = parse('[{"a": 1} {"b": 2}]')
+        self.assertEqual(results[0][0], {"a": 1})
+        self.assertIn("Expected ','", results[-1][2])
+
+    def test_non_dict_items_are_yielded_as_is(self):
+        # Rejecting them is the endpoint's job; the parser keeps positions intact
+        results = parse('[1, "two", null, [3], {"four": 4}]')
+        self.assertEqual([item for item, _, _ in results], [1, "two", None, [3], {"four": 4}])
+        self.assertTrue(all(error is None for _, _, error in results))
+
+
+class LinesTest(unittest.TestCase):
+
+    def test_ndjson(self):
+        alerts = [{"id": i} for i in range(20)]
+        body = "\n".join(json.dumps(alert) for alert in alerts)
+        for chunk_size in (1, 5, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual([item for item, _, _ in parse(body, chunk_size)], alerts)
+
+    def test_blank_lines_and_trailing_newline(self):
+        results = parse('{"a": 1}\n\n  \r\n{"b": 2}\n')
+        self.assertEqual([item for item, _, _ in results], [{"a": 1}, {"b": 2}])
+
+    def test_invalid_line_does_not_stop_the_batch(self):
+        results = parse('{"a": 1}\n{"b": \n{"c": 3}')
+        self.assertEqual([item for item, _, _ in results], [{"a": 1}, None, {"c": 3}])
+        self.assertIsNone(results[0][2])
+        self.assertTrue(results[1][2].startswith("Invalid JSON"))
+        self.assertEqual(results[1][1], '{"b": ')
+        self.assertIsNone(results[2][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for deface burst correlation (backend/deface_correlator.py)
+
+Usage:
+    python3 -m pytest tests/test_deface_correlator.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from deface_correlator import SAMPLE_PATHS, DefaceCorrelator, path_prefix
+
+T0 = 1767225600.0
+
+
+def change(path, agent="web-01"):
+    return {"agent_name": agent, "raw_alert": {"syscheck": {"path": path}}}
+
+
+class PathPrefixTest(unittest.TestCase):
+
+    def test_prefixes(self):
+        self.assertEqual(path_prefix("/var/www/html/index.php", 3), "/var/www/html")
+        self.assertEqual(path_prefix("/var/www/html/a/b/c.js", 3), "/var/www/html")
+        self.assertEqual(path_prefix("/index.html", 3), "/")
+        self.assertEqual(path_prefix("C:\\inetpub\\WWWROOT\\Default.aspx", 2), "/c:/inetpub")
+
+
+class CorrelatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.correlator = DefaceCorrelator(window=10, threshold=5, prefix_depth=3)
+
+    def burst(self, count, start=T0, step=0.1, agent="web-01", directory="/var/www/html"):
+        return [self.correlator.observe(change(f"{directory}/page{i}.html", agent), now=start + i * step)
+                for i in range(count)]
+
+    def test_burst_opens_one_incident_and_suppresses_the_rest(self):
+        results = self.burst(8)
+        self.assertEqual([suppress for suppress, _ in results], [False] * 5 + [True] * 3)
+        events = [event for _, event in results if event]
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual((event["agent_name"], event["path_prefix"], event["count"]), ("web-01", "/var/www/html", 5))
+        self.assertEqual(len(event["sample_paths"]), 5)
+
+        incident = self.correlator.incidents(now=T0 + 1)[0]
+        self.assertTrue(incident["active"])
+        self.assertEqual(incident["count"], 8)
+        # The returned event is a copy
+        self.assertEqual(event["count"], 5)
+        self.assertEqual(self.correlator.stats()["suppressed"], 3)
+
+    def test_sliding_window_expires_old_buckets(self):
+        # Never more than four changes within 10 s, though the key stays active
+        results = self.burst(20, step=3)
+        self.assertTrue(all(event is None and not suppress for suppress, event in results))
+        self.assertEqual(self.correlator.stats()["incidents_opened"], 0)
+
+    def test_idle_key_starts_over(self):
+        self.burst(4)
+        # 11 s later the key went idle and was dropped with its four changes
+        self.assertEqual(self.burst(4, start=T0 + 11), [(False, None)] * 4)
+        # the new ones still count
+        suppress, event = self.correlator.observe(change("/var/www/html/x.html"), now=T0 + 12)
+        self.assertIsNotNone(event)
+
+    def test_keys_are_per_agent_and_prefix(self):
+        self.burst(3, agent="web-01")
+        self.burst(3, agent="web-02")
+        self.burst(3, directory="/srv/site/public")
+        self.assertEqual(self.correlator.stats()["incidents_opened"], 0)
+        self.assertEqual(self.correlator.stats()["tracked_keys"], 3)
+
+    def test_incident_closes_after_quiet_window(self):
+        self.burst(6)
+        self.assertEqual(self.correlator.observe(change("/var/www/html/late.html"), now=T0 + 9)[0], True)
+        # Still open 9 s after the last change, closed after 10
+        self.assertTrue(self.correlator.incidents(now=T0 + 18)[0]["active"])
+        with self.assertLogs("deface_correlator", level="WARNING"):
+            incidents = self.correlator.incidents(now=T0 + 19.5)
+        self.assertEqual([(incident["active"], incident["count"]) for incident in incidents], [(False, 7)])
+
+        # A new burst opens a new incident
+        events = [event for _, event in self.burst(5, start=T0 + 30) if event]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(self.correlator.stats()["incidents_opened"], 2)
+
+    def test_sample_paths_are_capped(self):
+        self.burst(SAMPLE_PATHS * 3)
+        incident = self.correlator.incidents(now=T0)[0]
+        self.assertEqual(len(incident["sample_paths"]), SAMPLE_PATHS)
+
+    def test_non_syscheck_alerts_are_ignored(self):
+        for alert in ({}, {"raw_alert": "text"}, {"raw_alert": {"syscheck": {"path": ""}}},
+                      {"raw_alert": {"syscheck": "x"}}):
+            self.assertEqual(self.correlator.observe(alert, now=T0), (False, None))
+        self.assertEqual(self.correlator.stats()["observed"], 0)
+
+    def test_max_keys(self):
+        correlator = DefaceCorrelator(window=10, threshold=50, max_keys=3)
+        for i in range(5):
+            correlator.observe(change(f"/srv/site{i}/public/index.html"), now=T0 + i)
+        self.assertEqual(correlator.stats()["tracked_keys"], 3)
+
+    def test_rejects_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            DefaceCorrelator(window=0)
+        with self.assertRaises(ValueError):
+            DefaceCorrelator(threshold=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the integration script's spool and forwarder
+(wz_hook/custom-flask.py, WZ_HOOK_MODE=spool)
+
+Usage:
+    python3 -m pytest tests/test_hook_spool.py
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import signal
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "wz_hook", "custom-flask.py")
+
+
+def load_hook(spool_dir):
+    """Import a fresh copy of the hook script spooling into spool_dir"""
+    spec = importlib.util.spec_from_file_location("custom_flask", SCRIPT)
+    hook = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hook)
+    hook.spool_dir = spool_dir
+    hook.spool_file = os.path.join(spool_dir, "alerts.ndjson")
+    hook.offset_file = os.path.join(spool_dir, "alerts.offset")
+    hook.log_file = os.path.join(spool_dir, "integrations.log")
+    hook.log_level = hook.LOG_LEVELS["off"]
+    hook.forward_poll_interval = 0
+    return hook
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        # Retry at once instead of backing off
+        self.headers = {"Retry-After": "0"}
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    """
+    Answers each POST with the next status and stops the forwarder when done
+
+    A status may be a (status, body bytes) pair; the default body is the
+    listener's JSON summary.
+    """
+
+    def __init__(self, hook, statuses):
+        self.hook = hook
+        self.statuses = list(statuses)
+        self.batches = []
+
+    def post(self, url, data, timeout):
+        self.batches.append(data)
+        status = self.statuses.pop(0)
+        if not self.statuses:
+            self.hook.forward_running = False
+        if isinstance(status, tuple):
+            return FakeResponse(*status)
+        return FakeResponse(status, json.dumps({"accepted": data.count(b"\n")}).encode())
+
+    def close(self):
+        pass
+
+
+class SpoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="wz-spool-")
+        self.hook = load_hook(os.path.join(self.dir, "spool"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def spool(self, count, start=0):
+        for i in range(start, start + count):
+            self.hook.spool_alert({"id": i})
+
+    def test_offset_round_trip(self):
+        self.assertEqual(self.hook.read_offset(), 0)
+        os.makedirs(self.hook.spool_dir)
+        self.hook.write_offset(1234)
+        self.assertEqual(self.hook.read_offset(), 1234)
+        self.assertFalse(os.path.exists(self.hook.offset_file + ".tmp"))
+
+    def test_unreadable_offset_restarts_from_zero(self):
+        os.makedirs(self.hook.spool_dir)
+        with open(self.hook.offset_file, "w") as f:
+            f.write("garbage")
+        self.assertEqual(self.hook.read_offset(), 0)
+
+    def test_missing_spool(self):
+        self.assertEqual(self.hook.read_spool_batch(0), (b"", 0, 0))
+
+    def test_spool_creates_directory(self):
+        self.spool(3)
+        data, count, size = self.hook.read_spool_batch(0)
+        self.assertEqual(count, 3)
+        self.assertEqual(size, len(data))
+        self.assertEqual([json.loads(line)["id"] for line in data.splitlines()], [0, 1, 2])
+
+    def test_partial_last_line_is_not_forwarded(self):
+        self.spool(2)
+        with open(self.hook.spool_file, "ab") as f:
+            f.write(b'{"id": 2, "half')
+        data, count, size = self.hook.read_spool_batch(0)
+        self.assertEqual(count, 2)
+        self.assertTrue(data.endswith(b"\n"))
+        self.assertGreater(size, len(data))
+
+    def test_max_alerts_and_byte_budget(self):
+        self.spool(10)
+        data, count, _ = self.hook.read_spool_batch(0, max_alerts=4)
+        self.assertEqual(count, 4)
+        self.assertEqual(data.count(b"\n"), 4)
+
+        data, count, _ = self.hook.read_spool_batch(len(data), max_alerts=100)
+        self.assertEqual([json.loads(line)["id"] for line in data.splitlines()], list(range(4, 10)))
+
+        self.hook.forward_batch_bytes = 25
+        data, count, _ = self.hook.read_spool_batch(0)
+        self.assertEqual(count, 2)
+        self.assertLessEqual(len(data), 25)
+
+    def test_alert_larger_than_byte_budget(self):
+        self.hook.spool_alert({"full_log": "x" * 100})
+        self.spool(1)
+        self.hook.forward_batch_bytes = 16
+        data, count, _ = self.hook.read_spool_batch(0)
+        self.assertEqual(count, 1)
+        self.assertEqual(json.loads(data)["full_log"], "x" * 100)
+
+    def test_compaction_once_everything_is_acknowledged(self):
+        self.spool(3)
+        size = os.path.getsize(self.hook.spool_file)
+        self.hook.write_offset(size)
+        self.assertEqual(self.hook.compact_spool(size), 0)
+        self.assertEqual(os.path.getsize(self.hook.spool_file), 0)
+        self.assertEqual(self.hook.read_offset(), 0)
+
+        # Alerts spooled after compaction start at offset 0 again
+        self.spool(1, start=3)
+        data, count, _ = self.hook.read_spool_batch(self.hook.read_offset())
+        self.assertEqual(json.loads(data)["id"], 3)
+
+    def test_compaction_skipped_after_concurrent_append(self):
+        self.spool(3)
+        acknowledged = os.path.getsize(self.hook.spool_file)
+        self.hook.write_offset(acknowledged)
+        self.spool(1, start=3)
+        self.assertEqual(self.hook.compact_spool(acknowledged), acknowledged)
+        self.assertEqual(self.hook.read_offset(), acknowledged)
+        data, count, _ = self.hook.read_spool_batch(acknowledged)
+        self.assertEqual((count, json.loads(data)["id"]), (1, 3))
+
+
+class ForwarderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="wz-forward-")
+        self.hook = load_hook(os.path.join(self.dir, "spool"))
+        self.handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    def tearDown(self):
+        for sig, handler in self.handlers.items():
+            signal.signal(sig, handler)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def forward(self, statuses):
+        session = FakeSession(self.hook, statuses)
+        self.hook.build_forward_session = lambda api_key: session
+        self.hook.run_forwarder("http://listener.invalid/webhook/wazuh", None)
+        return session
+
+    def test_offset_advances_only_on_delivery(self):
+        for i in range(5):
+            self.hook.spool_alert({"id": i})
+        session = self.forward([503, 200])
+        self.assertEqual(len(session.batches), 2)
+        self.assertEqual(session.batches[0], session.batches[1])
+        self.assertEqual(self.hook.read_offset(), os.path.getsize(self.hook.spool_file))
+
+    def test_resumes_from_acknowledged_offset(self):
+        for i in range(5):
+            self.hook.spool_alert({"id": i})
+        with open(self.hook.spool_file, "rb") as f:
+            first_two = len(f.readline()) + len(f.readline())
+        self.hook.write_offset(first_two)
+        session = self.forward([200])
+        self.assertEqual([json.loads(line)["id"] for line in session.batches[0].splitlines()], [2, 3, 4])
+
+    def test_offset_past_truncated_spool_restarts_from_zero(self):
+        # Crash between compact_spool's truncate and its write_offset(0)
+        for i in range(2):
+            self.hook.spool_alert({"id": i})
+        self.hook.write_offset(10000)
+        session = self.forward([200])
+        self.assertEqual([json.loads(line)["id"] for line in session.batches[0].splitlines()], [0, 1])
+        self.assertEqual(self.hook.read_offset(), os.path.getsize(self.hook.spool_file))
+
+    def test_oversized_batch_is_split(self):
+        for i in range(4):
+            self.hook.spool_alert({"id": i})
+        session = self.forward([413, 200, 200])
+        self.assertEqual([batch.count(b"\n") for batch in session.batches], [4, 2, 2])
+        self.assertEqual(self.hook.read_offset(), os.path.getsize(self.hook.spool_file))
+
+    def test_any_2xx_acknowledges(self):
+        for status in ((200, b""), (204, b""), (200, b"OK"), (202, b"[]"), (200, b'{"rejected": 1}')):
+            with self.subTest(status=status):
+                self.hook.forward_running = True
+                self.hook.spool_alert({"id": status[0]})
+                session = self.forward([status])
+                self.assertEqual(len(session.batches), 1)
+                self.assertEqual(self.hook.read_offset(), os.path.getsize(self.hook.spool_file))
+
+    def test_forward_arguments_in_hook_order(self):
+        calls = []
+        self.hook.run_forwarder = lambda hook_url, api_key: calls.append((hook_url, api_key))
+        self.hook.main(["custom-flask.py", "--forward", "secret", "http://listener.invalid/webhook/wazuh"])
+        self.hook.main(["custom-flask.py", "--forward"])
+        self.assertEqual(calls, [("http://listener.invalid/webhook/wazuh", "secret"), ("", "")])
+
+
+if __name__ == "__main__":
+    unittest.main()
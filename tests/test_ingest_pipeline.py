@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the ingest queue (backend/ingest_pipeline.py) and
+the webhooks' 429 backpressure
+
+The webhook tests import the listener from a scratch directory (it logs
+to ./log) and swap in a pipeline whose workers are not started, so the
+queue fills up deterministically.
+
+Usage:
+    python3 -m pytest tests/test_ingest_pipeline.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from ingest_pipeline import IngestPipeline
+
+
+def import_listener():
+    workdir = tempfile.mkdtemp(prefix="wz-listener-")
+    os.makedirs(os.path.join(workdir, "log"))
+    cwd = os.getcwd()
+    env = {"LOG_CONSOLE": "false", "ARCHIVE_ENABLED": "false", "INGEST_RETRY_AFTER": "7"}
+    try:
+        os.chdir(workdir)
+        with mock.patch.dict(os.environ, env):
+            import flask_server
+    finally:
+        os.chdir(cwd)
+    return flask_server, workdir
+
+
+class PipelineTest(unittest.TestCase):
+
+    def test_workers_process_every_item(self):
+        seen = []
+        lock = threading.Lock()
+
+        def handle(item):
+            with lock:
+                seen.append(item)
+
+        pipeline = IngestPipeline(handle, maxsize=1000, workers=3)
+        pipeline.start()
+        try:
+            for i in range(500):
+                self.assertTrue(pipeline.submit(i))
+            self.assertTrue(pipeline.join(timeout=5))
+        finally:
+            pipeline.stop()
+        self.assertEqual(sorted(seen), list(range(500)))
+        stats = pipeline.stats()
+        self.assertEqual((stats["enqueued"], stats["processed"], stats["queue_depth"]), (500, 500, 0))
+
+    def test_full_queue_refuses_whole_batches(self):
+        pipeline = IngestPipeline(lambda item: None, maxsize=5, workers=1)
+        self.assertTrue(pipeline.submit_many([1, 2, 3]))
+        self.assertFalse(pipeline.submit_many([4, 5, 6]))
+        self.assertEqual(len(pipeline), 3)
+        self.assertTrue(pipeline.submit_many([4, 5]))
+        self.assertFalse(pipeline.submit(6))
+        self.assertEqual(pipeline.stats()["rejected"], 4)
+
+        # Draining the queue makes room again
+        pipeline.start()
+        try:
+            self.assertTrue(pipeline.join(timeout=5))
+            self.assertTrue(pipeline.submit(6))
+        finally:
+            pipeline.stop()
+
+    def test_failures_are_counted(self):
+        def handle(item):
+            if item % 2:
+                raise ValueError("bad alert")
+
+        pipeline = IngestPipeline(handle, workers=2)
+        pipeline.start()
+        try:
+            with self.assertLogs(level="ERROR"):
+                pipeline.submit_many(list(range(10)))
+                self.assertTrue(pipeline.join(timeout=5))
+        finally:
+            pipeline.stop()
+        self.assertEqual((pipeline.processed, pipeline.failed), (5, 5))
+
+    def test_stop_drains_the_queue(self):
+        done = []
+        pipeline = IngestPipeline(done.append, workers=1)
+        pipeline.submit_many(list(range(20)))
+        pipeline.start()
+        pipeline.stop()
+        self.assertEqual(done, list(range(20)))
+
+
+class BackpressureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.workdir = import_listener()
+        cls.client = cls.server.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self):
+        # Never started, so nothing leaves the queue
+        patcher = mock.patch.object(self.server, "ingest_pipeline", IngestPipeline(lambda item: None, maxsize=3))
+        self.pipeline = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertQueueFull(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "7")
+        self.assertIn("error", response.get_json())
+
+    def test_single_alerts(self):
+        for i in range(3):
+            response = self.client.post("/webhook/wazuh", json={"id": str(i), "rule": {"level": 3}})
+            self.assertEqual(response.status_code, 200)
+        self.assertQueueFull(self.client.post("/webhook/wazuh", json={"id": "3"}))
+        self.assertEqual(len(self.pipeline), 3)
+
+    def test_batch_is_all_or_nothing(self):
+        body = "\n".join(json.dumps({"id": str(i)}) for i in range(2))
+        response = self.client.post("/webhook/wazuh/batch", data=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["accepted"], 2)
+
+        self.assertQueueFull(self.client.post("/webhook/wazuh/batch", data=body))
+        self.assertEqual(len(self.pipeline), 2)
+
+    def test_batch_larger_than_queue(self):
+        body = "\n".join(json.dumps({"id": str(i)}) for i in range(5))
+        response = self.client.post("/webhook/wazuh/batch", data=body)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json()["max_alerts"], 3)
+        self.assertEqual(len(self.pipeline), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for queued, rate-limited logging (backend/log_queue.py
+and its copy for the wazuh app, wazuh/utils/log_queue.py)
+
+Usage:
+    python3 -m pytest tests/test_log_queue.py
+"""
+
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = sys.modules[name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+IMPLEMENTATIONS = {
+    "backend": load("backend_log_queue", "backend/log_queue.py"),
+    "wazuh": load("wazuh_log_queue", "wazuh/utils/log_queue.py"),
+}
+
+
+def make_record(name="app", msg="hello %s", args=("world",), level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LogQueueTest(unittest.TestCase):
+
+    def test_copies_match(self):
+        backend, wazuh = IMPLEMENTATIONS["backend"], IMPLEMENTATIONS["wazuh"]
+        for name in ("JsonFormatter", "RateLimitFilter", "DroppingQueueHandler"):
+            with self.subTest(name=name):
+                self.assertEqual(inspect.getsource(getattr(backend, name)), inspect.getsource(getattr(wazuh, name)))
+
+    def test_wazuh_logger_imports_without_backend(self):
+        code = "import sys; from utils.logger import setup_logger; " \
+               "sys.exit(any(name.startswith('backend') for name in sys.modules))"
+        env = dict(os.environ)
+        env.pop("PYTHONPATH", None)
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(ROOT, "wazuh"), env=env,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_rate_limit(self):
+        for name, module in IMPLEMENTATIONS.items():
+            with self.subTest(implementation=name):
+                clock = Clock()
+                rate_filter = module.RateLimitFilter(rate=2, burst=3)
+                with mock.patch.object(module.time, "monotonic", clock):
+                    self.assertEqual([rate_filter.filter(make_record()) for _ in range(5)],
+                                     [True, True, True, False, False])
+                    self.assertEqual(rate_filter.suppressed, 2)
+
+                    # Other loggers have their own bucket
+                    self.assertTrue(rate_filter.filter(make_record(name="other")))
+
+                    # Half a second refills one token; the record notes the drops
+                    clock.now += 0.5
+                    record = make_record()
+                    self.assertTrue(rate_filter.filter(record))
+                    self.assertEqual(record.getMessage(), "hello world (2 messages suppressed)")
+                    self.assertFalse(rate_filter.filter(make_record()))
+
+                    clock.now += 100
+                    self.assertEqual([rate_filter.filter(make_record()) for _ in range(4)],
+                                     [True, True, True, False])
+
+    def test_shared_filter_decides_once(self):
+        for name, module in IMPLEMENTATIONS.items():
+            with self.subTest(implementation=name):
+                rate_filter = module.RateLimitFilter(rate=1, burst=1)
+                with mock.patch.object(module.time, "monotonic", Clock()):
+                    record = make_record()
+                    # The same record passing a second handler is not counted again
+                    self.assertTrue(rate_filter.filter(record))
+                    self.assertTrue(rate_filter.filter(record))
+                    dropped = make_record()
+                    self.assertFalse(rate_filter.filter(dropped))
+                    self.assertFalse(rate_filter.filter(dropped))
+                self.assertEqual(rate_filter.suppressed, 1)
+
+    def test_full_queue_drops_records(self):
+        for name, module in IMPLEMENTATIONS.items():
+            with self.subTest(implementation=name):
+                handler = module.DroppingQueueHandler(queue.Queue(2))
+                args = ["before"]
+                for _ in range(5):
+                    handler.handle(make_record(msg="value %s", args=(args,)))
+                self.assertEqual(handler.dropped, 3)
+                self.assertEqual(handler.queue.qsize(), 2)
+
+                # Arguments are merged when the record is queued
+                args.append("after")
+                self.assertEqual(handler.queue.get_nowait().getMessage(), "value ['before']")
+
+    def test_json_formatter(self):
+        for name, module in IMPLEMENTATIONS.items():
+            with self.subTest(implementation=name):
+                formatter = module.JsonFormatter()
+                entry = json.loads(formatter.format(make_record(level=logging.WARNING)))
+                self.assertEqual((entry["level"], entry["logger"], entry["message"]), ("WARNING", "app", "hello world"))
+                self.assertNotIn("exception", entry)
+                try:
+                    raise RuntimeError("boom")
+                except RuntimeError:
+                    record = make_record()
+                    record.exc_info = sys.exc_info()
+                self.assertIn("RuntimeError: boom", json.loads(formatter.format(record))["exception"])
+
+
+if __name__ == "__main__":
+    unittest.main()
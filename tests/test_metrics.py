@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for latency histograms (backend/metrics.py and the Wazuh
+API client metrics, wazuh/services/metrics.py)
+
+Usage:
+    python3 -m pytest tests/test_metrics.py
+"""
+
+import importlib.util
+import inspect
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = sys.modules[name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+backend = load("backend_metrics", "backend/metrics.py")
+wazuh = load("wazuh_metrics", "wazuh/services/metrics.py")
+
+
+def samples(lines):
+    """Sample lines as {series: value}"""
+    return dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_copies_match(self):
+        self.assertEqual(inspect.getsource(backend.Histogram), inspect.getsource(wazuh.Histogram))
+
+    def test_buckets_are_upper_bounds(self):
+        histogram = backend.Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+            histogram.observe(value)
+        self.assertEqual(samples(histogram.samples("t", 'stage="x"')), {
+            't_bucket{stage="x",le="0.1"}': "2",
+            't_bucket{stage="x",le="1.0"}': "4",
+            't_bucket{stage="x",le="+Inf"}': "5",
+            't_sum{stage="x"}': "4.65",
+            't_count{stage="x"}': "5",
+        })
+
+
+class StageMetricsTest(unittest.TestCase):
+
+    def test_render(self):
+        metrics = backend.StageMetrics(("parse", "store"), buckets=(0.001,))
+        metrics.observe("parse", 0.0005)
+        metrics.observe("store", 0.002)
+        lines = metrics.render("stage_seconds", "Stage latency")
+        self.assertEqual(lines[:2], ["# HELP stage_seconds Stage latency", "# TYPE stage_seconds histogram"])
+        values = samples(lines)
+        self.assertEqual(values['stage_seconds_bucket{stage="parse",le="0.001"}'], "1")
+        self.assertEqual(values['stage_seconds_bucket{stage="store",le="0.001"}'], "0")
+        self.assertEqual(values['stage_seconds_count{stage="store"}'], "1")
+
+    def test_disabled(self):
+        metrics = backend.StageMetrics(("parse",), enabled=False)
+        metrics.observe("parse", 0.1)
+        self.assertEqual(metrics.histograms["parse"].count, 0)
+
+
+class RequestMetricsTest(unittest.TestCase):
+
+    def test_ids_are_folded(self):
+        metrics = wazuh.RequestMetrics(buckets=(0.5,))
+        metrics.observe("GET", "agents/001/config", 0.25)
+        metrics.observe("GET", "/agents/002/config", 0.75, error=True)
+        metrics.observe("GET", "/agents", 0.1)
+        self.assertEqual(metrics.snapshot(), {
+            "GET /agents": {"calls": 1, "errors": 0, "avg_seconds": 0.1},
+            "GET /agents/{id}/config": {"calls": 2, "errors": 1, "avg_seconds": 0.5},
+        })
+
+    def test_render(self):
+        metrics = wazuh.RequestMetrics(buckets=(0.5,))
+        metrics.observe("GET", "/agents/7", 0.25)
+        metrics.observe("GET", "/agents/8", 1.5, error=True)
+        values = samples(metrics.render("api").splitlines())
+        labels = 'method="GET",endpoint="/agents/{id}"'
+        self.assertEqual(values[f'api_request_duration_seconds_bucket{{{labels},le="0.5"}}'], "1")
+        self.assertEqual(values[f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], "2")
+        self.assertEqual(values[f"api_request_duration_seconds_count{{{labels}}}"], "2")
+        self.assertEqual(values[f"api_request_errors_total{{{labels}}}"], "1")
+
+    def test_disabled(self):
+        metrics = wazuh.RequestMetrics(enabled=False)
+        metrics.observe("GET", "/agents", 0.1)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_blueprint(self):
+        from flask import Flask
+
+        service = SimpleNamespace(metrics=wazuh.RequestMetrics())
+        service.metrics.observe("POST", "/security/user/authenticate", 0.2)
+        app = Flask(__name__)
+        app.register_blueprint(wazuh.metrics_blueprint(service))
+        response = app.test_client().get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        body = response.get_data(as_text=True)
+        self.assertEqual(body, service.metrics.render())
+        self.assertIn('endpoint="/security/user/authenticate"', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for alerts kept as their original bytes (backend/raw_alert.py)
+
+Usage:
+    python3 -m pytest tests/test_raw_alert.py
+"""
+
+import json
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from raw_alert import RawAlert, decode_alert, encode_alert
+
+ALERT = {"id": "1", "rule": {"level": 7, "description": "Integrity checksum changed."},
+         "agent": {"name": "web-01"}, "syscheck": {"path": "/var/www/html/index.php"},
+         "full_log": "défacé ☠"}
+
+
+class RawAlertTest(unittest.TestCase):
+
+    def test_bytes_are_kept_as_received(self):
+        body = json.dumps(ALERT, ensure_ascii=False).encode()
+        alert = RawAlert(body, ALERT)
+        self.assertIs(alert.raw, body)
+        self.assertEqual(alert["rule"]["level"], 7)
+        self.assertEqual(dict(alert), ALERT)
+
+    def test_release_parses_again(self):
+        alert = RawAlert(json.dumps(ALERT).encode(), ALERT)
+        alert.release()
+        self.assertEqual(alert["agent"], {"name": "web-01"})
+        self.assertIsNot(alert.parsed, ALERT)
+        self.assertEqual(len(alert), len(ALERT))
+
+    def test_multi_line_bodies_are_re_encoded(self):
+        for body in (json.dumps(ALERT, indent=2).encode(), b"  " + json.dumps(ALERT).encode(),
+                     json.dumps(ALERT).encode() + b"\r\n"):
+            with self.subTest(body=body[:10]):
+                alert = RawAlert(body)
+                self.assertNotIn(b"\n", alert.raw)
+                self.assertTrue(alert.raw.startswith(b"{") and alert.raw.endswith(b"}"))
+                self.assertEqual(json.loads(alert.raw), ALERT)
+
+    def test_line_breaks_inside_strings_are_escaped(self):
+        alert = RawAlert(b'{"full_log": "a\\nb"}')
+        self.assertEqual(alert["full_log"], "a\nb")
+        self.assertNotIn(b"\n", alert.raw)
+
+
+class EncodeTest(unittest.TestCase):
+
+    def processed(self, raw_alert):
+        return {"timestamp": "2026-01-01T00:00:00", "rule_level": 7, "agent_name": "web-01", "raw_alert": raw_alert}
+
+    def test_round_trip(self):
+        body = json.dumps(ALERT).encode()
+        processed = self.processed(RawAlert(body, ALERT))
+        encoded = encode_alert(processed)
+        self.assertTrue(encoded.endswith(b'"raw_alert":' + body + b"}"))
+        decoded = json.loads(encoded)
+        self.assertEqual(decoded, dict(processed, raw_alert=ALERT))
+
+        # Read back from storage, the plain dict becomes a RawAlert again
+        restored = decode_alert(decoded)
+        self.assertIsInstance(restored["raw_alert"], RawAlert)
+        self.assertEqual(json.loads(encode_alert(restored)), json.loads(encoded))
+
+    def test_raw_alert_only(self):
+        encoded = encode_alert({"raw_alert": RawAlert(b'{"a":1}')})
+        self.assertEqual(encoded, b'{"raw_alert":{"a":1}}')
+
+    def test_plain_values(self):
+        processed = self.processed({"a": 1})
+        processed["received"] = datetime(2026, 1, 1)
+        self.assertEqual(json.loads(encode_alert(processed))["received"], "2026-01-01 00:00:00")
+        self.assertEqual(decode_alert({"raw_alert": "text"}), {"raw_alert": "text"})
+
+
+if __name__ == "__main__":
+    unittest.main()
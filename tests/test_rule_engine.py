@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for alert rule dispatch (backend/rule_engine.py)
+
+RuleEngine.match is checked against a linear scan of Rule.check over
+generated rule tables, so every index path has to agree with the plain
+conditions.
+
+Usage:
+    python3 -m pytest tests/test_rule_engine.py
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from rule_engine import DEFAULT_RULES, MAX_LEVEL, KeywordMatcher, Rule, RuleEngine
+
+
+def noop(alert, rule):
+    pass
+
+
+def linear_match(rules, alert):
+    level = alert.get("rule_level")
+    level = min(level, MAX_LEVEL) if isinstance(level, int) else None
+    location = alert.get("location") if isinstance(alert.get("location"), str) else ""
+    description = str(alert.get("rule_description") or "").lower()
+    return [rule for rule in rules if rule.check(level, str(alert.get("rule_id")), location, description)]
+
+
+class RuleTest(unittest.TestCase):
+
+    def test_needs_a_condition(self):
+        with self.assertRaises(ValueError):
+            Rule("empty", noop)
+
+    def test_min_level_is_coerced(self):
+        rule = Rule.from_dict({"name": "high", "min_level": "12", "locations": ["syscheck"]})
+        self.assertEqual(rule.min_level, 12)
+        engine = RuleEngine([rule])
+        self.assertEqual(engine.match({"rule_level": 13, "location": "syscheck"}), [rule])
+        self.assertEqual(engine.match({"rule_level": 3, "location": "syscheck"}), [])
+
+    def test_levels_above_max_count_as_max(self):
+        engine = RuleEngine([Rule("alone", noop, min_level=MAX_LEVEL + 1),
+                             Rule("combined", noop, min_level=MAX_LEVEL + 1, rule_ids=["1"])])
+        self.assertEqual(engine.match({"rule_level": 99, "rule_id": "1"}), [])
+
+    def test_invalid_min_level(self):
+        for value in ("high", [12], ""):
+            with self.subTest(min_level=value):
+                with self.assertRaises(ValueError) as raised:
+                    Rule("bad", noop, min_level=value)
+                self.assertIn("bad", str(raised.exception))
+
+    def test_unknown_log_level(self):
+        with self.assertRaises(ValueError):
+            Rule.from_dict({"name": "x", "min_level": 1, "log_level": "loud"})
+
+
+class KeywordMatcherTest(unittest.TestCase):
+
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher({"he": [1], "she": [2], "hers": [3], "his": [4]})
+        self.assertEqual(matcher.search("ushers"), {1, 2, 3})
+        self.assertEqual(matcher.search("this"), {4})
+        self.assertEqual(matcher.search("nothing"), set())
+
+
+class MatchTest(unittest.TestCase):
+
+    def test_default_rules(self):
+        engine = RuleEngine(DEFAULT_RULES)
+        names = lambda alert: [rule.name for rule in engine.match(alert)]
+        self.assertEqual(names({"rule_level": 12, "rule_id": "5710", "location": "/var/log/auth.log",
+                                "rule_description": "sshd: Attempt to login"}),
+                         ["high_severity", "ssh_brute_force"])
+        self.assertEqual(names({"rule_level": 7, "rule_id": "550", "location": "syscheck",
+                                "rule_description": "Integrity checksum changed."}), ["file_change"])
+        self.assertEqual(names({"rule_level": "12", "rule_id": 5712, "location": None,
+                                "rule_description": "PAM: User AUTHENTICATION_FAILED"}),
+                         ["ssh_brute_force", "auth_failure"])
+        self.assertEqual(names({}), [])
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(3)
+        words = ["sshd", "failed", "web", "attack", "integrity", "root", "scan"]
+        locations = ["syscheck", "/var/log/auth.log", "/var/log/nginx/access.log", "rootcheck"]
+        rule_ids = [str(i) for i in range(500, 520)]
+        rules = []
+        for i in range(200):
+            conditions = {}
+            while not conditions:
+                if rng.random() < 0.4:
+                    conditions["min_level"] = rng.randrange(-1, 18)
+                if rng.random() < 0.3:
+                    conditions["rule_ids"] = rng.sample(rule_ids, rng.randrange(1, 4))
+                if rng.random() < 0.3:
+                    conditions["locations"] = [rng.choice(locations)[:rng.randrange(1, 10)]]
+                if rng.random() < 0.3:
+                    conditions["keywords"] = [word.upper() for word in rng.sample(words, rng.randrange(1, 3))]
+            rules.append(Rule(f"rule-{i}", noop, **conditions))
+        engine = RuleEngine(rules)
+
+        for _ in range(2000):
+            alert = {
+                "rule_level": rng.choice([None, "7", -3, 99] + list(range(17))),
+                "rule_id": rng.choice(rule_ids + [None, 42]),
+                "location": rng.choice(locations + [None, ""]),
+                "rule_description": " ".join(rng.sample(words, rng.randrange(0, 4))),
+            }
+            self.assertEqual(engine.match(alert), linear_match(rules, alert), alert)
+
+    def test_dispatch_survives_failing_action(self):
+        calls = []
+
+        def fail(alert, rule):
+            raise RuntimeError("boom")
+
+        engine = RuleEngine([Rule("fails", fail, min_level=0), Rule("runs", lambda a, r: calls.append(r.name),
+                                                                       min_level=0)])
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(engine.dispatch({"rule_level": 5}), ["fails", "runs"])
+        self.assertEqual(calls, ["runs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
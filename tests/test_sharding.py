@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for sharded paging (backend/sharding.py)
+
+scatter_page runs against shards simulated in memory with the /alerts
+paging rules of AlertStore.query: ``before_seq`` returns the newest
+alerts below it, ``after_seq`` the oldest above it.
+
+Usage:
+    python3 -m pytest tests/test_sharding.py
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sharding import decode_shard_cursor, encode_shard_cursor, merge_pages, next_cursors, scatter_page
+
+
+def make_shards(count, alerts, seed=7):
+    """Spread alerts with increasing timestamps over shards; per-shard seqs start at 0"""
+    rng = random.Random(seed)
+    shards = [[] for _ in range(count)]
+    for i in range(alerts):
+        shard = shards[rng.randrange(count)]
+        shard.append({"seq": len(shard), "timestamp": f"2026-01-01T00:00:{i:06d}", "id": i})
+    return shards
+
+
+def query(alerts, limit, before_seq=None, after_seq=None):
+    """One shard's page, oldest first"""
+    if after_seq is not None:
+        return [alert for alert in alerts if alert["seq"] > after_seq][:limit]
+    selected = [alert for alert in alerts if before_seq is None or alert["seq"] < before_seq]
+    return selected[-limit:] if limit else []
+
+
+class Cluster:
+    """Simulated shards answering the per-shard requests of scatter_page"""
+
+    def __init__(self, shards, down=()):
+        self.shards = shards
+        self.down = set(down)
+        self.requests = []
+        self.missing = None
+
+    def gather(self, params_per_shard):
+        self.requests.append(params_per_shard)
+        responses = []
+        for shard, params in enumerate(params_per_shard):
+            assert not ("before_seq" in params and "after_seq" in params)
+            if shard in self.down:
+                responses.append(None)
+                continue
+            page = query(self.shards[shard], params["limit"], params.get("before_seq"), params.get("after_seq"))
+            responses.append({"alerts": page})
+        return responses
+
+    def page(self, limit, before=None, after=None):
+        """Alert ids of one merged page and its before/after cursors"""
+        taken, before, after, self.missing = scatter_page(self.gather, len(self.shards), {"fields": "seq"}, limit,
+                                                          before=before, after=after)
+        return [alert["id"] for _, alert in taken], before, after
+
+
+def scatter(shards, limit, before=None, after=None):
+    return Cluster(shards).page(limit, before, after)
+
+
+class CursorTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for seqs in ([0, 5, None], [None], [123456789, 0], [None, None]):
+            with self.subTest(seqs=seqs):
+                token = encode_shard_cursor(seqs)
+                self.assertNotIn("=", token)
+                self.assertEqual(decode_shard_cursor(token, len(seqs)), seqs)
+
+    def test_rejects_invalid_tokens(self):
+        good = encode_shard_cursor([1, 2, 3])
+        for token, count in ((good, 2), ("not-a-cursor", 3), ("", 3), ("!!!", 1), ("12345", 1)):
+            with self.subTest(token=token, count=count):
+                with self.assertRaises(ValueError):
+                    decode_shard_cursor(token, count)
+        with self.assertRaises(ValueError):
+            decode_shard_cursor(encode_shard_cursor(["x", 1]), 2)
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_newest_and_oldest(self):
+        pages = [
+            [{"seq": 0, "timestamp": "a"}, {"seq": 1, "timestamp": "d"}],
+            [{"seq": 0, "timestamp": "b"}, {"seq": 1, "timestamp": "c"}, {"seq": 2, "timestamp": "e"}],
+        ]
+        newest = merge_pages(pages, 3)
+        self.assertEqual([alert["timestamp"] for _, alert in newest], ["c", "d", "e"])
+        self.assertEqual([shard for shard, _ in newest], [1, 0, 1])
+        oldest = merge_pages(pages, 3, oldest_first=True)
+        self.assertEqual([alert["timestamp"] for _, alert in oldest], ["a", "b", "c"])
+        self.assertEqual(merge_pages([[], []], 5), [])
+
+    def test_cursors_around_a_newest_page(self):
+        pages = [
+            [{"seq": 4, "timestamp": "a"}, {"seq": 5, "timestamp": "d"}],
+            [{"seq": 7, "timestamp": "b"}],
+            [],
+        ]
+        taken = merge_pages(pages, 1)
+        self.assertEqual([(shard, alert["seq"]) for shard, alert in taken], [(0, 5)])
+        before, after = next_cursors(pages, taken, [None, 8, 3], [None] * 3, False)
+        # Shard 1's alert is older than the page, so the next older page must include it
+        self.assertEqual(before, [5, 8, 3])
+        self.assertEqual(after, [5, 7, 2])
+
+    def test_cursors_around_an_oldest_page(self):
+        pages = [[{"seq": 4, "timestamp": "c"}], [{"seq": 7, "timestamp": "b"}], []]
+        taken = merge_pages(pages, 1, oldest_first=True)
+        before, after = next_cursors(pages, taken, [None] * 3, [3, 6, 9], True)
+        self.assertEqual(before, [4, 7, 10])
+        self.assertEqual(after, [3, 7, 9])
+
+
+class PagingTest(unittest.TestCase):
+
+    def test_walk_back_visits_every_alert_once(self):
+        for count, alerts, limit in ((3, 100, 7), (4, 50, 1), (2, 9, 50), (5, 3, 2)):
+            with self.subTest(shards=count, alerts=alerts, limit=limit):
+                shards = make_shards(count, alerts)
+                seen = []
+                ids, before, after = scatter(shards, limit)
+                while ids:
+                    self.assertEqual(ids, sorted(ids))
+                    seen = ids + seen
+                    ids, before, _ = scatter(shards, limit, before=before)
+                self.assertEqual(seen, list(range(alerts)))
+
+    def test_walk_forward_visits_every_alert_once(self):
+        for count, alerts, limit in ((3, 100, 7), (4, 50, 1), (2, 9, 50)):
+            with self.subTest(shards=count, alerts=alerts, limit=limit):
+                shards = make_shards(count, alerts)
+                seen = []
+                ids, _, after = scatter(shards, limit, after=encode_shard_cursor([None] * count))
+                while ids:
+                    seen.extend(ids)
+                    ids, _, after = scatter(shards, limit, after=after)
+                self.assertEqual(seen, list(range(alerts)))
+
+    def test_after_cursor_picks_up_new_alerts(self):
+        shards = make_shards(3, 20)
+        _, _, after = scatter(shards, 50)
+        ids, _, after = scatter(shards, 50, after=after)
+        self.assertEqual(ids, [])
+
+        for i in range(20, 26):
+            shard = shards[i % 3]
+            shard.append({"seq": len(shard), "timestamp": f"2026-01-01T00:00:{i:06d}", "id": i})
+        ids, _, after = scatter(shards, 4, after=after)
+        self.assertEqual(ids, [20, 21, 22, 23])
+        ids, _, _ = scatter(shards, 4, after=after)
+        self.assertEqual(ids, [24, 25])
+
+    def test_before_cursor_of_forward_page_excludes_newer_alerts(self):
+        shards = make_shards(2, 10) + [[]]
+        ids, before, _ = scatter(shards, 3, after=encode_shard_cursor([None] * 3))
+        self.assertEqual(ids, [0, 1, 2])
+
+        # An alert arriving later on the empty shard is newer than the page
+        shards[2].append({"seq": 0, "timestamp": "2026-01-01T00:00:999999", "id": 99})
+        ids, _, _ = scatter(shards, 3, before=before)
+        self.assertEqual(ids, [])
+
+    def test_missing_shards(self):
+        shards = make_shards(3, 30)
+        cluster = Cluster(shards, down=(1,))
+        ids, before, _ = cluster.page(5)
+        self.assertEqual(cluster.missing, [1])
+        self.assertTrue(all(params["fields"] == "seq" for params in cluster.requests[0]))
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(set(ids).isdisjoint(alert["id"] for alert in shards[1]))
+        # The unanswered shard keeps its position for the next page
+        self.assertIsNone(decode_shard_cursor(before, 3)[1])
+
+    def test_invalid_cursor_is_rejected_before_any_request(self):
+        cluster = Cluster(make_shards(3, 5))
+        with self.assertRaises(ValueError):
+            cluster.page(5, before=encode_shard_cursor([1, 2]))
+        self.assertEqual(cluster.requests, [])
+
+    def test_before_cursor_of_empty_result_stays_put(self):
+        shards = [[], []]
+        ids, before, after = scatter(shards, 10)
+        self.assertEqual(ids, [])
+        self.assertEqual(decode_shard_cursor(before, 2), [None, None])
+        self.assertEqual(decode_shard_cursor(after, 2), [-1, -1])
+
+
+if __name__ == "__main__":
+    unittest.main()
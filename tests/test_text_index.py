@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for search query parsing and matching (backend/text_index.py)
+
+Usage:
+    python3 -m pytest tests/test_text_index.py
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from text_index import MAX_TOKEN_LENGTH, SearchTerm, TextIndex, parse_query, tokenize
+
+
+def terms(groups):
+    return [[(term.text, term.prefix) for term in group] for group in groups]
+
+
+class ParseQueryTest(unittest.TestCase):
+
+    def test_and_terms(self):
+        self.assertEqual(terms(parse_query("Wget  tmp")), [[("wget", False), ("tmp", False)]])
+        self.assertEqual(terms(parse_query("wget AND tmp")), [[("wget", False), ("tmp", False)]])
+
+    def test_or_groups(self):
+        self.assertEqual(terms(parse_query("a1 b2 OR c3")), [[("a1", False), ("b2", False)], [("c3", False)]])
+        # Lowercase "or" is an ordinary term
+        self.assertEqual(terms(parse_query("this or that")), [[("this", False), ("or", False), ("that", False)]])
+        # Dangling and repeated ORs leave no empty groups
+        self.assertEqual(terms(parse_query("OR x1 OR OR y2 OR")), [[("x1", False)], [("y2", False)]])
+
+    def test_phrases(self):
+        groups = parse_query('"Failed  password" root')
+        self.assertEqual(terms(groups), [[("failed  password", False), ("root", False)]])
+        phrase = groups[0][0]
+        self.assertEqual(phrase.words, ["failed", "password"])
+        self.assertTrue(phrase.matches("sshd: failed\npassword for root"))
+        self.assertFalse(phrase.matches("failed to read password"))
+        # A trailing * inside quotes is not a prefix
+        self.assertFalse(parse_query('"adm*"')[0][0].prefix)
+
+    def test_prefixes(self):
+        term = parse_query("adm*")[0][0]
+        self.assertEqual((term.text, term.prefix, term.prefix_word), ("adm", True, True))
+        self.assertTrue(term.matches("user administrator logged in"))
+        self.assertFalse(term.matches("badmin"))
+
+        # A prefix ending in punctuation only extends the text
+        term = parse_query("10.0.*")[0][0]
+        self.assertEqual((term.prefix, term.prefix_word), (True, False))
+        self.assertTrue(term.matches("from 10.0.3.7 port 22"))
+        self.assertFalse(term.matches("from 110.0.3.7 port 22"))
+
+    def test_punctuated_terms_match_on_word_boundaries(self):
+        term = parse_query("/wp-login.php")[0][0]
+        self.assertEqual(term.words, ["wp", "login", "php"])
+        self.assertTrue(term.matches('"post /wp-login.php http/1.1"'))
+        self.assertFalse(term.matches('"post /wp-login.phpx http/1.1"'))
+        self.assertTrue(parse_query("203.0.113.5")[0][0].matches("src=203.0.113.5"))
+        self.assertFalse(parse_query("203.0.113.5")[0][0].matches("src=203.0.113.55"))
+
+    def test_empty_queries(self):
+        for query in ("", None, "   ", "OR", "AND OR AND", '""'):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    parse_query(query)
+
+    def test_terms_without_words(self):
+        for query in ("***", "-- x1", '"..."'):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    parse_query(query)
+
+    def test_short_prefix(self):
+        with self.assertRaises(ValueError):
+            parse_query("a*")
+        with self.assertRaises(ValueError):
+            parse_query("10.a*")
+        self.assertTrue(parse_query("ab*")[0][0].prefix)
+
+
+class TextIndexTest(unittest.TestCase):
+
+    def test_postings(self):
+        index = TextIndex()
+        records = {1: "failed password for root", 2: "accepted password for admin", 3: "administrator login"}
+        for seq, text in records.items():
+            index.add(seq, SimpleNamespace(full_log=text, rule_description=None, location=None))
+
+        def lookup(query):
+            term = SearchTerm(query)
+            candidates = {seq for seqs in index.postings(term) for seq in seqs}
+            return sorted(seq for seq in candidates if term.matches(records[seq]))
+
+        self.assertEqual(lookup("password"), [1, 2])
+        self.assertEqual(lookup("adm*"), [2, 3])
+        self.assertEqual(lookup("missing"), [])
+
+    def test_long_tokens_are_not_indexed(self):
+        long_word = "a" * (MAX_TOKEN_LENGTH + 1)
+        self.assertEqual(tokenize(f"short {long_word}"), {"short"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for the Wazuh API response cache (wazuh/services/cache.py)
+
+Usage:
+    python3 -m pytest tests/test_wz_cache.py
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+spec = importlib.util.spec_from_file_location("wazuh_cache", os.path.join(ROOT, "wazuh", "services", "cache.py"))
+cache = sys.modules["wazuh_cache"] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cache)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = cache.TTLCache(maxsize=2, clock=self.clock)
+
+    def test_ttl(self):
+        loads = []
+        load = lambda: loads.append(1) or len(loads)
+        self.assertEqual(self.cache.get_or_load("a", load, ttl=10), 1)
+        self.clock.now += 9
+        self.assertEqual(self.cache.get_or_load("a", load, ttl=10), 1)
+        self.clock.now += 1
+        self.assertEqual(self.cache.get_or_load("a", load, ttl=10), 2)
+        self.assertEqual(self.cache.get_or_load("b", load, ttl=0), 3)
+        self.assertEqual(self.cache.get_or_load("b", load, ttl=0), 4)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 4, 1))
+
+    def test_lru_eviction(self):
+        for key in ("a", "b"):
+            self.cache.get_or_load(key, lambda: key, ttl=60)
+        self.cache.get_or_load("a", lambda: "reloaded", ttl=60)
+        self.cache.get_or_load("c", lambda: "c", ttl=60)
+        self.assertEqual(self.cache.get_or_load("a", lambda: "reloaded", ttl=60), "a")
+        self.assertEqual(self.cache.get_or_load("b", lambda: "reloaded", ttl=60), "reloaded")
+        self.assertEqual(self.cache.stats()["evictions"], 2)
+
+    def test_uncacheable_values_and_errors_are_not_stored(self):
+        self.assertIsNone(self.cache.get_or_load("a", lambda: None, ttl=60, cacheable=lambda value: value))
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_load("b", self._fail, ttl=60)
+        self.assertEqual(self.cache.stats()["size"], 0)
+        self.assertEqual(self.cache.get_or_load("b", lambda: "ok", ttl=60), "ok")
+
+    def test_invalidate(self):
+        self.cache.get_or_load("a", lambda: 1, ttl=60)
+        self.cache.get_or_load("b", lambda: 2, ttl=60)
+        self.cache.invalidate("a")
+        self.assertEqual(self.cache.get_or_load("a", lambda: 3, ttl=60), 3)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_concurrent_misses_share_one_load(self):
+        release = threading.Event()
+        calls = []
+
+        def load():
+            calls.append(threading.current_thread().name)
+            release.wait(5)
+            return {"agent": "001"}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_load("a", load, ttl=60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self._wait_for(lambda: self.cache.stats()["coalesced"] == 7)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_waiters_see_the_load_error(self):
+        release = threading.Event()
+        errors = []
+
+        def load():
+            release.wait(5)
+            raise RuntimeError("upstream down")
+
+        def call():
+            try:
+                self.cache.get_or_load("a", load, ttl=60)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self._wait_for(lambda: self.cache.stats()["coalesced"] == 3)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(errors, ["upstream down"] * 4)
+        self.assertEqual(self.cache.get_or_load("a", lambda: "ok", ttl=60), "ok")
+
+    @staticmethod
+    def _fail():
+        raise RuntimeError("boom")
+
+    def _wait_for(self, condition):
+        event = threading.Event()
+        for _ in range(500):
+            if condition():
+                return
+            event.wait(0.01)
+        self.fail("condition not reached")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Behavioural tests for proactive Wazuh API token refresh
+(wazuh/services/token_manager.py)
+
+Usage:
+    python3 -m pytest tests/test_wz_token.py
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+spec = importlib.util.spec_from_file_location("wazuh_token_manager",
+                                              os.path.join(ROOT, "wazuh", "services", "token_manager.py"))
+token_manager = sys.modules["wazuh_token_manager"] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(token_manager)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Authenticator:
+    """Issues token-1, token-2, ... or fails while ``error`` is set"""
+
+    def __init__(self, release=None):
+        self.calls = 0
+        self.error = None
+        self.release = release
+
+    def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error:
+            return None, self.error
+        return f"token-{self.calls}", None
+
+
+class TokenManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(token_manager.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_is_reused_until_expiry(self):
+        auth = Authenticator()
+        tokens = token_manager.TokenManager(auth, lifetime=900)
+        self.assertEqual(tokens.get_token(), "token-1")
+        self.clock.now += 899
+        self.assertEqual(tokens.get_token(), "token-1")
+        self.assertAlmostEqual(tokens.remaining(), 1)
+        self.clock.now += 1
+        self.assertFalse(tokens.is_valid())
+        self.assertEqual(tokens.get_token(), "token-2")
+        self.assertEqual(tokens.refreshes, 2)
+
+    def test_invalidate_only_the_rejected_token(self):
+        tokens = token_manager.TokenManager(Authenticator())
+        tokens.get_token()
+        tokens.invalidate("token-0")
+        self.assertTrue(tokens.is_valid())
+        tokens.invalidate("token-1")
+        self.assertEqual(tokens.get_token(), "token-2")
+
+    def test_failure_keeps_error(self):
+        auth = Authenticator()
+        auth.error = "401 Unauthorized"
+        tokens = token_manager.TokenManager(auth)
+        self.assertIsNone(tokens.get_token())
+        self.assertEqual(tokens.last_error, "401 Unauthorized")
+
+        tokens.authenticate = mock.Mock(side_effect=OSError("connection refused"))
+        self.assertIsNone(tokens.refresh())
+        self.assertEqual(tokens.last_error, "connection refused")
+
+    def test_margin_is_capped_at_half_the_lifetime(self):
+        self.assertEqual(token_manager.TokenManager(Authenticator(), lifetime=60, refresh_margin=45).refresh_margin, 30)
+
+    def test_concurrent_callers_share_one_refresh(self):
+        release = threading.Event()
+        auth = Authenticator(release)
+        tokens = token_manager.TokenManager(auth)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(tokens.get_token())) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        # Let the followers reach the wait before the leader finishes
+        deadline = time.time() + 5
+        while auth.calls == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(auth.calls, 1)
+        self.assertEqual(results, ["token-1"] * 6)
+
+
+class BackgroundRefreshTest(unittest.TestCase):
+
+    def test_refreshes_before_expiry(self):
+        remaining = []
+        auth = Authenticator()
+        tokens = token_manager.TokenManager(lambda: remaining.append(tokens.remaining()) or auth(),
+                                            lifetime=0.6, refresh_margin=0.3)
+        tokens.start()
+        try:
+            deadline = time.time() + 5
+            while auth.calls < 3 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            tokens.stop()
+        self.assertGreaterEqual(auth.calls, 3)
+        # Only the first token is fetched without one in hand
+        self.assertEqual(remaining[0], 0)
+        self.assertTrue(all(seconds > 0 for seconds in remaining[1:]), remaining)
+
+    def test_retries_after_failure(self):
+        auth = Authenticator()
+        auth.error = "503"
+        tokens = token_manager.TokenManager(auth, retry_interval=0.02, logger=mock.Mock())
+        tokens.start()
+        try:
+            deadline = time.time() + 5
+            while auth.calls < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            auth.error = None
+            while not tokens.is_valid() and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            tokens.stop()
+        self.assertTrue(tokens.is_valid())
+        self.assertGreaterEqual(tokens.logger.error.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+Minimal local stand-in for the Wazuh manager API used by the benchmarks
+
+Implements just enough of the API for WazuhService:
+    POST /security/user/authenticate
+    GET  /agents?offset=&limit=
+    GET  /agents/<id>/stats/agent
+
+The server speaks HTTP/1.1 with keep-alive, optionally over TLS with a
+throwaway self-signed certificate, and can add artificial latency.
+"""
+
+import argparse
+import json
+import os
+import re
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_AGENT_STATS = re.compile(r"^/agents/([^/]+)/stats/agent$")
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, agents, latency):
+        super().__init__(address, _StubHandler)
+        self.agents = agents
+        self.latency = latency
+        self.auth_calls = 0
+        self.requests = 0
+        self.counter_lock = threading.Lock()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, auth=False):
+        with self.server.counter_lock:
+            self.server.requests += 1
+            if auth:
+                self.server.auth_calls += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+
+        if urlsplit(self.path).path == "/security/user/authenticate":
+            self._count(auth=True)
+            self._send(200, {"data": {"token": "stub-token"}, "error": 0})
+        else:
+            self._count()
+            self._send(404, {"error": 1, "message": "Not found"})
+
+    def do_GET(self):
+        self._count()
+        if self.headers.get("Authorization") != "Bearer stub-token":
+            self._send(401, {"error": 1, "message": "Invalid token"})
+            return
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/agents":
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", ["500"])[0])
+            total = self.server.agents
+            items = [_agent(i) for i in range(offset, min(offset + limit, total))]
+            self._send(200, {
+                "data": {
+                    "affected_items": items,
+                    "total_affected_items": total,
+                    "total_failed_items": 0,
+                    "failed_items": [],
+                },
+                "error": 0,
+            })
+            return
+
+        match = _AGENT_STATS.match(url.path)
+        if match:
+            self._send(200, {
+                "data": {
+                    "affected_items": [{
+                        "agent_id": match.group(1),
+                        "status": "connected",
+                        "msg_count": 1024,
+                        "msg_sent": 1024,
+                        "last_keepalive": "2025-01-01T00:00:00Z",
+                    }],
+                    "total_affected_items": 1,
+                },
+                "error": 0,
+            })
+            return
+
+        self._send(404, {"error": 1, "message": "Not found"})
+
+
+def _agent(i):
+    return {
+        "id": f"{i:03d}",
+        "name": f"agent-{i}",
+        "ip": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        "status": "active",
+        "os": {"name": "Ubuntu", "version": "22.04"},
+        "version": "Wazuh v4.7.0",
+    }
+
+
+def _self_signed_context():
+    certdir = tempfile.mkdtemp(prefix="wazuh_stub_")
+    cert = os.path.join(certdir, "cert.pem")
+    key = os.path.join(certdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def start_stub(agents=1000, tls=False, latency=0.0):
+    """
+    Start the stub API on a free local port in a background thread
+
+    Args:
+        agents: Number of agents reported by /agents
+        tls: Serve HTTPS with a self-signed certificate (needs openssl)
+        latency: Seconds of artificial delay per request
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done
+    """
+    server = _StubServer(("127.0.0.1", 0), agents, latency)
+    scheme = "http"
+    if tls:
+        server.socket = _self_signed_context().wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_port}"
+
+
+def start_stub_process(agents=1000, tls=False, latency=0.0):
+    """
+    Run the stub in a child process so it does not share the GIL with the
+    client being measured
+
+    Returns:
+        tuple: (process, base_url); call process.terminate() when done
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--agents", str(agents), "--latency", str(latency)]
+    if tls:
+        command.append("--tls")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("Stub Wazuh API failed to start")
+    return process, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stub Wazuh API until interrupted")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tls", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(agents=args.agents, tls=args.tls, latency=args.latency)
+    print(base_url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -40,6 +40,11 @@ class Config:
     # Logging Configuration
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
     LOG_FILE = os.environ.get("LOG_FILE", "security_monitor.log")
+    LOG_ASYNC = os.environ.get("LOG_ASYNC", "true").lower() == "true"
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+    LOG_RATE_LIMIT = float(os.environ.get("LOG_RATE_LIMIT", 0))
+    LOG_RATE_BURST = int(os.environ.get("LOG_RATE_BURST", 0))
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
     
     # Wazuh Configuration
     WZ_USERNAME = os.environ.get("WZ_USERNAME")
@@ -51,6 +56,24 @@ class Config:
     # Construct Wazuh URL
     WZ_URL = f"{'https' if WZ_USE_SSL else 'http'}://{ES_HOST}:{WZ_PORT}"
     
+    # Wazuh API connection pool
+    WZ_POOL_SIZE = int(os.environ.get("WZ_POOL_SIZE", 10))
+    WZ_TIMEOUT = float(os.environ.get("WZ_TIMEOUT", 30))
+    WZ_MAX_RETRIES = int(os.environ.get("WZ_MAX_RETRIES", 3))
+    WZ_BACKOFF_FACTOR = float(os.environ.get("WZ_BACKOFF_FACTOR", 0.5))
+    
+    # Wazuh API token lifetime and background refresh lead time
+    WZ_TOKEN_LIFETIME = int(os.environ.get("WZ_TOKEN_LIFETIME", 900))
+    WZ_TOKEN_REFRESH_MARGIN = int(os.environ.get("WZ_TOKEN_REFRESH_MARGIN", 60))
+    
+    # Wazuh API response cache
+    WZ_CACHE_SIZE = int(os.environ.get("WZ_CACHE_SIZE", 1024))
+    WZ_AGENTS_CACHE_TTL = float(os.environ.get("WZ_AGENTS_CACHE_TTL", 30))
+    WZ_AGENT_INFO_CACHE_TTL = float(os.environ.get("WZ_AGENT_INFO_CACHE_TTL", 10))
+    
+    # Per-endpoint latency and error metrics for Wazuh API calls
+    WZ_METRICS = os.environ.get("WZ_METRICS", "true").lower() == "true"
+    
     # Disable urllib3 ssl warning
     if os.environ.get('DISABLE_SSL_WARNINGS', 'True').lower() == 'true':
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -1,2 +1,12 @@
-from .wazuh_service import WazuhService
+from .cache import TTLCache
+from .metrics import RequestMetrics, metrics_blueprint
+from .token_manager import TokenManager
+from .wazuh_service import WazuhService, WazuhServiceError
 
+
+def __getattr__(name):
+    # AsyncWazuhService needs aiohttp, which synchronous users may not have
+    if name == "AsyncWazuhService":
+        from .async_wazuh_service import AsyncWazuhService
+        return AsyncWazuhService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
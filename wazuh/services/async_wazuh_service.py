@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+from flask import current_app, has_app_context
+
+from .metrics import RequestMetrics
+from .wazuh_service import config_options
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncWazuhService:
+    """
+    asyncio client for the Wazuh API
+
+    Mirrors the WazuhService surface (``connect``, ``_request``,
+    ``get_wazuh_agents``, ``get_agent_info``) as coroutines. All calls
+    share one aiohttp connection pool, and a semaphore caps how many
+    requests are in flight so bulk fan-out does not overload the manager.
+    """
+
+    def __init__(self, pool_size=10, timeout=30, max_concurrency=10, max_retries=3,
+                 backoff_factor=0.5, token_lifetime=900, token_refresh_margin=60, metrics=True):
+        """
+        Args:
+            pool_size: Maximum number of keep-alive connections to the Wazuh API
+            timeout: Per-request timeout in seconds
+            max_concurrency: Maximum number of requests in flight at once
+            max_retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff factor between retries
+            token_lifetime: Seconds a Wazuh API token is valid (Wazuh default: 900)
+            token_refresh_margin: Seconds before expiry to refresh in the background
+            metrics: Record latency and errors per API endpoint
+        """
+        self.connected = False
+        self.token = None
+        self.base_url = ""
+        self.verify_certs = False
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.token_lifetime = token_lifetime
+        self.token_refresh_margin = min(token_refresh_margin, token_lifetime / 2)
+        self.logger = logging.getLogger(__name__)
+
+        self.session = None
+        self._credentials = None
+        self._expires_at = 0.0
+        self._limiter = None
+        self._auth_lock = None
+        self._refresh_task = None
+
+        # Upstream latency histograms and error counts per endpoint
+        self.metrics = RequestMetrics(enabled=metrics)
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a service tuned by the WZ_* settings of an app config (see config_options)"""
+        return cls(**config_options(config))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _log_error(self, message):
+        """Log error message using appropriate logger"""
+        if has_app_context():
+            current_app.logger.error(message)
+        else:
+            self.logger.error(message)
+
+    @property
+    def token_expiry(self):
+        if self.token is None:
+            return None
+        return datetime.now() + timedelta(seconds=max(0.0, self._expires_at - time.monotonic()))
+
+    def _ensure_session(self):
+        # aiohttp objects bind to the running loop, so create them lazily
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ssl=None if self.verify_certs else False
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._limiter = asyncio.Semaphore(self.max_concurrency)
+            self._auth_lock = asyncio.Lock()
+
+    async def close(self):
+        """Cancel the token refresher and close the connection pool"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def connect(self, host, username=None, password=None, verify_certs=False):
+        """
+        Connect to Wazuh endpoint
+
+        Args:
+            host: Wazuh API base URL
+            username: Username for basic auth
+            password: Password for basic auth
+            verify_certs: Verify TLS certificates
+
+        Returns:
+            dict: Connection status
+        """
+        try:
+            self.base_url = host
+            self.verify_certs = verify_certs
+            if not (username and password):
+                return {"connected": False, "error": "No credentials provided"}
+
+            self._credentials = (username, password)
+            self._ensure_session()
+
+            auth_result = await self.get_wazuh_token()
+            if not auth_result.get("connected"):
+                return {"connected": False, "error": auth_result.get("error")}
+
+            self.connected = True
+            if self._refresh_task is None:
+                self._refresh_task = asyncio.create_task(self._refresh_loop())
+            return auth_result
+
+        except Exception as e:
+            self._log_error(f"Error connecting to Wazuh: {str(e)}")
+            return {"connected": False, "error": str(e)}
+
+    def is_connected(self):
+        """Check if service has valid authentication token"""
+        return self.token is not None and time.monotonic() < self._expires_at
+
+    async def get_wazuh_token(self, force=False, stale_token=None):
+        """
+        Authenticate with Wazuh API, or reuse a refresh already in progress
+
+        Args:
+            force: Re-authenticate even if the current token looks valid
+            stale_token: Token known to be rejected; a newer token is reused
+                instead of authenticating again
+
+        Returns:
+            dict: Authentication result
+        """
+        if self._credentials is None:
+            return {"connected": False, "error": "Missing Wazuh credentials"}
+
+        self._ensure_session()
+        if force and stale_token is None:
+            stale_token = self.token
+
+        async with self._auth_lock:
+            # Another coroutine refreshed while we waited for the lock
+            if self.is_connected() and (not force or self.token != stale_token):
+                return {"connected": True, "token": self.token, "expires": self.token_expiry}
+
+            issued_at = time.monotonic()
+            try:
+                async with self.session.post(
+                    f"{self.base_url}/security/user/authenticate",
+                    auth=aiohttp.BasicAuth(*self._credentials)
+                ) as response:
+                    text = await response.text()
+                    if response.status != 200:
+                        error_msg = f"Authentication failed: {response.status} - {text}"
+                        self._observe_auth(issued_at, error=True)
+                        self._log_error(error_msg)
+                        return {"connected": False, "error": error_msg}
+                    data = await response.json(content_type=None)
+            except Exception as e:
+                self._observe_auth(issued_at, error=True)
+                self._log_error(f"Error getting Wazuh token: {str(e)}")
+                return {"connected": False, "error": str(e)}
+            self._observe_auth(issued_at)
+
+            self.token = data.get("data", {}).get("token")
+            if not self.token:
+                return {"connected": False, "error": "Authentication response did not contain a token"}
+            self._expires_at = issued_at + self.token_lifetime
+            return {"connected": True, "token": self.token, "expires": self.token_expiry}
+
+    def _observe_auth(self, started, error=False):
+        self.metrics.observe("POST", "/security/user/authenticate", time.monotonic() - started, error)
+
+    async def _refresh_loop(self):
+        """Refresh the token ahead of expiry so requests never wait on auth"""
+        while True:
+            delay = self._expires_at - time.monotonic() - self.token_refresh_margin
+            if delay > 0:
+                await asyncio.sleep(delay)
+            result = await self.get_wazuh_token(force=True)
+            if not result.get("connected"):
+                await asyncio.sleep(10)
+
+    async def _request(self, method, endpoint, params=None, data=None):
+        """
+        Send a request to the Wazuh API and record its latency
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            endpoint: API endpoint (without base URL)
+            params: URL parameters
+            data: Request body data
+
+        Returns:
+            dict: Response data or error
+        """
+        start = time.perf_counter()
+        result = await self._call(method, endpoint, params=params, data=data)
+        self.metrics.observe(method, endpoint, time.perf_counter() - start, "data" not in result)
+        return result
+
+    async def _call(self, method, endpoint, params=None, data=None):
+        """
+        Send a request to the Wazuh API, retrying and refreshing the token as needed
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            endpoint: API endpoint (without base URL)
+            params: URL parameters
+            data: Request body data
+
+        Returns:
+            dict: Response data or error
+        """
+        if not self.is_connected():
+            token_result = await self.get_wazuh_token()
+            if not token_result.get("connected"):
+                return {"error": "Not connected to Wazuh API"}
+
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        if params:
+            params = {key: str(value) for key, value in params.items() if value is not None}
+
+        async with self._limiter:
+            attempt = 0
+            refreshed = False
+            while True:
+                token = self.token
+                try:
+                    async with self.session.request(
+                        method,
+                        url,
+                        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+                        params=params,
+                        json=data
+                    ) as response:
+                        status = response.status
+                        text = await response.text()
+                        if 200 <= status < 300:
+                            return await response.json(content_type=None)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        attempt += 1
+                        continue
+                    self._log_error(f"Error in Wazuh API request: {str(e) or type(e).__name__}")
+                    return {"error": str(e) or type(e).__name__}
+
+                # Token revoked or expired server-side: refresh once and retry
+                if status == 401 and not refreshed:
+                    refreshed = True
+                    if (await self.get_wazuh_token(force=True, stale_token=token)).get("connected"):
+                        continue
+
+                if status in RETRY_STATUSES and attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    attempt += 1
+                    continue
+
+                error_msg = f"Wazuh API request failed: {status} - {text}"
+                self._log_error(error_msg)
+                return {"error": error_msg}
+
+    async def get_wazuh_agents(self, status=None, offset=0, limit=500, sort=None) -> dict:
+        """
+        Get list of Wazuh agents
+
+        Args:
+            status: Filter by agent status (active, disconnected, never_connected, pending)
+            offset: First item to return
+            limit: Maximum number of items to return
+            sort: Sort field and order (e.g., "name asc")
+
+        Returns:
+            dict: List of agents or error
+        """
+        params = {
+            "offset": offset,
+            "limit": limit,
+            "status": status,
+            "sort": sort
+        }
+        return await self._request("GET", "/agents", params=params)
+
+    async def get_agent_info(self, agent_id) -> dict:
+        """
+        Get information about a specific agent
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            dict: Agent information or error
+        """
+        return await self._request("GET", f"/agents/{agent_id}/stats/agent")
+
+    async def gather_agent_info(self, agent_ids) -> dict:
+        """
+        Fetch information for many agents concurrently
+
+        Args:
+            agent_ids: Iterable of agent IDs
+
+        Returns:
+            dict: Agent ID to agent information or error
+        """
+        agent_ids = list(agent_ids)
+        results = await asyncio.gather(*(self.get_agent_info(agent_id) for agent_id in agent_ids))
+        return dict(zip(agent_ids, results))
+
+    async def gather_requests(self, requests) -> list:
+        """
+        Run many API requests concurrently under the concurrency limit
+
+        Args:
+            requests: Iterable of (method, endpoint, params) tuples
+
+        Returns:
+            list: Responses in request order
+        """
+        return await asyncio.gather(*(
+            self._request(method, endpoint, params=params) for method, endpoint, params in requests
+        ))
+
+    async def get_all_agents(self, status=None, sort=None, page_size=500) -> dict:
+        """
+        Get the full list of Wazuh agents, fetching pages concurrently
+
+        Args:
+            status: Filter by agent status
+            sort: Sort field and order (e.g., "name asc")
+            page_size: Agents per API request
+
+        Returns:
+            dict: All agents or error
+        """
+        first = await self.get_wazuh_agents(status=status, offset=0, limit=page_size, sort=sort)
+        if "data" not in first:
+            return {"error": first.get("error") or "Unexpected response from Wazuh API"}
+
+        total = first["data"].get("total_affected_items", 0)
+        pages = await asyncio.gather(*(
+            self.get_wazuh_agents(status=status, offset=offset, limit=page_size, sort=sort)
+            for offset in range(page_size, total, page_size)
+        ))
+
+        agents = list(first["data"].get("affected_items", []))
+        for page in pages:
+            if "data" not in page:
+                return {"error": page.get("error") or "Unexpected response from Wazuh API"}
+            agents.extend(page["data"].get("affected_items", []))
+
+        return {
+            "data": {
+                "affected_items": agents,
+                "total_affected_items": len(agents)
+            }
+        }
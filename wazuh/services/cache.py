@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and single-flight loading
+
+    Concurrent misses for the same key share one call to the loader: the
+    first caller loads, the others wait for its result. Cached values are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader, ttl, cacheable=None):
+        """
+        Return the cached value for key, loading it on a miss
+
+        Args:
+            key: Hashable cache key
+            loader: Zero-argument callable producing the value
+            ttl: Seconds the loaded value stays fresh (0 disables caching)
+            cacheable: Optional predicate; values failing it are not stored
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and ttl > 0 and (cacheable is None or cacheable(flight.value)):
+                    self._store(key, flight.value, ttl)
+            flight.event.set()
+
+        return flight.value
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (value, self._clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
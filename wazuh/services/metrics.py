@@ -0,0 +1,152 @@
+import bisect
+import re
+import threading
+
+from flask import Blueprint, Response
+
+# Upper bounds in seconds of the upstream latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Agent IDs and other numeric path segments are folded into one label value
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+# The same histogram as the listener's backend/metrics.py, which the wazuh
+# app cannot import; keep the two in step
+class Histogram:
+    """
+    Latency histogram with buckets allocated up front
+
+    ``observe`` only bumps an existing counter under a lock; nothing is
+    allocated per observation.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        """Prometheus _bucket, _sum and _count lines"""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, bucket in zip(self.buckets + (None,), counts):
+            cumulative += bucket
+            le = "+Inf" if bound is None else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+
+class _Endpoint:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.errors = 0
+
+
+class RequestMetrics:
+    """
+    Upstream latency and error counts per Wazuh API endpoint
+
+    Endpoints are keyed by method and path, with numeric segments such as
+    agent IDs replaced by ``{id}``. Histograms are created on the first
+    call to an endpoint; later calls only bump preallocated counters.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._endpoints = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, endpoint, seconds, error=False):
+        """Record one API call"""
+        if not self.enabled:
+            return
+        with self._lock:
+            path = self._paths.get(endpoint)
+            if path is None:
+                path = _ID_SEGMENT.sub("/{id}", "/" + endpoint.lstrip("/"))
+                # Cache raw paths so the regex runs once per distinct path
+                if len(self._paths) < 4096:
+                    self._paths[endpoint] = path
+            entry = self._endpoints.get((method, path))
+            if entry is None:
+                entry = self._endpoints[(method, path)] = _Endpoint(self.buckets)
+            if error:
+                entry.errors += 1
+        entry.latency.observe(seconds)
+
+    def snapshot(self):
+        """Calls, errors and mean latency per endpoint"""
+        with self._lock:
+            return {
+                f"{method} {path}": {
+                    "calls": entry.latency.count,
+                    "errors": entry.errors,
+                    "avg_seconds": round(entry.latency.sum / entry.latency.count, 6) if entry.latency.count else 0.0,
+                }
+                for (method, path), entry in sorted(self._endpoints.items())
+            }
+
+    def render(self, prefix="wazuh_api"):
+        """
+        Prometheus text exposition of the request metrics
+
+        Returns:
+            str: ``<prefix>_request_duration_seconds`` histograms and
+            ``<prefix>_request_errors_total`` counters
+        """
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Wazuh API request latency, including retries",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        errors = [
+            f"# HELP {prefix}_request_errors_total Wazuh API requests that returned an error",
+            f"# TYPE {prefix}_request_errors_total counter",
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+        for (method, path), entry in endpoints:
+            labels = f'method="{method}",endpoint="{path}"'
+            lines.extend(entry.latency.samples(f"{prefix}_request_duration_seconds", labels))
+            errors.append(f"{prefix}_request_errors_total{{{labels}}} {entry.errors}")
+        return "\n".join(lines + errors) + "\n"
+
+
+def metrics_blueprint(service, prefix="wazuh_api"):
+    """
+    Flask blueprint serving a service's request metrics on GET /metrics
+
+    Register it on the app that embeds the service:
+    ``app.register_blueprint(metrics_blueprint(service))``.
+
+    Args:
+        service: WazuhService or AsyncWazuhService
+        prefix: Metric name prefix
+    """
+    blueprint = Blueprint("wazuh_api_metrics", __name__)
+
+    @blueprint.route("/metrics", methods=["GET"])
+    def get_metrics():
+        return Response(service.metrics.render(prefix), mimetype="text/plain; version=0.0.4")
+
+    return blueprint
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+
+class TokenManager:
+    """
+    Keeps a Wazuh API token fresh ahead of its expiry
+
+    A background thread re-authenticates ``refresh_margin`` seconds before
+    the token expires, so request threads normally just read the current
+    token. Only one authentication runs at a time; threads that need a
+    token while a refresh is in flight wait for and reuse its result.
+    """
+
+    def __init__(self, authenticate, lifetime=900, refresh_margin=60, retry_interval=10, logger=None):
+        """
+        Args:
+            authenticate: Callable returning (token, error)
+            lifetime: Seconds a token stays valid after it is issued
+            refresh_margin: Seconds before expiry to refresh in the background
+            retry_interval: Seconds between background retries after a failure
+            logger: Logger for refresh failures
+        """
+        self.authenticate = authenticate
+        self.lifetime = lifetime
+        self.refresh_margin = min(refresh_margin, lifetime / 2)
+        self.retry_interval = retry_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.token = None
+        self.expires_at = 0.0
+        self.last_error = None
+        self.refreshes = 0
+
+        self._cond = threading.Condition()
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_valid(self):
+        return self.token is not None and time.monotonic() < self.expires_at
+
+    def remaining(self):
+        """Seconds until the current token expires (0 if none)"""
+        if self.token is None:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def get_token(self):
+        """
+        Return a valid token, refreshing synchronously only if none is available
+
+        Returns:
+            str: The token, or None if authentication failed
+        """
+        if self.is_valid():
+            return self.token
+        return self.refresh()
+
+    def refresh(self):
+        """
+        Authenticate now, or join a refresh that is already running
+
+        Returns:
+            str: The new token, or None if authentication failed
+        """
+        with self._cond:
+            if self._refreshing:
+                self._cond.wait_for(lambda: not self._refreshing)
+                return self.token if self.is_valid() else None
+            self._refreshing = True
+
+        token = None
+        error = None
+        issued_at = time.monotonic()
+        try:
+            token, error = self.authenticate()
+        except Exception as e:
+            error = str(e)
+        finally:
+            with self._cond:
+                if token:
+                    self.token = token
+                    self.expires_at = issued_at + self.lifetime
+                    self.last_error = None
+                    self.refreshes += 1
+                else:
+                    self.last_error = error or "Authentication failed"
+                self._refreshing = False
+                self._cond.notify_all()
+
+        return token
+
+    def invalidate(self, token):
+        """Mark a token rejected by the API as expired"""
+        with self._cond:
+            if self.token == token:
+                self.expires_at = 0.0
+
+    def start(self):
+        """Start the background refresh thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wazuh-token-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.is_valid():
+                delay = self.remaining() - self.refresh_margin
+            else:
+                delay = 0
+            if delay > 0 and self._stop.wait(delay):
+                return
+
+            if self.refresh() is None:
+                self.logger.error(f"Background Wazuh token refresh failed: {self.last_error}")
+                if self._stop.wait(self.retry_interval):
+                    return
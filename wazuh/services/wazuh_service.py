@@ -1,19 +1,172 @@
 import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from flask import current_app, has_app_context
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import TTLCache
+from .metrics import RequestMetrics
+from .token_manager import TokenManager
+
+# Default cache lifetime in seconds per cached endpoint
+DEFAULT_CACHE_TTLS = {
+    "agents": 30,
+    "agent_info": 10,
+}
+
+# App config keys (see Config) mapped to service constructor arguments
+CONFIG_OPTIONS = {
+    "WZ_POOL_SIZE": "pool_size",
+    "WZ_TIMEOUT": "timeout",
+    "WZ_MAX_RETRIES": "max_retries",
+    "WZ_BACKOFF_FACTOR": "backoff_factor",
+    "WZ_TOKEN_LIFETIME": "token_lifetime",
+    "WZ_TOKEN_REFRESH_MARGIN": "token_refresh_margin",
+    "WZ_METRICS": "metrics",
+}
+
+# Response cache settings, which only WazuhService has
+CACHE_CONFIG_OPTIONS = {"WZ_CACHE_SIZE": "cache_size"}
+CACHE_TTL_CONFIG = {
+    "WZ_AGENTS_CACHE_TTL": "agents",
+    "WZ_AGENT_INFO_CACHE_TTL": "agent_info",
+}
+
+
+def config_options(config, options=CONFIG_OPTIONS):
+    """
+    Constructor arguments from the WZ_* settings of an app config
+
+    Args:
+        config: The Config class or a mapping such as Flask's ``app.config``
+        options: Config keys mapped to argument names
+
+    Returns:
+        dict: Arguments for the keys that are set; the others keep their defaults
+    """
+    if isinstance(config, Mapping):
+        values = {key: config.get(key) for key in options}
+    else:
+        values = {key: getattr(config, key, None) for key in options}
+    return {options[key]: value for key, value in values.items() if value is not None}
+
+
+class WazuhServiceError(Exception):
+    """Raised by streaming helpers when the Wazuh API returns an error"""
 
 
 class WazuhService:
     """Service for interacting with Wazuh"""
     
-    def __init__(self):
+    def __init__(self, pool_size=10, timeout=30, max_retries=3, backoff_factor=0.5,
+                 cache_size=1024, cache_ttls=None, token_lifetime=900, token_refresh_margin=60,
+                 metrics=True):
+        """
+        Args:
+            pool_size: Maximum number of keep-alive connections to the Wazuh API
+            timeout: Per-request timeout in seconds (connect and read)
+            max_retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff factor between retries
+            cache_size: Maximum number of cached responses (LRU eviction)
+            cache_ttls: Per-endpoint TTL overrides, see DEFAULT_CACHE_TTLS;
+                a TTL of 0 disables caching for that endpoint
+            token_lifetime: Seconds a Wazuh API token is valid (Wazuh default: 900)
+            token_refresh_margin: Seconds before expiry to refresh in the background
+            metrics: Record latency and errors per API endpoint
+        """
         self.connected = False
-        self.token = None
-        self.token_expiry = None
         self.base_url = ""
         self.verify_certs = False
+        self.timeout = timeout
         self.logger = logging.getLogger(__name__)
+        
+        # One session shared by all threads; urllib3's pool is thread-safe and
+        # every request passes its own headers, so no session state is mutated
+        self.session = self._build_session(pool_size, max_retries, backoff_factor)
+        
+        # Tokens are refreshed ahead of expiry by a background thread; request
+        # threads only read the current token
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        self.tokens = TokenManager(
+            self._authenticate,
+            lifetime=token_lifetime,
+            refresh_margin=token_refresh_margin,
+            logger=self.logger
+        )
+        
+        # Response cache for agent lookups; concurrent misses share one request
+        self.cache = TTLCache(maxsize=cache_size)
+        self.cache_ttls = dict(DEFAULT_CACHE_TTLS, **(cache_ttls or {}))
+        
+        # Upstream latency histograms and error counts per endpoint
+        self.metrics = RequestMetrics(enabled=metrics)
+    
+    @classmethod
+    def from_config(cls, config):
+        """Create a service tuned by the WZ_* settings of an app config (see config_options)"""
+        kwargs = config_options(config, dict(CONFIG_OPTIONS, **CACHE_CONFIG_OPTIONS))
+        cache_ttls = config_options(config, CACHE_TTL_CONFIG)
+        if cache_ttls:
+            kwargs["cache_ttls"] = cache_ttls
+        return cls(**kwargs)
+    
+    @staticmethod
+    def _build_session(pool_size, max_retries, backoff_factor):
+        """Create a requests session with a keep-alive pool and retry policy"""
+        retry_strategy = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry_strategy
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    @property
+    def token(self):
+        return self.tokens.token
+    
+    @property
+    def token_expiry(self):
+        if self.tokens.token is None:
+            return None
+        return datetime.now() + timedelta(seconds=self.tokens.remaining())
+    
+    def close(self):
+        """Stop the token refresher and close all pooled connections"""
+        self.tokens.stop()
+        self.session.close()
+    
+    def cache_stats(self):
+        """Return hit/miss counters of the response cache"""
+        return self.cache.stats()
+    
+    def _cached_request(self, cache_name, key, method, endpoint, params=None):
+        """
+        Send a request through the response cache
+        
+        Only successful responses are cached. Returned dicts are shared
+        with other callers and must not be modified.
+        """
+        return self.cache.get_or_load(
+            (cache_name,) + key,
+            lambda: self._request(method, endpoint, params=params),
+            ttl=self.cache_ttls.get(cache_name, 0),
+            cacheable=lambda result: "data" in result
+        )
     
     def _log_error(self, message):
         """Log error message using appropriate logger"""
@@ -41,6 +194,8 @@ class WazuhService:
             if username and password:
                 auth_result = self.get_wazuh_token(username, password)
                 if auth_result.get("connected"):
+                    self.connected = True
+                    self.tokens.start()
                     return auth_result
                 return {"connected": False, "error": auth_result.get("error")}
             
@@ -52,9 +207,7 @@ class WazuhService:
         
     def is_connected(self):
         """Check if service has valid authentication token"""
-        if datetime.now() > self.token_expiry:
-            self.renew_token()
-        return self.token is not None and self.token_expiry and datetime.now() < self.token_expiry
+        return self.tokens.is_valid()
     
     def renew_token(self):
         """
@@ -63,23 +216,45 @@ class WazuhService:
         Returns:
             dict: Authentication result
         """
-        # Get credentials from current app context if available
-        username = None
-        password = None
-        
-        if has_app_context():
-            username = current_app.config.get("WZ_USER")
+        # Fall back to credentials from the current app context
+        if self._credentials is None and has_app_context():
+            username = current_app.config.get("WZ_USERNAME") or current_app.config.get("WZ_USER")
             password = current_app.config.get("WZ_PASSWORD")
+            if username and password:
+                self._set_credentials(username, password)
         
-        # If credentials are available, get a new token
-        if username and password:
-            return self.get_wazuh_token(username, password)
-        else:
+        if self._credentials is None:
             return {"connected": False, "error": "Missing Wazuh credentials"}
+        
+        if self.tokens.refresh() is None:
+            return {"connected": False, "error": self.tokens.last_error}
+        return {
+            "connected": True,
+            "token": self.token,
+            "expires": self.token_expiry
+        }
     
     def _request(self, method, endpoint, params=None, data=None):
         """
-        Send a request to the Wazuh API
+        Send a request to the Wazuh API and record its latency
+        
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            endpoint: API endpoint (without base URL)
+            params: URL parameters
+            data: Request body data
+            
+        Returns:
+            dict: Response data or error
+        """
+        start = time.perf_counter()
+        result = self._call(method, endpoint, params=params, data=data)
+        self.metrics.observe(method, endpoint, time.perf_counter() - start, "data" not in result)
+        return result
+    
+    def _call(self, method, endpoint, params=None, data=None):
+        """
+        Send a request to the Wazuh API, refreshing the token once on 401
         
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
@@ -90,30 +265,25 @@ class WazuhService:
         Returns:
             dict: Response data or error
         """
-        if not self.is_connected():
-            token_result = self.get_wazuh_token()
-            if not token_result.get("connected"):
-                return {"error": "Not connected to Wazuh API"}
+        # Normally served from memory; only blocks if the background
+        # refresh could not keep the token valid
+        token = self.tokens.get_token()
+        if token is None:
+            return {"error": "Not connected to Wazuh API"}
         
         try:
             # Build request URL
             url = f"{self.base_url}/{endpoint.lstrip('/')}"
             
-            # Set headers with authentication token
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
+            response = self._send(method, url, token, params, data)
             
-            # Send request
-            response = requests.request(
-                method,
-                url,
-                headers=headers,
-                params=params,
-                json=data,
-                verify=self.verify_certs
-            )
+            # Token revoked or expired server-side: refresh once and retry
+            if response.status_code == 401:
+                self.tokens.invalidate(token)
+                token = self.tokens.get_token()
+                if token is None:
+                    return {"error": "Not connected to Wazuh API"}
+                response = self._send(method, url, token, params, data)
             
             # Check if successful
             if response.status_code >= 200 and response.status_code < 300:
@@ -126,6 +296,22 @@ class WazuhService:
         except Exception as e:
             self._log_error(f"Error in Wazuh API request: {str(e)}")
             return {"error": str(e)}
+    
+    def _send(self, method, url, token, params, data):
+        """Send one authenticated request over the pooled session"""
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        return self.session.request(
+            method,
+            url,
+            headers=headers,
+            params=params,
+            json=data,
+            verify=self.verify_certs,
+            timeout=self.timeout
+        )
         
     def get_wazuh_token(self, username=None, password=None):
         """
@@ -139,44 +325,74 @@ class WazuhService:
             dict: Authentication result
         """
         try:
-            if not username or not password:
+            if username and password:
+                self._set_credentials(username, password)
+            elif self._credentials is None:
                 return {"connected": False, "error": "Missing Wazuh credentials"}
-            # Check if token is still valid
-            if self.token and self.token_expiry and datetime.now() < self.token_expiry:
-                return {"connected": True, "token": self.token}
             
+            if self.tokens.get_token() is None:
+                return {"connected": False, "error": self.tokens.last_error}
+            
+            return {
+                "connected": True,
+                "token": self.token,
+                "expires": self.token_expiry
+            }
+            
+        except Exception as e:
+            self._log_error(f"Error getting Wazuh token: {str(e)}")
+            return {"connected": False, "error": str(e)}
+    
+    def _set_credentials(self, username, password):
+        """Store credentials; a change of user drops the current token"""
+        with self._credentials_lock:
+            if self._credentials != (username, password):
+                if self._credentials is not None:
+                    self.tokens.invalidate(self.tokens.token)
+                self._credentials = (username, password)
+    
+    def _authenticate(self):
+        """
+        Call /security/user/authenticate with the stored credentials
+        
+        Used by the token manager; never called on the request path while
+        the background refresh keeps the token valid.
+        
+        Returns:
+            tuple: (token, error)
+        """
+        if self._credentials is None:
+            return None, "Missing Wazuh credentials"
+        
+        start = time.perf_counter()
+        try:
             # Build authentication URL
             auth_url = f"{self.base_url}/security/user/authenticate"
             
             # Authenticate with Wazuh API
-            response = requests.post(
+            response = self.session.post(
                 auth_url,
-                auth=(username, password),
-                verify=self.verify_certs
+                auth=self._credentials,
+                verify=self.verify_certs,
+                timeout=self.timeout
             )
             
             # Process response
             if response.status_code == 200:
-                data = response.json()
-                self.token = data.get("data", {}).get("token")
-                
-                # Set token expiry (default to 15 minutes if not specified)
-                # Note: Wazuh tokens typically expire after 15 minutes
-                self.token_expiry = datetime.now() + timedelta(minutes=15)
-                
-                return {
-                    "connected": True,
-                    "token": self.token,
-                    "expires": self.token_expiry
-                }
+                token = response.json().get("data", {}).get("token")
+                if token:
+                    self.metrics.observe("POST", "/security/user/authenticate", time.perf_counter() - start)
+                    return token, None
+                error_msg = "Authentication response did not contain a token"
             else:
                 error_msg = f"Authentication failed: {response.status_code} - {response.text}"
-                self._log_error(error_msg)
-                return {"connected": False, "error": error_msg}
             
         except Exception as e:
-            self._log_error(f"Error getting Wazuh token: {str(e)}")
-            return {"connected": False, "error": str(e)}
+            error_msg = f"Error getting Wazuh token: {str(e)}"
+        
+        self.metrics.observe("POST", "/security/user/authenticate", time.perf_counter() - start, True)
+        self._log_error(error_msg)
+        return None, error_msg
     
     def get_wazuh_agents(self, status=None, offset=0, limit=500, sort=None) -> dict:
         """
@@ -191,7 +407,12 @@ class WazuhService:
         Returns:
             dict: List of agents or error
         """
-        # Build parameters
+        params = self._agents_params(status, offset, limit, sort)
+        return self._cached_request("agents", (status, offset, limit, sort), "GET", "/agents", params=params)
+    
+    @staticmethod
+    def _agents_params(status, offset, limit, sort):
+        """Query parameters of an /agents request"""
         params = {
             "offset": offset,
             "limit": limit
@@ -202,9 +423,8 @@ class WazuhService:
             
         if sort:
             params["sort"] = sort
-            
-        # Get agents
-        return self._request("GET", "/agents", params=params)
+        
+        return params
     
     def get_agent_info(self, agent_id) -> dict:
         """
@@ -216,4 +436,93 @@ class WazuhService:
         Returns:
             dict: Agent information or error
         """
-        return self._request("GET", f"/agents/{agent_id}/stats/agent")
\ No newline at end of file
+        return self._cached_request("agent_info", (agent_id,), "GET", f"/agents/{agent_id}/stats/agent")
+    
+    def iter_all_agents(self, status=None, sort=None, page_size=500, max_workers=4):
+        """
+        Iterate over every Wazuh agent, fetching pages concurrently
+        
+        The first page is fetched to learn ``total_affected_items``; the
+        remaining pages are requested by a bounded worker pool. At most
+        ``max_workers`` pages are in flight or buffered at any time and
+        agents are yielded in page order, so memory stays bounded by the
+        pool size rather than the inventory size.
+        
+        Args:
+            status: Filter by agent status (active, disconnected, never_connected, pending)
+            sort: Sort field and order (e.g., "name asc")
+            page_size: Agents per API request
+            max_workers: Maximum number of concurrent page requests
+            
+        Yields:
+            dict: One agent at a time
+            
+        Raises:
+            WazuhServiceError: If any page request fails
+        """
+        # Pages bypass the response cache, which would otherwise hold the
+        # whole inventory for the cache TTL
+        def fetch(offset):
+            return self._request("GET", "/agents", params=self._agents_params(status, offset, page_size, sort))
+        
+        first = self._page_data(fetch(0))
+        total = first.get("total_affected_items", 0)
+        yield from first.get("affected_items", [])
+        
+        offsets = iter(range(page_size, total, page_size))
+        pending = deque()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            try:
+                for offset in offsets:
+                    pending.append(pool.submit(fetch, offset))
+                    if len(pending) >= max_workers:
+                        break
+                
+                while pending:
+                    page = pending.popleft().result()
+                    
+                    # Keep the pool busy while the caller consumes this page
+                    offset = next(offsets, None)
+                    if offset is not None:
+                        pending.append(pool.submit(fetch, offset))
+                    
+                    yield from self._page_data(page).get("affected_items", [])
+            finally:
+                # Stop outstanding requests if the caller stops early or a page fails
+                for future in pending:
+                    future.cancel()
+    
+    def get_all_agents(self, status=None, sort=None, page_size=500, max_workers=4) -> dict:
+        """
+        Get the full list of Wazuh agents across all pages
+        
+        Args:
+            status: Filter by agent status (active, disconnected, never_connected, pending)
+            sort: Sort field and order (e.g., "name asc")
+            page_size: Agents per API request
+            max_workers: Maximum number of concurrent page requests
+            
+        Returns:
+            dict: All agents or error
+        """
+        try:
+            agents = list(self.iter_all_agents(status=status, sort=sort, page_size=page_size, max_workers=max_workers))
+        except WazuhServiceError as e:
+            return {"error": str(e)}
+        
+        return {
+            "data": {
+                "affected_items": agents,
+                "total_affected_items": len(agents)
+            }
+        }
+    
+    def _page_data(self, result):
+        """Return the data section of a paged response or raise on error"""
+        data = result.get("data")
+        if not isinstance(data, dict):
+            error_msg = result.get("error") or "Unexpected response from Wazuh API"
+            self._log_error(f"Error fetching Wazuh agents page: {error_msg}")
+            raise WazuhServiceError(error_msg)
+        return data
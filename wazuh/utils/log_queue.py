@@ -0,0 +1,96 @@
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler
+
+# The wazuh app is deployed without the listener's backend/ directory, so it
+# carries these handlers itself; keep them in step with backend/log_queue.py
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and exception"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name
+
+    Each logger may emit ``rate`` records per second with bursts of up
+    to ``burst``. Records over the limit are dropped; the next record
+    that passes notes how many were suppressed. One instance can be
+    shared by several handlers: a record is only counted once, however
+    many of them it passes through.
+    """
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.suppressed = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        passed = getattr(record, "rate_limit_passed", None)
+        if passed is not None:
+            return passed
+        record.rate_limit_passed = passed = self._take(record)
+        return passed
+
+    def _take(self, record):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, dropped = self._buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, dropped + 1)
+                self.suppressed += 1
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} messages suppressed)"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread
+
+    Records are put on a bounded queue without waiting; when the queue
+    is full (the writer is stalled) the record is dropped and counted.
+    Formatting is left to the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener = None
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Merge the arguments now, while they still hold their current values
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
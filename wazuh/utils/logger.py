@@ -1,54 +1,89 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueListener, RotatingFileHandler
 from pathlib import Path
 
+from .log_queue import DroppingQueueHandler, JsonFormatter, RateLimitFilter
+
+
+def _setting(app, name, default):
+    return app.config.get(name, os.environ.get(name, default))
+
+
 def setup_logger(app):
     """
     Configure logging for the Flask application.
-    
+
+    With LOG_ASYNC (the default) the app logger only puts records on a
+    bounded queue; a listener thread writes them to the rotating file
+    and the console, so slow disks or terminals never delay a request.
+    LOG_FORMAT=json switches to one JSON object per line and
+    LOG_RATE_LIMIT caps records per second per logger.
+
     Args:
         app: Flask application instance
     """
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    
+
     # Get log configuration from app config or environment
-    log_level = app.config.get("LOG_LEVEL", os.environ.get("LOG_LEVEL", "INFO"))
-    log_file = app.config.get("LOG_FILE", os.environ.get("LOG_FILE", "security_monitor.log"))
-    
+    log_level = _setting(app, "LOG_LEVEL", "INFO")
+    log_file = _setting(app, "LOG_FILE", "security_monitor.log")
+    log_async = str(_setting(app, "LOG_ASYNC", "true")).lower() == "true"
+    log_format = str(_setting(app, "LOG_FORMAT", "text")).lower()
+    rate_limit = float(_setting(app, "LOG_RATE_LIMIT", 0))
+    rate_burst = int(_setting(app, "LOG_RATE_BURST", 0)) or None
+    queue_size = int(_setting(app, "LOG_QUEUE_SIZE", 10000))
+
     # Ensure log file path is properly constructed
     # if not os.path.isabs(log_file):
     log_file = log_dir / log_file
-        
-    log_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
+
+    if log_format == "json":
+        log_formatter = JsonFormatter()
+    else:
+        log_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+
     # File handler with rotation
     file_handler = RotatingFileHandler(
-        log_file, 
+        log_file,
         maxBytes=10485760,  # 10MB
         backupCount=10
     )
     file_handler.setFormatter(log_formatter)
     file_handler.setLevel(log_level)
-    
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(log_formatter)
     console_handler.setLevel(log_level)
-    
+
+    handlers = [file_handler, console_handler]
+    if log_async:
+        queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        app.extensions["log_queue_handler"] = queue_handler
+        handlers = [queue_handler]
+
     # Set up the app logger
     app.logger.handlers = []
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
+    rate_filter = RateLimitFilter(rate_limit, rate_burst) if rate_limit else None
+    for handler in handlers:
+        if rate_filter is not None:
+            handler.addFilter(rate_filter)
+        app.logger.addHandler(handler)
     app.logger.setLevel(log_level)
-    
+
     # Log startup information
     app.logger.info(f"Logger initialized with level: {log_level}")
     app.logger.info(f"Log file: {log_file}")
-    
+
     # Return logger for imports in other files
-    return app.logger
\ No newline at end of file
+    return app.logger
@@ -4,15 +4,41 @@ import json
 import sys
 import time
 import os
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import fcntl
+import signal
 
-# Debug settings
-debug_enabled = True
+# requests/urllib3 are only imported by the forwarder daemon: they dominate
+# the interpreter start-up cost of a single hook run
+
+# Log settings: WZ_HOOK_LOG_LEVEL is one of debug, info, error or off.
+# Messages are buffered and written with a single append per run.
+LOG_LEVELS = {"debug": 10, "info": 20, "error": 40, "off": 100}
+log_level = LOG_LEVELS.get(os.environ.get("WZ_HOOK_LOG_LEVEL", "info").lower(), LOG_LEVELS["info"])
+debug_enabled = log_level <= LOG_LEVELS["debug"]
+log_buffer = []
 pwd = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 log_file = '{0}/logs/integrations.log'.format(pwd)
-now = time.strftime("%a %b %d %H:%M:%S %Z %Y")
+default_webhook_url = "http://127.0.0.1:5000/webhook/wazuh"
+
+# Direct delivery retry policy
+send_retries = 3
+send_backoff_factor = 1
+send_retry_statuses = (429, 500, 502, 503, 504)
+
+# Delivery mode: "direct" posts every alert from this process, "spool" only
+# appends it to the local spool drained by the forwarder daemon
+# (custom-flask.py --forward [api_key] [hook_url], the hook's argument order)
+hook_mode = os.environ.get("WZ_HOOK_MODE", "direct").lower()
+spool_dir = os.environ.get("WZ_HOOK_SPOOL_DIR", '{0}/queue/custom-flask'.format(pwd))
+spool_file = os.path.join(spool_dir, "alerts.ndjson")
+offset_file = os.path.join(spool_dir, "alerts.offset")
+
+# Forwarder settings
+forward_batch_size = int(os.environ.get("WZ_HOOK_BATCH_SIZE", 500))
+forward_batch_bytes = int(os.environ.get("WZ_HOOK_BATCH_BYTES", 1024 * 1024))
+forward_poll_interval = float(os.environ.get("WZ_HOOK_POLL_INTERVAL", 0.5))
+forward_max_backoff = float(os.environ.get("WZ_HOOK_MAX_BACKOFF", 60))
+forward_running = True
 
 def main(args):
     """
@@ -28,9 +54,15 @@ def main(args):
     # args[3] = hook_url (can be empty)
     
     if len(args) < 2:
-        debug("# Error: Not enough arguments provided")
+        error("# Error: Not enough arguments provided")
         sys.exit(1)
     
+    if args[1] == "--forward":
+        api_key = args[2] if len(args) > 2 and args[2] else ""
+        hook_url = args[3] if len(args) > 3 and args[3] else ""
+        run_forwarder(hook_url, api_key)
+        return
+    
     alert_file_location = args[1]
     api_key = args[2] if len(args) > 2 and args[2] else ""
     hook_url = args[3] if len(args) > 3 and args[3] else ""
@@ -45,41 +77,50 @@ def main(args):
             json_alert = json.load(alert_file)
         
         debug("# Alert loaded successfully")
-        debug(f"# Alert content: {json.dumps(json_alert, indent=2)}")
+        if debug_enabled:
+            debug(f"# Alert content: {json.dumps(json_alert, indent=2)}")
         
-        # Send alert to listener server
-        send_alert_to_listener(json_alert, hook_url, api_key)
+        if hook_mode == "spool":
+            # Leave delivery to the forwarder daemon
+            spool_alert(json_alert)
+        else:
+            # Send alert to listener server
+            send_alert_to_listener(json_alert, hook_url, api_key)
         
     except FileNotFoundError:
-        debug(f"# Error: Alert file not found: {alert_file_location}")
+        error(f"# Error: Alert file not found: {alert_file_location}")
         sys.exit(1)
     except json.JSONDecodeError as e:
-        debug(f"# Error: Invalid JSON in alert file: {str(e)}")
+        error(f"# Error: Invalid JSON in alert file: {str(e)}")
         sys.exit(1)
     except Exception as e:
-        debug(f"# Error processing alert: {str(e)}")
+        error(f"# Error processing alert: {str(e)}")
         sys.exit(1)
 
 def send_alert_to_listener(alert, hook_url, api_key):
     """
     Send the alert to the listener webhook endpoint
+    
+    Uses the standard library http.client rather than requests: a hook
+    run posts a single alert, and importing requests costs more than the
+    request itself. Retries follow urllib3's Retry(total=3, backoff_factor=1).
     """
+    import http.client
+    import socket
+    from urllib.parse import urlsplit
+    
+    # Use hook_url from command line argument or fall back to default
+    webhook_url = hook_url if hook_url else default_webhook_url
+    
     try:
-        # Use hook_url from command line argument or fall back to default
-        webhook_url = hook_url if hook_url else "http://127.0.0.1:5000/webhook/wazuh"
-        
         debug(f"# Using webhook URL: {webhook_url}")
         
-        # Configure requests session with retry strategy
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        url = urlsplit(webhook_url)
+        if url.scheme == "https":
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
         
         # Prepare headers
         headers = {
@@ -92,66 +133,346 @@ def send_alert_to_listener(alert, hook_url, api_key):
             headers['X-API-Key'] = api_key
         
         # Extract key fields from alert for logging
-        try:
-            alert_level = alert.get('rule', {}).get('level', 'N/A')
-            rule_id = alert.get('rule', {}).get('id', 'N/A')
-            description = alert.get('rule', {}).get('description', 'N/A')
-            agent_name = alert.get('agent', {}).get('name', 'N/A')
-            agent_id = alert.get('agent', {}).get('id', 'N/A')
-            
-            debug(f"# Alert details - Level: {alert_level}, Rule ID: {rule_id}")
-            debug(f"# Agent: {agent_name} (ID: {agent_id})")
-            debug(f"# Description: {description}")
-        except Exception as e:
-            debug(f"# Error extracting alert details: {str(e)}")
+        if debug_enabled:
+            try:
+                alert_level = alert.get('rule', {}).get('level', 'N/A')
+                rule_id = alert.get('rule', {}).get('id', 'N/A')
+                description = alert.get('rule', {}).get('description', 'N/A')
+                agent_name = alert.get('agent', {}).get('name', 'N/A')
+                agent_id = alert.get('agent', {}).get('id', 'N/A')
+                
+                debug(f"# Alert details - Level: {alert_level}, Rule ID: {rule_id}")
+                debug(f"# Agent: {agent_name} (ID: {agent_id})")
+                debug(f"# Description: {description}")
+            except Exception as e:
+                debug(f"# Error extracting alert details: {str(e)}")
+        
+        body = json.dumps(alert).encode()
         
         # Send the alert
         debug("# Sending alert to listener server")
-        response = session.post(
-            webhook_url,
-            json=alert,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            debug("# Alert sent successfully")
-            debug(f"# Response: {response.text}")
+        for attempt in range(send_retries + 1):
+            if attempt:
+                time.sleep(send_backoff_factor * (2 ** (attempt - 1)) if attempt > 1 else 0)
+                debug(f"# Retry {attempt} of {send_retries}")
+            
+            connection = connection_class(url.hostname, url.port, timeout=30)
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                status = response.status
+                text = response.read().decode(errors="replace")
+            except socket.timeout as e:
+                if attempt < send_retries:
+                    continue
+                error(f"# Timeout error: listener server did not respond within 30 seconds")
+                error(f"# Error details: {str(e)}")
+                return
+            except (OSError, http.client.HTTPException) as e:
+                if attempt < send_retries:
+                    continue
+                error(f"# Connection error: Cannot reach listener server at {webhook_url}")
+                error(f"# Error details: {str(e)}")
+                return
+            finally:
+                connection.close()
+            
+            if status in send_retry_statuses and attempt < send_retries:
+                continue
+            break
+        
+        if status == 200:
+            info("# Alert sent successfully")
+            debug(f"# Response: {text}")
         else:
-            debug(f"# Error sending alert. Status code: {response.status_code}")
-            debug(f"# Response: {response.text}")
+            error(f"# Error sending alert. Status code: {status}")
+            error(f"# Response: {text}")
             
-    except requests.exceptions.ConnectionError as e:
-        debug(f"# Connection error: Cannot reach listener server at {webhook_url}")
-        debug(f"# Error details: {str(e)}")
-    except requests.exceptions.Timeout as e:
-        debug(f"# Timeout error: listener server did not respond within 30 seconds")
-        debug(f"# Error details: {str(e)}")
-    except requests.exceptions.RequestException as e:
-        debug(f"# Network error sending alert: {str(e)}")
     except Exception as e:
-        debug(f"# Unexpected error sending alert: {str(e)}")
+        error(f"# Unexpected error sending alert: {str(e)}")
 
-def debug(msg):
+def spool_alert(alert):
     """
-    Debug logging function
+    Append the alert as one NDJSON line to the local spool
+    
+    The write happens under an exclusive lock so concurrent hook runs and
+    the forwarder's spool compaction never interleave.
     """
-    if debug_enabled:
-        msg = f"{now}: {msg}\n"
-        print(msg)
+    line = json.dumps(alert, separators=(',', ':')).encode() + b"\n"
+    
+    try:
+        fd = os.open(spool_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+    except FileNotFoundError:
+        os.makedirs(spool_dir, exist_ok=True)
+        fd = os.open(spool_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    
+    debug(f"# Alert spooled to {spool_file}")
+
+def read_offset():
+    """
+    Read the acknowledged spool offset
+    """
+    try:
+        with open(offset_file) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def write_offset(offset):
+    """
+    Durably record the acknowledged spool offset
+    """
+    tmp_file = offset_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, offset_file)
+
+def read_spool_batch(offset, max_alerts=None):
+    """
+    Read complete NDJSON lines from the spool starting at offset
+    
+    Args:
+        offset: Byte offset of the first unacknowledged alert
+        max_alerts: Cap on alerts per batch (default: WZ_HOOK_BATCH_SIZE)
+    
+    Returns:
+        tuple: (batch bytes, number of alerts, spool size)
+    """
+    try:
+        with open(spool_file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(offset)
+            data = f.read(forward_batch_bytes)
+    except FileNotFoundError:
+        return b"", 0, 0
+    
+    # Only forward whole lines; a hook may still be writing the last one
+    end = data.rfind(b"\n") + 1
+    if end == 0 and len(data) == forward_batch_bytes:
+        # A single alert larger than the batch budget
+        with open(spool_file, "rb") as f:
+            f.seek(offset)
+            data = f.readline()
+        end = len(data) if data.endswith(b"\n") else 0
+    data = data[:end]
+    
+    max_alerts = max_alerts or forward_batch_size
+    lines = data.count(b"\n")
+    if lines > max_alerts:
+        cut = 0
+        for _ in range(max_alerts):
+            cut = data.index(b"\n", cut) + 1
+        data = data[:cut]
+        lines = max_alerts
+    
+    return data, lines, size
+
+def compact_spool(offset):
+    """
+    Truncate the spool once everything in it has been acknowledged
+    
+    Returns:
+        int: The new acknowledged offset
+    """
+    fd = os.open(spool_file, os.O_WRONLY | os.O_CREAT, 0o640)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size != offset:
+            # A hook appended in the meantime
+            return offset
+        os.ftruncate(fd, 0)
+        write_offset(0)
+        return 0
+    finally:
+        os.close(fd)
+
+def build_forward_session(api_key):
+    """
+    Build the keep-alive session used by the forwarder
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    # Only connection-level retries here; the forwarder loop owns backoff
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=Retry(total=0))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        'Content-Type': 'application/x-ndjson',
+        'User-Agent': 'Wazuh-listener-Integration/1.0'
+    })
+    if api_key:
+        session.headers['X-API-Key'] = api_key
+    return session
+
+def stop_forwarder(signum, frame):
+    global forward_running
+    forward_running = False
+
+def run_forwarder(hook_url, api_key):
+    """
+    Long-running daemon draining the spool to the listener batch endpoint
+    
+    Alerts are sent as NDJSON batches over one pooled connection. The
+    offset is only advanced after the listener acknowledges a batch, so a
+    restart resumes from the last acknowledged alert (at-least-once).
+    """
+    import random
+    import requests
+    
+    webhook_url = hook_url if hook_url else default_webhook_url
+    batch_url = webhook_url if webhook_url.rstrip('/').endswith('/batch') else webhook_url.rstrip('/') + '/batch'
+    
+    signal.signal(signal.SIGTERM, stop_forwarder)
+    signal.signal(signal.SIGINT, stop_forwarder)
+    
+    os.makedirs(spool_dir, exist_ok=True)
+    session = build_forward_session(api_key)
+    offset = read_offset()
+    backoff = 1.0
+    batch_limit = forward_batch_size
+    
+    info(f"# Forwarder started: {spool_file} -> {batch_url} (offset {offset})")
+    
+    while forward_running:
+        data, count, size = read_spool_batch(offset, batch_limit)
         
-        # Ensure log directory exists
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        if offset > size:
+            # Spool was truncated or replaced underneath us
+            error(f"# Spool shrank below offset {offset}, restarting from 0")
+            offset = 0
+            write_offset(offset)
+            continue
         
+        if not count:
+            if size and offset == size:
+                offset = compact_spool(offset)
+            flush_log()
+            time.sleep(forward_poll_interval)
+            continue
+        
+        retry_after = None
         try:
-            with open(log_file, "a") as f:
-                f.write(msg)
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
+            response = session.post(batch_url, data=data, timeout=30)
+            status = response.status_code
+            
+            if 200 <= status < 300:
+                # Any 2xx acknowledges the batch; the body only reports rejects
+                try:
+                    result = response.json() if response.content else {}
+                except ValueError:
+                    result = {}
+                if isinstance(result, dict) and result.get("rejected"):
+                    error(f"# Listener rejected {result['rejected']} of {count} alerts")
+                delivered = True
+            elif status == 413 and count > 1:
+                # Listener cannot queue this many at once; split and resend
+                batch_limit = max(1, count // 2)
+                info(f"# Batch of {count} alerts too large, retrying with {batch_limit}")
+                continue
+            elif 400 <= status < 500 and status not in (408, 429):
+                # The batch itself is unacceptable; retrying would wedge the spool
+                error(f"# Dropping batch of {count} alerts. Status code: {status}")
+                error(f"# Response: {response.text}")
+                delivered = True
+            else:
+                error(f"# Error forwarding batch. Status code: {status}")
+                retry_after = response.headers.get("Retry-After")
+                delivered = False
+        except requests.exceptions.RequestException as e:
+            error(f"# Connection error forwarding to {batch_url}: {str(e)}")
+            delivered = False
+        
+        if delivered:
+            offset += len(data)
+            write_offset(offset)
+            backoff = 1.0
+            batch_limit = min(forward_batch_size, batch_limit * 2)
+            info(f"# Forwarded {count} alerts (offset {offset})")
+            flush_log()
+            continue
+        
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = backoff + random.uniform(0, backoff / 2)
+            backoff = min(backoff * 2, forward_max_backoff)
+        info(f"# Retrying in {delay:.1f}s")
+        flush_log()
+        
+        deadline = time.time() + delay
+        while forward_running and time.time() < deadline:
+            time.sleep(min(0.5, deadline - time.time()))
+    
+    session.close()
+    info(f"# Forwarder stopped (offset {offset})")
+
+def debug(msg):
+    """
+    Debug level logging
+    """
+    if debug_enabled:
+        log(msg)
+
+def info(msg):
+    """
+    Info level logging
+    """
+    if log_level <= LOG_LEVELS["info"]:
+        log(msg)
+
+def error(msg):
+    """
+    Error level logging
+    """
+    if log_level <= LOG_LEVELS["error"]:
+        log(msg)
+
+def log(msg):
+    """
+    Buffer a timestamped log line until the next flush_log()
+    """
+    now = time.strftime("%a %b %d %H:%M:%S %Z %Y")
+    log_buffer.append(f"{now}: {msg}\n")
+
+def flush_log():
+    """
+    Write all buffered log lines to stdout and the integrations log at once
+    """
+    if not log_buffer:
+        return
+    data = "".join(log_buffer)
+    log_buffer.clear()
+    
+    sys.stdout.write(data)
+    sys.stdout.flush()
+    
+    try:
+        try:
+            f = open(log_file, "a")
+        except FileNotFoundError:
+            # Ensure log directory exists
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            f = open(log_file, "a")
+        with f:
+            f.write(data)
+    except Exception as e:
+        print(f"Error writing to log file: {e}")
 
 if __name__ == "__main__":
     try:
         main(sys.argv)
     except Exception as e:
-        debug(f"# Fatal error: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        error(f"# Fatal error: {str(e)}")
+        sys.exit(1)
+    finally:
+        flush_log()